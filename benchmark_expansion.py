@@ -0,0 +1,63 @@
+'''
+benchmark_expansion.py -- Measure the work done by visitors.Expander.
+
+Expands products of k sums of n terms each, like
+    (a0 + a1 + a2) * (b0 + b1 + b2)
+for k = 2, 3, 4, and reports the number of calls to Expander.visit,
+Expander.distribute and Expander.map, and the time taken.
+'''
+
+import sys, argparse, time
+
+from glass_cas.parsing import parsing
+
+from glass_cas import visitors
+
+def product_of_sums(k, n):
+    ''' Return the input string for a product of k sums of n terms. '''
+    names = "abcdefghijklmnopqrstuvwxyz"
+    sums = ["(" + " + ".join("%s%s" % (names[i], j) for j in range(n)) + ")" for i in range(k)]
+    return " * ".join(sums)
+
+def count_calls(expander, method_name, counts):
+    ''' Replace expander.method_name with a wrapper counting its calls in counts. '''
+    method = getattr(expander, method_name)
+    counts[method_name] = 0
+
+    def counted(*args, **kwargs):
+        counts[method_name] += 1
+        return method(*args, **kwargs)
+    setattr(expander, method_name, counted)
+
+def run(k, n):
+    tree = parsing.Parser().parse(product_of_sums(k, n))
+
+    counts = {}
+    expander = visitors.Expander()
+    for method_name in ["visit", "distribute", "map"]:
+        count_calls(expander, method_name, counts)
+
+    start = time.perf_counter()
+    result = tree.accept(expander)
+    elapsed = time.perf_counter() - start
+
+    print("k=%-2s n=%-3s visit=%-8s distribute=%-8s map=%-6s output nodes=%-8s %.4fs" % (
+        k, n, counts["visit"], counts["distribute"], counts["map"],
+        len(repr(result).split()), elapsed))
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument("-k", "--max_sums",
+        help="largest number of sums to multiply",
+        type=int, default=4)
+    arg_parser.add_argument("-n", "--terms",
+        help="number of terms in each sum",
+        type=int, nargs="+", default=[2, 4, 8])
+
+    ARGS = arg_parser.parse_args()
+    sys.setrecursionlimit(100000)
+
+    for k in range(2, ARGS.max_sums + 1):
+        for n in ARGS.terms:
+            run(k, n)
@@ -9,6 +9,7 @@ import sys, argparse, traceback
 from glass_cas.parsing import parsing
 
 from glass_cas import visitors
+from glass_cas.budget import Budget, BudgetExceededError
 
 if __name__ == '__main__':
     arg_parser = argparse.ArgumentParser()
@@ -34,6 +35,9 @@ if __name__ == '__main__':
     arg_parser.add_argument("--no_replace_constants",
         help="do not replace constants (e, pi) with approximate values",
         action="store_true")
+    arg_parser.add_argument("--time_limit",
+        help="give up on an input after this many seconds",
+        type=float)
 
     ARGS = arg_parser.parse_args()
     parser = parsing.Parser()
@@ -51,23 +55,19 @@ if __name__ == '__main__':
             rpn = parser.to_rpn(fixed_input)
             tree = parser.to_tree(rpn)
 
-            if ARGS.types:
-                tree.assign_types()
-                print("Expression has type:", tree.expr_type)
-
-            reduced_tree = tree.copy(recursive = True).reduce(not ARGS.no_replace_constants)
+            budget = None
+            if ARGS.time_limit != None:
+                budget = Budget(time_limit = ARGS.time_limit)
+            reduced_tree = tree.copy(recursive = True).reduce(not ARGS.no_replace_constants,
+                budget = budget, assign_types = ARGS.types)
 
             if ARGS.types:
-                reduced_tree.assign_types()
-                print("Reduced expression has type:", reduced_tree.expr_type)
+                print("Expression has type:", reduced_tree.expr_type)
 
             parser.update_symbol_table(reduced_tree)
 
             if ARGS.normalize:
                 norm = tree.copy(recursive = True)
-                if ARGS.types:
-                    norm.assign_types()
-
                 norm = norm.accept(visitors.Normalizer())
                 print("Normalized expression:", norm)
                 if ARGS.types:
@@ -77,7 +77,7 @@ if __name__ == '__main__':
                 if ARGS.tree:
                     print(reduced_tree.__str__(mode = 'tree'))
                 print(reduced_tree)
-        except (SyntaxError, ZeroDivisionError, ValueError, TypeError) as error:
+        except (SyntaxError, ZeroDivisionError, ValueError, TypeError, BudgetExceededError) as error:
             if ARGS.tracebacks:
                 traceback.print_tb(error.__traceback__)
             print(error)
@@ -0,0 +1,144 @@
+'''
+budget.py
+
+This defines Budget, an execution context that limits how much work
+reduce, expand, and simplify may do, and BudgetExceededError, which is
+raised when a limit is hit.
+
+A Budget is passed to node.accept (or node.reduce, ExpandOp.apply, and
+SimplifyOp.apply). While it is active, every node that is constructed
+is charged to it, and every so often it checks its deadline and whether
+it was cancelled. Since the active budget is held in a context variable,
+each thread (or asyncio task) only charges the budget it activated.
+
+Ex:
+    budget = Budget(time_limit = 1.0, max_nodes = 10**6)
+    try:
+        result = tree.reduce(budget = budget)
+    except BudgetExceededError as error:
+        print(error.reason, error.stats)
+'''
+
+import contextvars, threading, time
+
+_active_budget = contextvars.ContextVar('active_budget', default = None)
+
+def current_budget():
+    ''' Return the Budget active in this context, or None. '''
+    return _active_budget.get()
+
+class BudgetExceededError(RuntimeError):
+
+    def __init__(self, reason, stats):
+        '''
+        reason says which limit was hit ("time limit", "node limit",
+            "output size limit", or "cancelled").
+        stats is a dict of statistics for the work done so far.
+        '''
+        message = reason
+        if reason != Budget.CANCELLED:
+            message += " exceeded"
+        message += " after %s nodes and %.3f seconds" % (stats['nodes_allocated'], stats['elapsed'])
+        super().__init__(message)
+
+        self.reason = reason
+        self.stats = stats
+
+class Budget(object):
+
+    TIME_LIMIT        = "time limit"
+    NODE_LIMIT        = "node limit"
+    OUTPUT_SIZE_LIMIT = "output size limit"
+    CANCELLED         = "cancelled"
+
+    # the deadline and cancellation are checked once per this many nodes
+    CHECK_INTERVAL = 64
+
+    def __init__(self, time_limit = None, max_nodes = None, max_output_size = None):
+        '''
+        time_limit is the wall-clock time allowed, in seconds, counted
+            from the first time this budget is activated.
+        max_nodes is the number of nodes that may be allocated.
+        max_output_size is the number of nodes allowed in a result.
+        Any of these can be None, for no limit.
+        '''
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.max_output_size = max_output_size
+
+        self.start_time = None
+        self.deadline = None
+        self.nodes_allocated = 0
+        self.output_size = None
+        self.until_check = Budget.CHECK_INTERVAL
+        self.cancelled = threading.Event()
+
+    def stats(self):
+        elapsed = 0.0
+        if self.start_time != None:
+            elapsed = time.monotonic() - self.start_time
+        return {
+            'elapsed'         : elapsed,
+            'nodes_allocated' : self.nodes_allocated,
+            'output_size'     : self.output_size,
+        }
+
+    def cancel(self):
+        '''
+        Stop the work using this budget at its next check. This is safe
+        to call from another thread.
+        '''
+        self.cancelled.set()
+
+    def exceeded(self, reason):
+        return BudgetExceededError(reason, self.stats())
+
+    def activate(self):
+        '''
+        Make this the active budget in the current context and return
+        a token for deactivate().
+        '''
+        if self.start_time == None:
+            self.start_time = time.monotonic()
+            if self.time_limit != None:
+                self.deadline = self.start_time + self.time_limit
+        token = _active_budget.set(self)
+        self.check()
+        return token
+
+    def deactivate(self, token):
+        _active_budget.reset(token)
+
+    def check(self):
+        ''' Raise a BudgetExceededError if cancelled or out of time. '''
+        if self.cancelled.is_set():
+            raise self.exceeded(Budget.CANCELLED)
+        if self.deadline != None and time.monotonic() > self.deadline:
+            raise self.exceeded(Budget.TIME_LIMIT)
+
+    def charge(self, count = 1):
+        ''' Record that count nodes were allocated. '''
+        self.nodes_allocated += count
+        if self.max_nodes != None and self.nodes_allocated > self.max_nodes:
+            raise self.exceeded(Budget.NODE_LIMIT)
+
+        self.until_check -= count
+        if self.until_check <= 0:
+            self.until_check = Budget.CHECK_INTERVAL
+            self.check()
+
+    def check_output(self, result):
+        ''' Raise a BudgetExceededError if the tree result is too large. '''
+        if self.max_output_size == None or not hasattr(result, 'children'):
+            return
+
+        size = 0
+        frontier = [result]
+        while frontier:
+            n = frontier.pop()
+            size += 1
+            frontier.extend(n.children)
+        self.output_size = size
+
+        if size > self.max_output_size:
+            raise self.exceeded(Budget.OUTPUT_SIZE_LIMIT)
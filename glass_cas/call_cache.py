@@ -0,0 +1,135 @@
+'''
+call_cache.py
+
+This defines CallCache, a bounded memo cache for calls of user-defined
+functions. A Parser constructed with memoize = True creates one and
+attaches it to every function defined through update_symbol_table.
+
+Entries are keyed by the function object's identity plus its arguments.
+Each entry also records every symbol name the function depends on: its
+own name, the free symbols in its body, and (transitively) those of any
+function it calls. Redefining a symbol evicts only the entries that
+depend on it.
+'''
+
+from .parsing.parser_definitions import UserFunction, Var
+from collections import OrderedDict
+import numbers
+
+class CallCache(object):
+
+    DEFAULT_MAX_SIZE = 1024
+
+    def __init__(self, max_size = DEFAULT_MAX_SIZE):
+        '''
+        max_size is the number of results kept. When it is exceeded,
+            the least recently used entry is evicted.
+        '''
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        # key -> (function, result node, dependency names)
+        self.entries = OrderedDict()
+        # name -> set of keys whose result depends on that name
+        self.keys_by_symbol = {}
+        # id(function) -> (function, dependency names)
+        self.dependencies = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def operand_key(operand):
+        '''
+        Return a hashable key for a function argument. Numbers are keyed
+        by type and value (so f(1) and f(1.0) are different calls), and
+        trees by their structure.
+        '''
+        if hasattr(operand, 'children'):
+            if len(operand.children) == 0 and isinstance(operand.value, numbers.Number):
+                operand = operand.value
+            else:
+                return repr(operand)
+        return (type(operand), operand if isinstance(operand, numbers.Number) else str(operand))
+
+    def make_key(self, func, operands):
+        return (id(func),) + tuple(CallCache.operand_key(x) for x in operands)
+
+    def dependencies_of(self, func, visiting = None):
+        '''
+        Return the set of symbol names that func's result depends on.
+        '''
+        if id(func) in self.dependencies:
+            return self.dependencies[id(func)][1]
+
+        if visiting == None:
+            visiting = set()
+        visiting.add(id(func))
+
+        names = set([func.name])
+        if func.value != None:
+            params = set(str(p) for p in func.operand_list)
+            for symbol in func.value.symbols():
+                if isinstance(symbol, Var) and symbol.name in params:
+                    continue
+                names.add(symbol.name)
+                if isinstance(symbol, UserFunction) and id(symbol) not in visiting:
+                    names |= self.dependencies_of(symbol, visiting)
+
+        self.dependencies[id(func)] = (func, names)
+        return names
+
+    def lookup(self, func, operands):
+        '''
+        Return a copy of the cached result of func(*operands), or None
+        if there is no such entry.
+        '''
+        key = self.make_key(func, operands)
+        entry = self.entries.get(key)
+        if entry == None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[1].copy(recursive = True)
+
+    def store(self, func, operands, result):
+        ''' Cache result (a node) as the value of func(*operands). '''
+        key = self.make_key(func, operands)
+        names = self.dependencies_of(func)
+
+        self.entries[key] = (func, result.copy(recursive = True), names)
+        self.entries.move_to_end(key)
+        for name in names:
+            self.keys_by_symbol.setdefault(name, set()).add(key)
+
+        while len(self.entries) > self.max_size:
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        func, result, names = self.entries.pop(key)
+        for name in names:
+            keys = self.keys_by_symbol.get(name)
+            if keys != None:
+                keys.discard(key)
+                if len(keys) == 0:
+                    del self.keys_by_symbol[name]
+
+    def invalidate(self, name):
+        '''
+        Evict every entry that depends on the symbol called name.
+        Call this whenever name is (re)defined.
+        '''
+        for key in list(self.keys_by_symbol.get(name, ())):
+            self.remove(key)
+
+        stale = [k for k, (func, names) in self.dependencies.items() if name in names]
+        for k in stale:
+            del self.dependencies[k]
+
+    def clear(self):
+        self.entries.clear()
+        self.keys_by_symbol.clear()
+        self.dependencies.clear()
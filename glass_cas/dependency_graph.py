@@ -0,0 +1,213 @@
+'''
+dependency_graph.py
+
+This defines DependencyGraph, which lets a Parser be used like a
+spreadsheet: expressions can be watched, and whenever a symbol is
+(re)defined through Parser.update_symbol_table, only the watched
+expressions that depend on that symbol are recomputed.
+
+The graph has a vertex for each defined symbol (variable or function)
+and for each watched expression. There is an edge from a symbol name
+to every vertex whose body references that name. Redefining a symbol
+marks it and everything reachable from it dirty. Dirty vertices are
+recomputed depth first, so each is recomputed after everything it
+depends on, and at most once per update.
+
+When a watched expression or a variable's definition is evaluated,
+the current values of the variables it references are substituted,
+and its function calls are bound to the current definitions, before
+it is reduced. Function bodies are still evaluated by Reducer, which
+leaves variables symbolic. Functions are part of the graph so that
+redefining a function, or anything it references, recomputes the
+expressions that call it.
+'''
+
+from .parsing.parser_definitions import UserFunction, Var
+
+class DependencyGraph(object):
+
+    # vertex kinds
+    SYMBOL = "symbol"
+    WATCH  = "watch"
+
+    def __init__(self):
+        # vertex -> body (a node)
+        self.bodies = {}
+        # vertex -> set of names the body references
+        self.depends_on = {}
+        # name -> set of vertices whose body references that name
+        self.dependents = {}
+        # vertex -> computed value (a node)
+        self.values = {}
+        self.dirty = set()
+        # vertex -> symbol object, for defined symbols
+        self.symbols = {}
+        # vertices for defined functions
+        self.functions = set()
+        # vertices recomputed by the last call to recompute(), in order
+        self.recomputed = []
+
+    @staticmethod
+    def references(body, params = ()):
+        ''' Return the set of symbol names referenced in body, ignoring params. '''
+        params = set(str(p) for p in params)
+        return set(
+            symbol.name for symbol in body.symbols()
+            if isinstance(symbol, UserFunction) or symbol.name not in params
+        )
+
+    def add_vertex(self, vertex, body, names):
+        for name in self.depends_on.get(vertex, ()):
+            self.dependents[name].discard(vertex)
+
+        self.bodies[vertex] = body
+        self.depends_on[vertex] = names
+        for name in names:
+            self.dependents.setdefault(name, set()).add(vertex)
+
+    def remove_vertex(self, vertex):
+        for name in self.depends_on.pop(vertex, ()):
+            self.dependents[name].discard(vertex)
+        self.bodies.pop(vertex, None)
+        self.values.pop(vertex, None)
+        self.symbols.pop(vertex, None)
+        self.functions.discard(vertex)
+        self.dirty.discard(vertex)
+
+    def mark_dirty(self, name):
+        '''
+        Mark the symbol name, and every vertex that depends on it
+        directly or indirectly, as dirty.
+        '''
+        frontier = [(DependencyGraph.SYMBOL, name)]
+        seen = set()
+        while frontier:
+            vertex = frontier.pop()
+            if vertex in seen:
+                continue
+            seen.add(vertex)
+            # a vertex can already be dirty while what depends on it is
+            # clean: a function's value is its definition, so computing
+            # its callers never recomputes the symbols its body references
+            self.dirty.add(vertex)
+
+            if vertex[0] == DependencyGraph.SYMBOL:
+                frontier.extend(self.dependents.get(vertex[1], ()))
+
+    def check_definition(self, symbol, body):
+        '''
+        Raise a ValueError if defining symbol as body would make a
+        circular definition. This leaves the graph unchanged, so it is
+        called before anything is redefined.
+        A variable's definition has the values of the variables it
+        references substituted, while a function body is applied by
+        Reducer, which leaves variables symbolic but calls the current
+        definition of each function. So a variable is circular through
+        other variables, and a function through other functions.
+        '''
+        params = getattr(symbol, 'operand_list', ())
+        is_function = isinstance(symbol, UserFunction)
+
+        frontier = list(DependencyGraph.references(body, params))
+        seen = set()
+        while frontier:
+            name = frontier.pop()
+            if name == symbol.name:
+                raise ValueError("Circular definition of %s" % symbol.name)
+            if name in seen:
+                continue
+            seen.add(name)
+
+            vertex = (DependencyGraph.SYMBOL, name)
+            if vertex in self.bodies and (vertex in self.functions) == is_function:
+                frontier.extend(self.depends_on[vertex])
+
+    def define(self, symbol):
+        '''
+        Record a new definition of symbol (a Var or UserFunction whose
+        value is its body) and recompute the watched expressions that
+        depend on it.
+        Returns the list of recomputed watch keys.
+        Raises a ValueError, without changing the graph, for circular
+        definitions.
+        '''
+        self.check_definition(symbol, symbol.value)
+
+        vertex = (DependencyGraph.SYMBOL, symbol.name)
+        params = getattr(symbol, 'operand_list', ())
+        self.add_vertex(vertex, symbol.value, DependencyGraph.references(symbol.value, params))
+        self.values.pop(vertex, None)
+        self.symbols[vertex] = symbol
+        if isinstance(symbol, UserFunction):
+            self.functions.add(vertex)
+        else:
+            self.functions.discard(vertex)
+
+        self.mark_dirty(symbol.name)
+        return self.recompute()
+
+    def watch(self, key, tree):
+        '''
+        Start watching tree under key, replacing anything already
+        watched under key, and return its value.
+        '''
+        vertex = (DependencyGraph.WATCH, key)
+        self.add_vertex(vertex, tree, DependencyGraph.references(tree))
+        self.dirty.add(vertex)
+        return self.value(vertex)
+
+    def unwatch(self, key):
+        self.remove_vertex((DependencyGraph.WATCH, key))
+
+    def watched_value(self, key):
+        ''' Return the current value of the expression watched under key. '''
+        return self.value((DependencyGraph.WATCH, key))
+
+    def recompute(self):
+        '''
+        Recompute every dirty watched expression (and the dirty variables
+        it needs) in topological order.
+        Returns the list of recomputed watch keys.
+        '''
+        self.recomputed = []
+        for vertex in [v for v in self.dirty if v[0] == DependencyGraph.WATCH]:
+            self.value(vertex)
+        return [key for kind, key in self.recomputed if kind == DependencyGraph.WATCH]
+
+    def value(self, vertex, in_progress = None):
+        '''
+        Return the value of vertex, first recomputing it if it is dirty.
+        Raises a ValueError for circular definitions.
+        '''
+        if vertex not in self.dirty and vertex in self.values:
+            return self.values[vertex]
+        if vertex not in self.bodies:
+            return None
+
+        if vertex in self.functions:
+            # functions are applied by Reducer, so their value is the
+            # current definition itself
+            self.values[vertex] = self.symbols[vertex]
+            self.dirty.discard(vertex)
+            return self.values[vertex]
+
+        if in_progress == None:
+            in_progress = set()
+        if vertex in in_progress:
+            raise ValueError("Circular definition of %s" % vertex[1])
+        in_progress.add(vertex)
+
+        # compute the symbols this depends on first
+        replacements = {}
+        for name in self.depends_on[vertex]:
+            result = self.value((DependencyGraph.SYMBOL, name), in_progress)
+            if result != None:
+                replacements[name] = result
+
+        in_progress.discard(vertex)
+
+        result = self.bodies[vertex].replace_all(replacements).reduce()
+        self.values[vertex] = result
+        self.dirty.discard(vertex)
+        self.recomputed.append(vertex)
+        return result
@@ -22,11 +22,85 @@ The essential method on all of these classes is resolve().
        ex: A [+-*] B is often the same type as B [+-*] A.
        But be careful of non-commutative operators (-, /, ^, %)
     2. A lot of these cases don't make sense
+
+  So the cases live in a single table, RESOLUTION_RULES, at the bottom
+  of this module. It maps (left type class, operator class, right type class)
+  to a rule function, and each case is registered once with register_rule()
+  (both orders at once, where the order doesn't matter). Cases that aren't
+  in the table resolve to UnknownExpr.
+
+Type objects are immutable and interned: constructing a type equal to one
+that is still in use returns the existing object (see InternedType). So
+typing a large tree allocates one object per distinct type, not per node.
 '''
 
 from .parsing.parser_definitions import *
+import numbers
+import weakref
+
+# live type objects, keyed by Expr.key
+INTERNED_TYPES = weakref.WeakValueDictionary()
+
+def key_of(value):
+    '''
+    Return a hashable key for a constructor argument of an expression type.
+    The key includes the argument's class, so that 2 and 2.0 (or a Var
+    and a Constant of the same name) give different types.
+    '''
+    if isinstance(value, Expr):
+        return value.key
+    if isinstance(value, tuple):
+        return tuple(key_of(v) for v in value)
+    if isinstance(value, dict):
+        return (dict, frozenset((key_of(k), key_of(v)) for k, v in value.items()))
+    return (value.__class__, value)
+
+class InternedType(type):
+    '''
+    Metaclass for the expression types.
+
+    Calling an expression type class returns the existing instance built from
+    the same arguments, if there is one. (Arguments are matched as given, so
+    PolynomialExpr(x, 2) and PolynomialExpr(x, degree = 2) may be separate,
+    equal objects.) Otherwise the instance is built,
+    given its key and frozen (see Expr.__setattr__).
+    '''
+
+    def __call__(cls, *args, **kwargs):
+        key = (cls,) + tuple(map(key_of, args))
+        if kwargs:
+            key += tuple((name, key_of(kwargs[name])) for name in sorted(kwargs))
+
+        try:
+            instance = INTERNED_TYPES.get(key)
+        except TypeError:
+            # unhashable arguments: build an instance that is never shared
+            instance = super().__call__(*args, **kwargs)
+            object.__setattr__(instance, 'key', (cls, object()))
+            return instance
+
+        if instance is None:
+            instance = super().__call__(*args, **kwargs)
+            object.__setattr__(instance, 'key', key)
+            INTERNED_TYPES[key] = instance
+        return instance
 
-class Expr(object):
+class Expr(object, metaclass = InternedType):
+
+    def __setattr__(self, name, value):
+        # attributes can only be set in __init__, before the key is assigned
+        if 'key' in self.__dict__:
+            raise AttributeError("%s is immutable" % self.__class__.__name__)
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError("%s is immutable" % self.__class__.__name__)
+
+    def __eq__(self, other):
+        return type(self) == type(other)
+
+    def __hash__(self):
+        return hash(self.__class__)
 
     def __repr__(self):
         return str(self)
@@ -34,32 +108,61 @@ class Expr(object):
     def __str__(self):
         return self.__class__.__name__
 
+    def is_known(self):
+        return True
+
     def resolve(self, operator, right_type):
-        raise NotImplementedError(
-          "cannot call Expr.resolve(). Expr should not be instantiated."
-        )
+        '''
+        Return the type of '<self> <operator> <right_type>'.
+
+        This looks up the rule for the classes of self, operator and
+        right_type in RESOLUTION_RULES. Results are memoized.
+        '''
+        key = (self.key, operator.__class__, right_type.key)
+        result = RESOLUTION_MEMO.get(key)
+        if result is not None:
+            return result
+
+        result = None
+        rule = find_rule(self.__class__, operator.__class__, right_type.__class__)
+        if rule != None:
+            result = rule(self, operator, right_type)
+        if result is None:
+            result = UnknownExpr("cannot determine resultant type for %s(%s, %s)",
+                operator.name, self, right_type)
+
+        if len(RESOLUTION_MEMO) >= RESOLUTION_MEMO_SIZE:
+            RESOLUTION_MEMO.clear()
+        RESOLUTION_MEMO[key] = result
+        return result
 
 class DefinedAsExpr(Expr):
     pass
 
 class UnknownExpr(Expr):
 
-    def __init__(self, info = None):
-        ''' info is some string that says why we couldn't determine the type. '''
+    def __init__(self, info = None, *info_args):
+        '''
+        info is some string that says why we couldn't determine the type.
+        If info_args are given, the reason is info % info_args, and it is
+        only formatted when it is displayed.
+        '''
         self.info = info
+        self.info_args = info_args
 
+    def reason(self):
+        if self.info_args:
+            return self.info % self.info_args
+        return self.info
 
     def __str__(self):
         result = self.__class__.__name__
         if self.info:
-            result += "[%s]" % self.info
+            result += "[%s]" % self.reason()
         return result
 
-    def __eq__(self, other):
-        return type(self) == type(other)
-
-    def resolve(self, operator, right_type):
-        return UnknownExpr()
+    def is_known(self):
+        return False
 
 class EquationExpr(Expr):
 
@@ -86,6 +189,9 @@ class EquationExpr(Expr):
             return (self.left_type == other.left_type and self.right_type == other.right_type)
         return False
 
+    def __hash__(self):
+        return hash((self.left_type, self.right_type))
+
 class PolynomialExpr(Expr):
 
     def __init__(self, var, degree):
@@ -100,43 +206,6 @@ class PolynomialExpr(Expr):
         self.var = var
         self.degree = degree
 
-    def resolve(self, operator, right_type):
-        ''' PolynomialExpr.resolve() '''
-
-        op_check = lambda op_type: isinstance(operator, op_type)
-
-        if isinstance(right_type, ConstantExpr):
-            if any(map(op_check, [PlusOp, SubOp, TimesOp])):
-                return right_type.resolve(operator, self)
-            elif op_check(DivideOp):
-                return self
-            elif op_check(ExponentOp):
-                # not sure if I want to apply this to non-integer exponents
-                return PolynomialExpr(self.var, degree = self.degree * right_type.value)
-
-        elif isinstance(right_type, PolynomialExpr):
-            if self.var == right_type.var:
-                if any(map(op_check, [PlusOp, SubOp])):
-                    new_degree = max(self.degree, right_type.degree)
-                    return PolynomialExpr(self.var, new_degree)
-                elif op_check(TimesOp):
-                    new_degree = self.degree + right_type.degree
-                    return PolynomialExpr(self.var, new_degree)
-                elif op_check(DivideOp):
-                    return RationalExpr(self, right_type)
-
-        elif isinstance(right_type, RationalExpr):
-            if any(map(op_check, [PlusOp, SubOp, TimesOp])):
-                return right_type.resolve(operator, self)
-            elif op_check(DivideOp):
-                if self.var == right_type.var:
-                    # P / (T / B) = P*B / T --> top = P * B, bottom = T
-                    new_top_degree = self.degree + right_type.bottom_type.degree
-                    new_top_type = PolynomialExpr(self.var, new_top_degree)
-                    return RationalExpr(new_top_type, right_type.top_type)
-
-        return UnknownExpr(info = "cannot determine resultant type for %s(%s, %s)" % (operator, self, right_type))
-
     def __repr__(self):
         return str(self)
 
@@ -150,45 +219,24 @@ class PolynomialExpr(Expr):
             return (self.var == other.var and self.degree == other.degree)
         return False
 
+    def __hash__(self):
+        if self.degree == 0:
+            # every ConstantExpr equals a degree 0 polynomial (see
+            # ConstantExpr.__eq__), so they all have to hash alike
+            return hash((PolynomialExpr, 0))
+        return hash((self.var, self.degree))
+
 class ConstantExpr(PolynomialExpr):
-    def __init__(self, value, var = Var("_")):
+    def __init__(self, value, var = None):
+        '''
+        var is the variable this constant is a polynomial (of degree 0) in.
+          It defaults to Var("_"), meaning no particular variable.
+        '''
+        if var is None:
+            var = Var("_")
         super().__init__(var, degree=0)
         self.value = value
 
-    def resolve(self, operator, right_type):
-        ''' ConstantExpr.resolve() '''
-
-        op_check = lambda op_type: isinstance(operator, op_type)
-
-        if isinstance(right_type, ConstantExpr):
-            ops = [PlusOp, SubOp, TimesOp, DivideOp, ModulusOp, ExponentOp]
-
-            if any(map(op_check, ops)):
-                return ConstantExpr(operator.apply(self.value, right_type.value))
-        elif isinstance(right_type, PolynomialExpr):
-            if op_check(PlusOp) or op_check(SubOp) or op_check(TimesOp):
-                return right_type
-            elif op_check(DivideOp):
-                # c / x, for example
-#        return RationalExpr(PolynomialExpr(right_type.var, degree = 0), right_type)
-                return RationalExpr(ConstantExpr(self.value, var = right_type.var), right_type)
-            elif op_check(ExponentOp):
-                if right_type.degree == 1:
-                    return ExponentialExpr(right_type.var, base = self.value)
-        elif isinstance(right_type, RationalExpr):
-            if op_check(PlusOp) or op_check(SubOp) or op_check(TimesOp):
-                return right_type.resolve(operator, self)
-            elif op_check(DivideOp):
-                # c / (T / B) = cB / T
-                new_top_type = self.resolve(TimesOp(), right_type.bottom_type)
-                return RationalExpr(new_top_type, right_type.top_type)
-
-        elif isinstance(right_type, ExponentialExpr):
-            if any(map(op_check, [TimesOp, DivideOp])):
-                return right_type
-
-        return UnknownExpr("Cannot determine resultant type for %s(%s, %s)" % (operator, self, right_type))
-
     def __repr__(self):
         return str(self)
 
@@ -205,6 +253,10 @@ class ConstantExpr(PolynomialExpr):
             return (self.degree == other.degree == 0)
         return False
 
+    def __hash__(self):
+        # the same as a degree 0 PolynomialExpr, since they compare equal
+        return PolynomialExpr.__hash__(self)
+
 class RationalExpr(Expr):
     '''
     A rational function is f(x) = P(x) / Q(x) for two polynomials P and Q.
@@ -236,68 +288,9 @@ class RationalExpr(Expr):
                 raise Exception("%s must be of a single variable" % self)
             self.var = top_type.var
 
-    def resolve(self, operator, right_type):
-        ''' RationalExpr.resolve() '''
-        if isinstance(self.top_type, UnknownExpr) or isinstance(self.bottom_type, UnknownExpr):
-            return UnknownExpr("cannot determine resultant type of %s(%s, %s)" % (operator, self, right_type))
-
-        op_check = lambda op_type: isinstance(operator, op_type)
-
-        if isinstance(right_type, ConstantExpr):
-            if op_check(PlusOp) or op_check(SubOp):
-                # using (T / B) [+-] c = (T [+-] cB) / B
-                # since B is a polynomial, cB and B are the same types
-                new_top_type = self.top_type.resolve(operator, self.bottom_type)
-                return RationalExpr(new_top_type, self.bottom_type)
-            elif op_check(TimesOp) or op_check(DivideOp):
-                return self
-            elif op_check(ExponentOp):
-                # (T / B) ^ c = (T^c) / (B^c)
-                new_top_type = self.top_type.resolve(operator, right_type)
-                new_bottom_type = self.bottom_type.resolve(operator, right_type)
-                return RationalExpr(new_top_type, new_bottom_type)
-        elif isinstance(right_type, PolynomialExpr):
-            if self.var == right_type.var:
-                if op_check(PlusOp) or op_check(SubOp):
-                    # using (T / B) [+-] P = (T [+-] B*P) / B:
-                    #   new_top is T [+-] B*P
-                    new_top_type = self.top_type.resolve(operator,
-                      self.bottom_type.resolve(TimesOp(), right_type)
-                    )
-                    return RationalExpr(new_top_type, self.bottom_type)
-                elif op_check(TimesOp):
-                    # using (T / B) * P = (T * P) / B
-                    #   new_top is T * P
-                    new_top_type = self.top_type.resolve(TimesOp(), right_type)
-                    return RationalExpr(new_top_type, self.bottom_type)
-                elif op_check(DivideOp):
-                    # using (T / B) / P = (T / B) * (1 / P) = (T / (B * P))
-                    #   new_bottom is B * P
-                    new_bottom_type = self.bottom_type.resolve(TimesOp(), right_type)
-                    return RationalExpr(self.top_type, new_bottom_type)
-        elif isinstance(right_type, RationalExpr):
-            if self.var == right_type.var:
-                if any(map(op_check, [PlusOp, SubOp])):
-                    # using (T1 / B1) [+-] (T2 / B2) = (T1*B2 [+-] B1*T2) / (B1*B2)
-                    T1_times_B2 = self.top_type.resolve(TimesOp(), right_type.bottom_type)
-                    B1_times_T2 = self.bottom_type.resolve(TimesOp(), right_type.top_type)
-                    new_top_type = T1_times_B2.resolve(operator, B1_times_T2)
-
-                    new_bottom_type = self.bottom_type.resolve(TimesOp(), right_type.bottom_type)
-
-                    return RationalExpr(new_top_type, new_bottom_type)
-                elif op_check(TimesOp):
-                    # using (T1/B1) * (T2/B2) = (T1*T2)/(B1*B2)
-                    new_top_type = self.top_type.resolve(TimesOp(), right_type.top_type)
-                    new_bottom_type = self.bottom_type.resolve(TimesOp(), right_type.bottom_type)
-                    return RationalExpr(new_top_type, new_bottom_type)
-                elif op_check(DivideOp):
-                    # using (T1/B1) / (T2/B2) = (T1*B2) / (B1*T2)
-                    new_top_type = self.top_type.resolve(TimesOp(), right_type.bottom_type)
-                    new_bottom_type = self.bottom_type.resolve(TimesOp(), right_type.top_type)
-                    return RationalExpr(new_top_type, new_bottom_type)
-
-        return UnknownExpr("cannot determine resultant type of %s(%s, %s)" % (operator, self, right_type))
+    def is_known(self):
+        ''' Return False if the top or bottom type is an UnknownExpr. '''
+        return self.top_type.is_known() and self.bottom_type.is_known()
 
     def __str__(self):
         result = self.__class__.__name__
@@ -316,6 +309,78 @@ class RationalExpr(Expr):
             return (self.top_type == other.top_type and self.bottom_type == other.bottom_type)
         return False
 
+    def __hash__(self):
+        return hash((self.top_type, self.bottom_type))
+
+class MultivariatePolynomialExpr(Expr):
+    '''
+    A polynomial in two or more variables.
+    '''
+
+    def __init__(self, degrees, total_degree):
+        '''
+        degrees maps each variable (a Var) to its highest power in any term.
+        total_degree is the highest total degree of any term.
+          For example, if n represents "x^2*y + y^3 + 1" then n is an
+          expression of type:
+            MultivariatePolynomialExpr({Var(x): 2, Var(y): 3}, 3)
+        '''
+
+        # kept as (var, degree) pairs, ordered by variable name
+        self.degrees = tuple(sorted(dict(degrees).items(), key = lambda pair: str(pair[0])))
+        self.total_degree = total_degree
+
+    def degree_map(self):
+        return dict(self.degrees)
+
+    def variables(self):
+        return [var for var, _ in self.degrees]
+
+    def __str__(self):
+        result = self.__class__.__name__
+        result += "[%s, degree=%s]" % (
+            ", ".join("%s^%s" % (var, degree) for var, degree in self.degrees),
+            self.total_degree
+        )
+        return result
+
+    def __eq__(self, other):
+        if type(self) == type(other):
+            return (self.degrees == other.degrees and self.total_degree == other.total_degree)
+        return False
+
+    def __hash__(self):
+        return hash((self.degrees, self.total_degree))
+
+def is_polynomial(expr_type):
+    ''' Return True if expr_type is a constant, or a polynomial in any number of variables. '''
+    return isinstance(expr_type, PolynomialExpr) or isinstance(expr_type, MultivariatePolynomialExpr)
+
+def polynomial_degrees(expr_type):
+    '''
+    Return (degrees, total_degree) for a polynomial type, where degrees maps
+    each variable to its degree. Constants have no variables.
+    '''
+    if isinstance(expr_type, MultivariatePolynomialExpr):
+        return expr_type.degree_map(), expr_type.total_degree
+    if isinstance(expr_type, ConstantExpr) or expr_type.degree == 0:
+        return {}, 0
+    return {expr_type.var: expr_type.degree}, expr_type.degree
+
+def polynomial_from_degrees(degrees, total_degree):
+    '''
+    Return the simplest polynomial type with the given degrees: a
+    MultivariatePolynomialExpr for two or more variables, otherwise a
+    PolynomialExpr (or ConstantExpr(1), for x^0 * y^0 and such).
+    '''
+    degrees = dict((var, degree) for var, degree in degrees.items() if degree != 0)
+    if len(degrees) == 0:
+        return ConstantExpr(1)
+    if len(degrees) == 1:
+        var, degree = list(degrees.items())[0]
+        return PolynomialExpr(var, degree)
+    return MultivariatePolynomialExpr(degrees, total_degree)
+
 class ExponentialExpr(Expr):
     '''
     Represents a constant to the power of a variable '''
@@ -329,21 +394,6 @@ class ExponentialExpr(Expr):
         self.var  = var
         self.base = base
 
-    def resolve(self, operator, right_type):
-
-        op_check = lambda op: isinstance(operator, op)
-
-        if isinstance(right_type, ConstantExpr):
-            if any(map(op_check, [PlusOp, SubOp])):
-                return UnknownExpr(info = "Cannot determine resultant type for %s(%s, %s)" % (operator, self, right_type))
-            elif any(map(op_check, [TimesOp, DivideOp])):
-                # (2^x)*c and (2^x) / c are still exponential
-                return ExponentialExpr(self.var, base = self.base)
-            elif op_check(ExponentOp):
-                return self
-
-        return UnknownExpr()
-
     def __repr__(self):
         return str(self)
 
@@ -361,4 +411,276 @@ class ExponentialExpr(Expr):
     def __eq__(self, other):
         if type(self) == type(other):
             return (self.base == other.base and self.var == other.var)
-        return True
+        return False
+
+    def __hash__(self):
+        return hash((self.var, self.base))
+
+########################################
+# RESOLUTION RULES
+########################################
+
+# A rule function takes (left_type, operator, right_type) and returns the
+# resulting type, or None if it can't tell (this becomes an UnknownExpr).
+RESOLUTION_RULES = {}
+
+# find_rule() results, keyed by the exact classes looked up
+RULE_CACHE = {}
+
+# resolve() results, keyed by (left_type, operator class, right_type)
+RESOLUTION_MEMO = {}
+RESOLUTION_MEMO_SIZE = 4096
+
+def register_rule(left_kind, operator_classes, right_kind, rule, commutative = False):
+    '''
+    Use rule to resolve '<left_kind> <OP> <right_kind>' for each OP
+    in operator_classes.
+
+    If commutative is True, rule also resolves '<right_kind> <OP> <left_kind>',
+    with its arguments swapped back into (left_kind, OP, right_kind) order.
+    This is only a statement about types, so it may hold for an operator
+    that isn't commutative. Ex: P - c and c - P are both polynomials.
+    '''
+    for op_class in operator_classes:
+        RESOLUTION_RULES[(left_kind, op_class, right_kind)] = rule
+        if commutative and left_kind != right_kind:
+            RESOLUTION_RULES[(right_kind, op_class, left_kind)] = (
+                lambda left, operator, right: rule(right, operator, left)
+            )
+    RULE_CACHE.clear()
+
+def find_rule(left_class, op_class, right_class):
+    '''
+    Return the rule for the given classes, or None.
+
+    Subclasses use the rules of their base classes (ImplicitMultOp uses
+    the TimesOp rules, for example), with the most specific rule winning.
+    '''
+    key = (left_class, op_class, right_class)
+    if key in RULE_CACHE:
+        return RULE_CACHE[key]
+
+    rule = None
+    for left_kind in left_class.__mro__:
+        for op_kind in op_class.__mro__:
+            for right_kind in right_class.__mro__:
+                rule = RESOLUTION_RULES.get((left_kind, op_kind, right_kind))
+                if rule != None:
+                    break
+            if rule != None:
+                break
+        if rule != None:
+            break
+
+    RULE_CACHE[key] = rule
+    return rule
+
+#### ConstantExpr on the left
+
+def constant_with_constant(left, operator, right):
+    return ConstantExpr(operator.apply(left.value, right.value))
+
+def constant_with_polynomial(left, operator, right):
+    # c [+-*] P
+    return right
+
+def constant_over_polynomial(left, operator, right):
+    # c / x, for example
+    return RationalExpr(ConstantExpr(left.value, var = right.var), right)
+
+def constant_to_polynomial(left, operator, right):
+    if right.degree == 1:
+        return ExponentialExpr(right.var, base = left.value)
+
+def constant_over_rational(left, operator, right):
+    if not right.is_known():
+        return None
+    # c / (T / B) = cB / T
+    new_top_type = left.resolve(TimesOp(), right.bottom_type)
+    return RationalExpr(new_top_type, right.top_type)
+
+def constant_with_exponential(left, operator, right):
+    # c * (2^x) and c / (2^x)
+    return right
+
+register_rule(ConstantExpr, [PlusOp, SubOp, TimesOp, DivideOp, ModulusOp, ExponentOp],
+    ConstantExpr, constant_with_constant)
+register_rule(ConstantExpr, [PlusOp, SubOp, TimesOp], PolynomialExpr, constant_with_polynomial,
+    commutative = True)
+register_rule(ConstantExpr, [DivideOp], PolynomialExpr, constant_over_polynomial)
+register_rule(ConstantExpr, [ExponentOp], PolynomialExpr, constant_to_polynomial)
+register_rule(ConstantExpr, [DivideOp], RationalExpr, constant_over_rational)
+register_rule(ConstantExpr, [TimesOp, DivideOp], ExponentialExpr, constant_with_exponential)
+
+#### PolynomialExpr on the left
+
+def polynomial_over_constant(left, operator, right):
+    return left
+
+def polynomial_to_constant(left, operator, right):
+    # not sure if I want to apply this to non-integer exponents
+    return PolynomialExpr(left.var, degree = left.degree * right.value)
+
+def polynomial_plus_polynomial(left, operator, right):
+    if left.var == right.var:
+        return PolynomialExpr(left.var, max(left.degree, right.degree))
+    return multivariate_plus_polynomial(left, operator, right)
+
+def polynomial_times_polynomial(left, operator, right):
+    if left.var == right.var:
+        return PolynomialExpr(left.var, left.degree + right.degree)
+    return multivariate_times_polynomial(left, operator, right)
+
+def polynomial_over_polynomial(left, operator, right):
+    if left.var == right.var:
+        return RationalExpr(left, right)
+
+def polynomial_over_rational(left, operator, right):
+    if right.is_known() and left.var == right.var:
+        # P / (T / B) = P*B / T --> top = P * B, bottom = T
+        new_top_degree = left.degree + right.bottom_type.degree
+        new_top_type = PolynomialExpr(left.var, new_top_degree)
+        return RationalExpr(new_top_type, right.top_type)
+
+register_rule(PolynomialExpr, [DivideOp], ConstantExpr, polynomial_over_constant)
+register_rule(PolynomialExpr, [ExponentOp], ConstantExpr, polynomial_to_constant)
+register_rule(PolynomialExpr, [PlusOp, SubOp], PolynomialExpr, polynomial_plus_polynomial)
+register_rule(PolynomialExpr, [TimesOp], PolynomialExpr, polynomial_times_polynomial)
+register_rule(PolynomialExpr, [DivideOp], PolynomialExpr, polynomial_over_polynomial)
+register_rule(PolynomialExpr, [DivideOp], RationalExpr, polynomial_over_rational)
+
+#### RationalExpr on the left
+# Each of these returns None when a rational's top or bottom is unknown.
+
+def rational_plus_constant(left, operator, right):
+    if left.is_known():
+        # using (T / B) [+-] c = (T [+-] cB) / B
+        # since B is a polynomial, cB and B are the same types
+        new_top_type = left.top_type.resolve(operator, left.bottom_type)
+        return RationalExpr(new_top_type, left.bottom_type)
+
+def rational_times_constant(left, operator, right):
+    if left.is_known():
+        return left
+
+def rational_to_constant(left, operator, right):
+    if left.is_known():
+        # (T / B) ^ c = (T^c) / (B^c)
+        new_top_type = left.top_type.resolve(operator, right)
+        new_bottom_type = left.bottom_type.resolve(operator, right)
+        return RationalExpr(new_top_type, new_bottom_type)
+
+def rational_plus_polynomial(left, operator, right):
+    if left.is_known() and right.is_known() and left.var == right.var:
+        # using (T / B) [+-] P = (T [+-] B*P) / B:
+        #   new_top is T [+-] B*P
+        new_top_type = left.top_type.resolve(operator,
+          left.bottom_type.resolve(TimesOp(), right)
+        )
+        return RationalExpr(new_top_type, left.bottom_type)
+
+def rational_times_polynomial(left, operator, right):
+    if left.is_known() and right.is_known() and left.var == right.var:
+        # using (T / B) * P = (T * P) / B
+        #   new_top is T * P
+        new_top_type = left.top_type.resolve(TimesOp(), right)
+        return RationalExpr(new_top_type, left.bottom_type)
+
+def rational_over_polynomial(left, operator, right):
+    if left.is_known() and right.is_known() and left.var == right.var:
+        # using (T / B) / P = (T / B) * (1 / P) = (T / (B * P))
+        #   new_bottom is B * P
+        new_bottom_type = left.bottom_type.resolve(TimesOp(), right)
+        return RationalExpr(left.top_type, new_bottom_type)
+
+def rational_plus_rational(left, operator, right):
+    if left.is_known() and right.is_known() and left.var == right.var:
+        # using (T1 / B1) [+-] (T2 / B2) = (T1*B2 [+-] B1*T2) / (B1*B2)
+        T1_times_B2 = left.top_type.resolve(TimesOp(), right.bottom_type)
+        B1_times_T2 = left.bottom_type.resolve(TimesOp(), right.top_type)
+        new_top_type = T1_times_B2.resolve(operator, B1_times_T2)
+
+        new_bottom_type = left.bottom_type.resolve(TimesOp(), right.bottom_type)
+
+        return RationalExpr(new_top_type, new_bottom_type)
+
+def rational_times_rational(left, operator, right):
+    if left.is_known() and right.is_known() and left.var == right.var:
+        # using (T1/B1) * (T2/B2) = (T1*T2)/(B1*B2)
+        new_top_type = left.top_type.resolve(TimesOp(), right.top_type)
+        new_bottom_type = left.bottom_type.resolve(TimesOp(), right.bottom_type)
+        return RationalExpr(new_top_type, new_bottom_type)
+
+def rational_over_rational(left, operator, right):
+    if left.is_known() and right.is_known() and left.var == right.var:
+        # using (T1/B1) / (T2/B2) = (T1*B2) / (B1*T2)
+        new_top_type = left.top_type.resolve(TimesOp(), right.bottom_type)
+        new_bottom_type = left.bottom_type.resolve(TimesOp(), right.top_type)
+        return RationalExpr(new_top_type, new_bottom_type)
+
+register_rule(RationalExpr, [PlusOp, SubOp], ConstantExpr, rational_plus_constant,
+    commutative = True)
+register_rule(RationalExpr, [TimesOp], ConstantExpr, rational_times_constant,
+    commutative = True)
+register_rule(RationalExpr, [DivideOp], ConstantExpr, rational_times_constant)
+register_rule(RationalExpr, [ExponentOp], ConstantExpr, rational_to_constant)
+register_rule(RationalExpr, [PlusOp, SubOp], PolynomialExpr, rational_plus_polynomial,
+    commutative = True)
+register_rule(RationalExpr, [TimesOp], PolynomialExpr, rational_times_polynomial,
+    commutative = True)
+register_rule(RationalExpr, [DivideOp], PolynomialExpr, rational_over_polynomial)
+register_rule(RationalExpr, [PlusOp, SubOp], RationalExpr, rational_plus_rational)
+register_rule(RationalExpr, [TimesOp], RationalExpr, rational_times_rational)
+register_rule(RationalExpr, [DivideOp], RationalExpr, rational_over_rational)
+
+#### ExponentialExpr on the left
+
+def exponential_times_constant(left, operator, right):
+    # (2^x)*c and (2^x) / c are still exponential
+    return ExponentialExpr(left.var, base = left.base)
+
+def exponential_to_constant(left, operator, right):
+    return left
+
+register_rule(ExponentialExpr, [TimesOp, DivideOp], ConstantExpr, exponential_times_constant)
+register_rule(ExponentialExpr, [ExponentOp], ConstantExpr, exponential_to_constant)
+
+#### MultivariatePolynomialExpr on the left
+# These also handle univariate polynomials of different variables.
+
+def multivariate_plus_polynomial(left, operator, right):
+    # each variable keeps its highest degree in either polynomial
+    degrees, total_degree = polynomial_degrees(left)
+    right_degrees, right_total_degree = polynomial_degrees(right)
+    for var, degree in right_degrees.items():
+        degrees[var] = max(degrees.get(var, 0), degree)
+    return polynomial_from_degrees(degrees, max(total_degree, right_total_degree))
+
+def multivariate_times_polynomial(left, operator, right):
+    # degrees add, for each variable and in total
+    degrees, total_degree = polynomial_degrees(left)
+    right_degrees, right_total_degree = polynomial_degrees(right)
+    for var, degree in right_degrees.items():
+        degrees[var] = degrees.get(var, 0) + degree
+    return polynomial_from_degrees(degrees, total_degree + right_total_degree)
+
+def multivariate_over_constant(left, operator, right):
+    return left
+
+def multivariate_to_constant(left, operator, right):
+    # only whole powers keep this a polynomial
+    power = right.value
+    if isinstance(power, numbers.Integral) and power >= 0:
+        degrees = dict((var, degree * power) for var, degree in left.degrees)
+        return polynomial_from_degrees(degrees, left.total_degree * power)
+
+register_rule(MultivariatePolynomialExpr, [PlusOp, SubOp], MultivariatePolynomialExpr,
+    multivariate_plus_polynomial)
+register_rule(MultivariatePolynomialExpr, [PlusOp, SubOp], PolynomialExpr,
+    multivariate_plus_polynomial, commutative = True)
+register_rule(MultivariatePolynomialExpr, [TimesOp], MultivariatePolynomialExpr,
+    multivariate_times_polynomial)
+register_rule(MultivariatePolynomialExpr, [TimesOp], PolynomialExpr,
+    multivariate_times_polynomial, commutative = True)
+register_rule(MultivariatePolynomialExpr, [DivideOp], ConstantExpr, multivariate_over_constant)
+register_rule(MultivariatePolynomialExpr, [ExponentOp], ConstantExpr, multivariate_to_constant)
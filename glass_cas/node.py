@@ -1,5 +1,6 @@
 from . import visitors
-import numbers
+from .budget import current_budget
+import numbers, weakref
 
 class node(object):
 
@@ -14,25 +15,138 @@ class node(object):
 
         By default, n.expr_type is None. To assign the types for n and all
             children you must explicitly call n.assign_types().
+            n.type_dirty is True when n's children have been replaced since
+            n.expr_type was set, and n.descendant_dirty is True when that
+            happened to one of its descendants instead. See node.set_child
+            and node.update_types.
+
+        If a budget.Budget is active, each new node is charged to it.
         '''
+        budget = current_budget()
+        if budget != None:
+            budget.charge()
+
+        # weak references to the nodes whose types were resolved from
+        # this node's type (a subtree can be shared between trees)
+        self.typed_parents = None
+        self.descendant_dirty = False
+
         # copy constructor
         if isinstance(v, node):
             self.value = v.value
-            self.expr_type = v.expr_type 
             self.children = [node(i) for i in v.children]
+            self.expr_type = v.expr_type 
+            self.type_dirty = v.type_dirty
+            self.descendant_dirty = v.descendant_dirty
         # ordinary constructor
         else:
             self.value = v
             self.children = []
             self.expr_type = None
 
+    @property
+    def expr_type(self):
+        return self._expr_type
+
+    @expr_type.setter
+    def expr_type(self, expr_type):
+        # setting the type brings it up to date
+        self._expr_type = expr_type
+        self.type_dirty = False
+
+        if expr_type != None and len(self.children) > 0:
+            parent = weakref.ref(self)
+            for child in self.children:
+                if child.typed_parents == None:
+                    child.typed_parents = [parent]
+                elif parent not in child.typed_parents:
+                    child.typed_parents.append(parent)
+                if child.type_dirty or child.descendant_dirty:
+                    self.descendant_dirty = True
 
-    def accept(self, visitor):
-        return visitor.visit(self)
+
+    def accept(self, visitor, budget = None):
+        '''
+        Return visitor.visit(self).
+
+        If budget (a budget.Budget) is given, the visit runs under it
+        and raises a budget.BudgetExceededError if it runs out.
+        '''
+        if budget == None:
+            return visitor.visit(self)
+
+        token = budget.activate()
+        try:
+            result = visitor.visit(self)
+        finally:
+            budget.deactivate(token)
+        budget.check_output(result)
+        return result
 
     def assign_types(self):
         self.accept(visitors.Recognizer(assign_types = True))
 
+    def set_child(self, i, child):
+        '''
+        Replace the i-th child with child, and mark this node's type
+        as out of date (if child is not already the i-th child), along
+        with the nodes whose types were resolved from it.
+        '''
+        if self.children[i] is not child:
+            self.children[i] = child
+            self.type_dirty = True
+            self.mark_ancestors_dirty()
+
+    def mark_ancestors_dirty(self):
+        frontier = [self]
+        while frontier:
+            n = frontier.pop()
+            for ref in n.typed_parents or ():
+                parent = ref()
+                if parent != None and not parent.descendant_dirty:
+                    parent.descendant_dirty = True
+                    frontier.append(parent)
+
+    def update_types(self):
+        '''
+        Bring expr_type up to date for this node and all its descendants,
+        and return it.
+
+        Only nodes without a type, marked out of date by set_child, or
+        with a child whose type changed are re-resolved, each from its
+        children's cached types. set_child also marks the nodes whose
+        types were resolved from the changed node, so only the paths to
+        changed nodes are walked: if one node is replaced, however deep,
+        just the new subtree and the nodes on its path to the root are
+        visited.
+        '''
+        self.refresh_types()
+        return self.expr_type
+
+    def refresh_types(self):
+        '''
+        Do the work of update_types, and return True if this node's type
+        changed (so its parent must be re-resolved).
+        '''
+        if self.expr_type != None and not self.type_dirty and not self.descendant_dirty:
+            return False
+
+        children_changed = False
+        for child in self.children:
+            if child.refresh_types():
+                children_changed = True
+        self.descendant_dirty = False
+
+        if self.expr_type != None and not self.type_dirty and not children_changed:
+            return False
+
+        old_type = self.expr_type
+        child_types = [child.expr_type for child in self.children]
+        self.expr_type = visitors.Recognizer.resolve_node(self.value, child_types)
+        # types are interned, and equal types can differ (ConstantExpr(2)
+        # == ConstantExpr(2.0)), so compare the instances
+        return self.expr_type is not old_type
+
     def copy(self, value = None, recursive = False):
         '''
         This allows us to use node instances to create new nodes
@@ -71,6 +185,9 @@ class node(object):
         This does no other checks on the input, except for those done 
             by the node constructor when node(value) is called.
 
+        If assign_types is True, the result's type is resolved from the
+            children's cached types (see node.update_types), so only
+            children without a type are recognized.
         '''
             
         result = node(value)
@@ -78,7 +195,7 @@ class node(object):
         if right_child != None:
             result.children.append(right_child)
         if assign_types:
-            result.assign_types()
+            result.update_types()
         return result
 
     def strict_match(self, other):
@@ -108,7 +225,9 @@ class node(object):
 
         return self.accept(visitors.Printer(mode = mode))
 
-    def reduce(self, replace_constants = False):
+    def reduce(self, replace_constants = False, fuse = True,
+               max_bits = visitors.Reducer.DEFAULT_MAX_BITS, budget = None,
+               assign_types = False):
         '''
         Computes and returns the value of this node.
         This does not alter this instance at all.
@@ -116,11 +235,90 @@ class node(object):
         replace_constants = True will replace Constant objects with an
           approximate numeric values, e.g., E() becomes 2.7182818...
         replace_constants = False will leave E() in the tree.
+
+        fuse = True will first rewrite expensive patterns with visitors.Fuser,
+          e.g., (a^b) % m is computed as powmod(a, b, m).
+        fuse = False reduces the tree exactly as it is.
+
+        Operations whose integer results are estimated to need more than
+          max_bits bits are left unevaluated, e.g. '100000!'.
+          Use max_bits = None to force exact evaluation.
+
+        budget is an optional budget.Budget limiting the work done.
+
+        assign_types = True also sets expr_type on every node of the result,
+          in the same pass (see visitors.TypedReducer). This is cheaper than
+          calling assign_types() on the result.
+        '''
+
+        tree = self
+        if fuse:
+            tree = self.accept(visitors.Fuser(), budget = budget)
+        reducer_class = visitors.Reducer
+        if assign_types:
+            reducer_class = visitors.TypedReducer
+        reducer = reducer_class(replace_constants = replace_constants, max_bits = max_bits)
+        return tree.accept(reducer, budget = budget)
+
+    def specialize(self, bindings, params = None):
         '''
+        Partially evaluate this tree, given values for some of its symbols.
+        This does not alter this instance at all.
 
-        return self.accept(visitors.Reducer(replace_constants = replace_constants))
+        bindings is a dict mapping symbols (Var objects or names) to
+            numbers or nodes.
+        If params is None, return the residual tree over the remaining
+            symbols, with every fully numeric subtree folded.
+        Otherwise, return the residual tree compiled to a Python function
+            of params (see node.compile), or None if it can't be compiled.
+        Ex: if n represents '(a*x + b) ^ c', then
+            n.specialize({'a': 2, 'b': 0, 'c': 1})
+        represents '2 * x', and
+            n.specialize({'a': 2, 'b': 0, 'c': 1}, ['x'])(5) == 10
+        '''
+
+        result = self.accept(visitors.Specializer(bindings))
+        if params != None:
+            return result.compile(params)
+        return result
 
     def replace(self, symbol, expr):
         ''' Replace all occurrences of symbol with expr. '''
 
         return self.accept(visitors.Replacer(symbol, expr))
+
+    def replace_all(self, replacements):
+        '''
+        Replace all occurrences of each symbol in replacements with
+        the corresponding expression, simultaneously and in one pass.
+
+        replacements is a dict mapping symbols (Var objects or names)
+            to expressions (nodes or plain values).
+        Ex: if n represents 'x + y', then
+            n.replace_all({'x': Var('y'), 'y': Var('x')})
+        represents 'y + x'.
+
+        The result may share subtrees with this tree and with the
+        replacement expressions.
+        '''
+
+        return self.accept(visitors.Replacer(replacements = replacements))
+
+    def symbols(self):
+        '''
+        Return a list of the Var and UserFunction objects referenced
+        in this tree, without duplicates.
+        '''
+
+        return self.accept(visitors.SymbolFinder())
+
+    def compile(self, params):
+        '''
+        Compile this tree into a Python function of len(params) numeric
+        arguments, where params is a list of symbols (Var objects or names).
+        Returns None if this tree cannot be compiled.
+        Ex: if n represents '3*x + y', then
+            n.compile(['x', 'y'])(1, 2) == 5
+        '''
+
+        return self.accept(visitors.Compiler(params))
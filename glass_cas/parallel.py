@@ -0,0 +1,163 @@
+'''
+parallel.py
+
+This expands large products of polynomials across a pool of worker
+processes.
+
+expand_in_parallel(tree) splits the terms of the product's largest factor
+into chunks. Each worker multiplies its chunks by all the other factors,
+collecting like terms as it goes, and the partial sums are added up at
+the end. Small products are expanded in this process, since starting
+workers and shipping terms to them costs more than the work saved.
+
+Factors are shipped in a compact encoding: one table of symbols, and each
+term as a tuple of exponents (one per symbol in the table) with its
+coefficient. The other factors are shipped once per worker, not once per
+chunk.
+
+Ex:
+    tree = parser.parse("(a + b + ... ) * (c + d + ...) * (e + f + ...)")
+    result = expand_in_parallel(tree, processes = 8)
+'''
+
+from .parsing.parser_definitions import *
+from .polynomial import Polynomial
+from .budget import current_budget
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+# products needing fewer term multiplications than this are expanded serially
+PARALLEL_THRESHOLD = 200000
+
+# each worker gets about this many chunks, so uneven chunks even out
+CHUNKS_PER_PROCESS = 4
+
+def expand_in_parallel(tree, processes = None, threshold = PARALLEL_THRESHOLD):
+    '''
+    Return the expansion of tree, like ExpandOp. If tree is a product of
+    polynomials needing at least threshold term multiplications, the
+    work is split across processes worker processes (by default, one per
+    CPU). Otherwise tree is expanded in this process.
+
+    The result is the same either way: the product's polynomial, with
+    like terms collected (see polynomial.Polynomial.to_tree).
+    '''
+    if processes == None:
+        processes = os.cpu_count() or 1
+
+    factors = product_factors(tree)
+    if (processes < 2 or len(factors) < 2 or
+        not all(Polynomial.is_polynomial_tree(f) for f in factors)
+        ):
+        return ExpandOp().apply(tree)
+
+    polynomials = [Polynomial.convert(f) for f in factors]
+    work = 1
+    for p in polynomials:
+        work *= len(p)
+    if work < threshold:
+        return ExpandOp().apply(tree)
+
+    # split the largest factor, so there are enough chunks to go around
+    largest = max(range(len(polynomials)), key = lambda i: len(polynomials[i]))
+    split = polynomials.pop(largest)
+
+    symbols = symbol_table([split] + polynomials)
+    others = [encode(p, symbols) for p in polynomials]
+    chunks = split_terms(encode(split, symbols), processes * CHUNKS_PER_PROCESS)
+
+    budget = current_budget()
+    result = {}
+    with ProcessPoolExecutor(max_workers = processes,
+                             initializer = set_factors, initargs = (others,)) as executor:
+        for partial in executor.map(multiply_chunk, chunks):
+            if budget != None:
+                budget.check()
+            add_into(result, partial)
+    return decode(result, symbols).to_tree(tree)
+
+def product_factors(tree):
+    ''' Return the factors of the product tree, or [tree] if it isn't a product. '''
+    if not isinstance(tree.value, TimesOp):
+        return [tree]
+
+    result = []
+    for child in tree.children:
+        result.extend(product_factors(child))
+    return result
+
+def symbol_table(polynomials):
+    ''' Return the symbols in any of the polynomials, ordered by name. '''
+    symbols = {}
+    for p in polynomials:
+        for symbol in p.symbols():
+            symbols[str(symbol)] = symbol
+    return [symbols[name] for name in sorted(symbols)]
+
+def encode(p, symbols):
+    '''
+    Return the terms of the Polynomial p as a list of
+    (exponents, coefficient) pairs, where exponents[i] is the
+    exponent of symbols[i].
+    '''
+    index = dict((str(symbol), i) for i, symbol in enumerate(symbols))
+    result = []
+    for monomial, coefficient in p.terms.items():
+        exponents = [0] * len(symbols)
+        for symbol, exponent in monomial:
+            exponents[index[str(symbol)]] = exponent
+        result.append((tuple(exponents), coefficient))
+    return result
+
+def decode(terms, symbols):
+    ''' Return the Polynomial for a dict mapping exponent tuples to coefficients. '''
+    result = {}
+    for exponents, coefficient in terms.items():
+        monomial = tuple((symbol, e) for symbol, e in zip(symbols, exponents) if e != 0)
+        result[monomial] = coefficient
+    return Polynomial(result)
+
+def split_terms(terms, count):
+    ''' Split the list terms into at most count chunks of nearly equal size. '''
+    size = max(1, -(-len(terms) // count))
+    return [terms[i:i+size] for i in range(0, len(terms), size)]
+
+def add_into(result, terms):
+    ''' Add the (exponents, coefficient) pairs in terms into the dict result. '''
+    for exponents, coefficient in terms:
+        total = result.get(exponents, 0) + coefficient
+        if total == 0:
+            result.pop(exponents, None)
+        else:
+            result[exponents] = total
+
+def multiply(terms, other):
+    ''' Return the product of two encoded polynomials, as a dict. '''
+    result = {}
+    for a, a_coefficient in terms:
+        for b, b_coefficient in other:
+            exponents = tuple(x + y for x, y in zip(a, b))
+            result[exponents] = result.get(exponents, 0) + a_coefficient * b_coefficient
+    return result
+
+########################################
+# WORKER PROCESSES
+########################################
+
+# the encoded factors every chunk is multiplied by, set by set_factors
+FACTORS = None
+
+def set_factors(factors):
+    global FACTORS
+    FACTORS = factors
+
+def multiply_chunk(chunk):
+    '''
+    Multiply the encoded terms in chunk by every factor in FACTORS,
+    collecting like terms after each factor. Returns a list of
+    (exponents, coefficient) pairs.
+    '''
+    terms = chunk
+    for factor in FACTORS:
+        terms = [(e, c) for e, c in multiply(terms, factor).items() if c != 0]
+    return terms
@@ -31,7 +31,7 @@ This also contains dictionaries that map string tokens to classes:
       'd/dx' : DeriviativeOp,
 '''
 
-import cmath, math
+import cmath, math, numbers
 
 REAL_NUMBER_CHARS = list('0123456789.')
 NUMBER_CHARS = REAL_NUMBER_CHARS + ['j'] # Use 'j' as sqrt(-1)
@@ -286,11 +286,32 @@ class LogTenOp(PrefixOp):
         self.check_operands(*operands)
         return cmath.log10(operands[0])
 
+class PowModOp(PrefixOp):
+    '''
+    powmod(a, b, m) is (a ^ b) % m, computed without materializing a ^ b
+    when a, b, and m are integers (and b >= 0).
+    '''
+    def __init__(self):
+        super().__init__('powmod', precedence=3, associativity=RIGHT, num_operands=3)
+
+    def apply(self, *operands):
+        self.check_operands(*operands)
+        base, exponent, modulus = operands
+        if (all(isinstance(x, int) for x in operands) and
+            exponent >= 0 and modulus != 0
+            ):
+            return pow(base, exponent, modulus)
+        return ModulusOp().apply(ExponentOp().apply(base, exponent), modulus)
+
 class ExpandOp(PrefixOp):
     def __init__(self):
         super().__init__('expand', precedence=1, associativity=RIGHT, num_operands=1)
 
-    def apply(self, *operands):
+    def apply(self, *operands, budget = None):
+        '''
+        Expand the tree operands[0].
+        budget is an optional budget.Budget limiting the work done.
+        '''
         # TODO: I don't like this import here.
         # this is to avoid circular imports since visitors imports parser_definitions
         # Solutions?
@@ -299,28 +320,134 @@ class ExpandOp(PrefixOp):
         #   -- rethink the organization/architecture of the whole program
         #   -- or, leave the import here
         from ..visitors import Expander
+        from ..polynomial import PolynomialVisitor
 
         self.check_operands(*operands)
-        result = Expander().visit(operands[0])
+        # polynomials are expanded by polynomial arithmetic instead
+        result = operands[0].accept(PolynomialVisitor(), budget = budget)
+        if result == None:
+            result = operands[0].accept(Expander(), budget = budget)
         return result
 
 class SimplifyOp(PrefixOp):
+
+    # an optional simplify_cache.SimplifyCache, shared by every simplify
+    cache = None
+
     def __init__(self):
         super().__init__('simplify', precedence=1, associativity=RIGHT, num_operands=1)
 
-    def apply(self, *operands):
+    def apply(self, *operands, budget = None):
+        '''
+        Simplify the tree operands[0].
+        budget is an optional budget.Budget limiting the work done.
+        If SimplifyOp.cache is set, results are memoized there.
+        '''
         # TODO: I don't like this import here (same as with expand)
         from ..visitors import Simplifier
+        from ..polynomial import PolynomialVisitor
+        from ..simplify_cache import structural_key
 
         self.check_operands(*operands)
-        result = Simplifier().visit(operands[0])
+
+        key = None
+        if self.cache != None:
+            key = structural_key(operands[0])
+            if key != None:
+                result = self.cache.lookup("simplify:" + key, operands[0])
+                if result != None:
+                    return result
+
+        # a polynomial's simplest form is its expanded form
+        result = operands[0].accept(PolynomialVisitor(), budget = budget)
+        if result == None:
+            result = operands[0].accept(Simplifier(cache = self.cache), budget = budget)
+
+        if key != None:
+            self.cache.store("simplify:" + key, result)
         return result
 
+class PolynomialDivisionOp(PrefixOp):
+    '''
+    Base class for quo, rem and divmod, which divide one polynomial by
+    another in the same variable (see polynomial.Polynomial.divide).
+    Like expand and simplify, these take trees and return a tree. If the
+    operands aren't polynomials in one variable, apply returns None, and
+    the node is left as it is.
+    '''
+    def __init__(self, name, result):
+        '''
+        result(dividend, divisor, quotient, remainder) returns the result
+            tree, given the operand trees and the Polynomials quotient
+            and remainder.
+        '''
+        super().__init__(name, precedence=3, associativity=RIGHT, num_operands=2)
+        self.result = result
+
+    def apply(self, *operands):
+        '''
+        Divide the tree operands[0] by the tree operands[1].
+        Raises ZeroDivisionError if operands[1] is 0.
+        '''
+        from ..polynomial import Polynomial, NotPolynomialError
+
+        self.check_operands(*operands)
+        dividend, divisor = operands[0], operands[1]
+        if (not Polynomial.is_polynomial_tree(dividend) or
+            not Polynomial.is_polynomial_tree(divisor)
+            ):
+            return None
+        try:
+            quotient, remainder = Polynomial.convert(dividend).divide(Polynomial.convert(divisor))
+        except NotPolynomialError:
+            return None
+        return self.result(dividend, divisor, quotient, remainder)
+
+class QuotientOp(PolynomialDivisionOp):
+    ''' quo(a, b) is the quotient of a divided by b: quo(x^2 + 1, x + 1) --> -1 + x '''
+    def __init__(self):
+        super().__init__('quo', QuotientOp.quotient_tree)
+
+    @staticmethod
+    def quotient_tree(dividend, divisor, quotient, remainder):
+        return quotient.to_tree(dividend)
+
+class RemainderOp(PolynomialDivisionOp):
+    ''' rem(a, b) is the remainder of a divided by b: rem(x^2 + 1, x + 1) --> 2 '''
+    def __init__(self):
+        super().__init__('rem', RemainderOp.remainder_tree)
+
+    @staticmethod
+    def remainder_tree(dividend, divisor, quotient, remainder):
+        return remainder.to_tree(dividend)
+
+class DivModOp(PolynomialDivisionOp):
+    '''
+    divmod(a, b) is the equation a = (b * quotient) + remainder:
+        divmod(x^2 + 1, x + 1) --> (x^2 + 1) = (((x + 1) * (-1 + x)) + 2)
+    '''
+    def __init__(self):
+        super().__init__('divmod', DivModOp.equation_tree)
+
+    @staticmethod
+    def equation_tree(dividend, divisor, quotient, remainder):
+        product = dividend.construct(divisor.copy(recursive = True), TimesOp(), quotient.to_tree(dividend))
+        right = dividend.construct(product, PlusOp(), remainder.to_tree(dividend))
+        return dividend.construct(dividend.copy(recursive = True), EqualsOp(), right)
+
 ########################################
 # USER-DEFINED FUNCTION/OPERATOR
 ########################################
+class NotNumericError(ValueError):
+    ''' Raised when an expression cannot be evaluated to a number. '''
+    pass
+
 class UserFunction(PrefixOp):
     ''' Represent f[v1, v2, ..., vn] = <expression> '''
+
+    # an optional call_cache.CallCache used to memoize apply()
+    call_cache = None
+
     def __init__(self, name, operand_list=[], value=None):
         super().__init__(
             name=name,
@@ -332,6 +459,19 @@ class UserFunction(PrefixOp):
         self.operand_list = operand_list
         self.value = value
 
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, body):
+        ''' Setting the body (re)defines this function, so drop the compiled form. '''
+        self._value = body
+        self._compiled = None
+        self._is_compiled = False
+        if self.call_cache != None:
+            self.call_cache.invalidate(self.name)
+
     def __str__(self):
         result = str(self.name)
         result += '['
@@ -358,25 +498,99 @@ class UserFunction(PrefixOp):
         if len(self.operand_list) > len(operands):
             raise SyntaxError("Not enough operands for %s" % self.name)
 
+    @staticmethod
+    def numeric_value(operand):
+        '''
+        Return the number that operand represents, or None if it is
+        not a number or a leaf node containing a number.
+        '''
+        if hasattr(operand, 'children'):
+            if len(operand.children) > 0:
+                return None
+            operand = operand.value
+        if isinstance(operand, numbers.Number):
+            return operand
+        return None
+
+    def compile(self):
+        '''
+        Return a Python function that evaluates this function's body
+        at numeric arguments, or None if the body can't be compiled
+        (it has free variables, for example).
+
+        The result is cached until this function is redefined.
+        Calls to other user functions in the body go through their
+        own compiled forms, so redefining those doesn't leave a stale
+        compiled body here. (Parser.update_symbol_table redefines a
+        function by updating the existing object, which is the one the
+        body refers to.)
+        '''
+        if not self._is_compiled:
+            self._compiled = None
+            if self.value != None and len(self.operand_list) > 0:
+                self._compiled = self.value.compile(self.operand_list)
+            self._is_compiled = True
+        return self._compiled
+
+    def call(self, *args):
+        '''
+        Evaluate this function at the numbers args and return a number.
+
+        Raises a NotNumericError if the result would not be a number.
+        '''
+        self.check_operands(*args)
+        if self.value != None and len(self.operand_list) == 0:
+            result = UserFunction.numeric_value(self.value)
+            if result != None:
+                return result
+        else:
+            compiled = self.compile()
+            if compiled != None:
+                return compiled(*args)
+        raise NotNumericError("%s cannot be evaluated numerically" % self)
 
     def apply(self, *operands):
-        # print("applying %s%s" % (self.name, operands))
+        '''
+        Substitute operands for this function's parameters in its body
+        and return the reduced result as a node.
+
+        operands may be nodes or plain values (numbers, Vars).
+        If every operand is a number and the body compiles, this uses
+        the compiled body. Otherwise all parameters are substituted in
+        a single pass over the body, which is then reduced.
+
+        If this function has a call_cache, results are memoized there.
+        '''
         if self.value != None:
             self.check_operands(*operands)
 
-            # node.replace works for a single (symbol, value) pair and
-            # produces a copy of the tree for each substitution, which is
-            # both inefficient and ugly to write.
-            if len(operands) > 0:
-                result = self.value.replace(self.operand_list[0], operands[0])
-                for symbol, value in zip(self.operand_list[1:], operands[1:]):
-                    result = result.replace(symbol, value)
-                return result.reduce()
+            if len(operands) > 0 and self.call_cache != None:
+                result = self.call_cache.lookup(self, operands)
+                if result == None:
+                    result = self.evaluate(*operands)
+                    self.call_cache.store(self, operands, result)
+                return result
+            elif len(operands) > 0:
+                return self.evaluate(*operands)
             else:
                 # cannot return the same instance of this function's body
                 return self.value.copy(recursive = True)
         return None
 
+    def evaluate(self, *operands):
+        ''' Compute apply(*operands) for one or more operands, without memoization. '''
+        compiled = self.compile()
+        if compiled != None:
+            args = [UserFunction.numeric_value(x) for x in operands]
+            if all(x != None for x in args):
+                try:
+                    return self.value.copy(value = compiled(*args))
+                except NotNumericError:
+                    pass
+
+        replacements = dict(zip(self.operand_list, operands))
+        return self.value.replace_all(replacements).reduce()
+
 ########################################
 # VARIABLES/CONSTANTS
 ########################################
@@ -396,6 +610,10 @@ class Var(object):
         except:
             return False
 
+    def __hash__(self):
+        # consistent with __eq__, which compares by name
+        return hash(str(self))
+
     def __len__(self):
         return len(self.name)
 
@@ -437,6 +655,10 @@ OP_CLASS_DICT = {
     'tan'   : TanOp,
     'ln'    : LogEOp,
     'log'   : LogTenOp,
+    'powmod': PowModOp,
     'expand': ExpandOp,
     'simplify' : SimplifyOp,
+    'quo'   : QuotientOp,
+    'rem'   : RemainderOp,
+    'divmod': DivModOp,
 }
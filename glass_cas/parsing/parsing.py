@@ -6,14 +6,25 @@ supporting other syntax, like implicit multiplication.
 '''
 
 from ..node import node
+from ..call_cache import CallCache
+from ..dependency_graph import DependencyGraph
 from .parser_definitions import *
 from .parser_util import *
 import numbers
 
 class Parser(object):
 
-    def __init__(self):
+    def __init__(self, memoize = False, memo_size = CallCache.DEFAULT_MAX_SIZE):
+        '''
+        If memoize is True, calls of functions defined through
+        update_symbol_table are memoized in self.call_cache, which
+        keeps at most memo_size results.
+        '''
         self.symbol_table = {}
+        self.dependency_graph = DependencyGraph()
+        self.call_cache = None
+        if memoize:
+            self.call_cache = CallCache(max_size = memo_size)
 
     def parse(self, input_string, update_symbol_table = False):
         '''
@@ -141,6 +152,10 @@ class Parser(object):
                 output.append(token)
             elif token == '(':
                 stack.append(token)
+            elif token == ARG_DELIM:
+                # the previous argument is complete
+                while len(stack) > 0 and stack[-1] != '(':
+                    output.append(stack.pop())
             elif token == ')':
                 while len(stack) > 0 and stack[-1] != '(':
                     output.append(stack.pop())
@@ -222,11 +237,45 @@ class Parser(object):
                 right = root_node.children[1]
                 if (isinstance(left.value, UserFunction) or
                     isinstance(left.value, Var)):
+                    # before anything is redefined, so a circular
+                    # definition leaves the old one in place
+                    self.dependency_graph.check_definition(left.value, right)
+
+                    existing = self.symbol_table.get(left.value.name)
+                    if (isinstance(left.value, UserFunction) and
+                        isinstance(existing, UserFunction)
+                        ):
+                        # redefine the function object already in the table,
+                        # since the bodies (and compiled forms) of the
+                        # functions that call it refer to that object
+                        existing.operand_list = left.value.operand_list
+                        existing.num_operands = len(existing.operand_list)
+                        left.value = existing
                     self.symbol_table[left.value.name] = left.value
                     left.value.value = right
+                    if self.call_cache != None:
+                        # evict results that depended on the old definition
+                        self.call_cache.invalidate(left.value.name)
+                    if isinstance(left.value, UserFunction):
+                        left.value.call_cache = self.call_cache
+                        # compile once here rather than on the first call
+                        left.value.compile()
+                    self.dependency_graph.define(left.value)
                 else:
                     raise SyntaxError("Cannot assign to literal %s" % left.value)
 
+    def watch(self, key, input_string):
+        '''
+        Parse input_string and watch it under key in self.dependency_graph,
+        so that it is recomputed whenever a symbol it depends on is
+        redefined through update_symbol_table. Returns its value.
+        '''
+        return self.dependency_graph.watch(key, self.parse(input_string))
+
+    def watched_value(self, key):
+        ''' Return the current value of the expression watched under key. '''
+        return self.dependency_graph.watched_value(key)
+
 def insert_implicit_mult_ops(tokens):
     '''
     This inserts ImplicitMultOp and TimesOp symbols to support implicit
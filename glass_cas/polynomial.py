@@ -0,0 +1,395 @@
+'''
+polynomial.py
+
+This defines Polynomial, a sparse polynomial in any number of variables,
+stored as a dict mapping monomials to coefficients. Arithmetic on these
+is much cheaper than rewriting trees, so expand and simplify convert
+polynomial trees to a Polynomial, compute, and convert back.
+
+A monomial is a tuple of (symbol, exponent) pairs, ordered by symbol name,
+with every exponent positive. The constant monomial is (). Symbols are the
+Var (or Constant) objects from the tree, so converting back to a tree
+gives the same symbols.
+  Ex: 3*x^2*y - 1/2 is {((x, 2), (y, 1)): 3, (): Fraction(-1, 2)}
+
+Coefficients stay exact: integer inputs give int and Fraction coefficients.
+Float and complex inputs are allowed too, and are computed with as usual.
+
+Ex:
+    p = Polynomial.from_tree(tree)      # tree represents (x+1)^3
+    p.to_tree(tree)                     # represents 1 + 3*x + 3*x^2 + x^3
+'''
+
+from .parsing.parser_definitions import *
+from .budget import current_budget
+from . import univariate
+from fractions import Fraction
+import numbers
+
+class NotPolynomialError(ValueError):
+    ''' Raised when a tree can't be converted to a Polynomial. '''
+    pass
+
+class Polynomial(object):
+
+    # the active budget is checked once per this many term products
+    CHECK_INTERVAL = 4096
+
+    def __init__(self, terms = None):
+        '''
+        terms is a dict mapping monomials to coefficients. Terms with a
+            zero coefficient are dropped. The dict is not copied.
+        '''
+        self.terms = {}
+        if terms != None:
+            self.terms = dict((m, c) for m, c in terms.items() if c != 0)
+
+    @staticmethod
+    def constant(value):
+        return Polynomial({(): value})
+
+    @staticmethod
+    def variable(symbol):
+        return Polynomial({((symbol, 1),): 1})
+
+    @staticmethod
+    def is_polynomial_tree(n):
+        '''
+        Return True if the tree at n can be converted with from_tree.
+        This only looks at the tree's structure, so it is cheap to call
+        before doing any arithmetic.
+        '''
+        if isinstance(n.value, bool):
+            return False
+        if isinstance(n.value, numbers.Number) or isinstance(n.value, Var):
+            return True
+
+        if (isinstance(n.value, PlusOp) or isinstance(n.value, SubOp) or
+            isinstance(n.value, TimesOp) or isinstance(n.value, NegationOp)
+            ):
+            return all(Polynomial.is_polynomial_tree(c) for c in n.children)
+        elif isinstance(n.value, DivideOp):
+            # only division by a constant
+            return (len(n.children) == 2 and
+                    Polynomial.is_polynomial_tree(n.children[0]) and
+                    Polynomial.is_constant_tree(n.children[1]))
+        elif isinstance(n.value, ExponentOp):
+            # only whole, non-negative powers
+            return (len(n.children) == 2 and
+                    Polynomial.is_polynomial_tree(n.children[0]) and
+                    isinstance(n.children[1].value, int) and
+                    not isinstance(n.children[1].value, bool) and
+                    n.children[1].value >= 0)
+        return False
+
+    @staticmethod
+    def is_constant_tree(n):
+        ''' Return True if the tree at n is a polynomial without symbols. '''
+        if isinstance(n.value, Var):
+            return False
+        return (Polynomial.is_polynomial_tree(n) and
+                all(Polynomial.is_constant_tree(c) for c in n.children))
+
+    @staticmethod
+    def from_tree(n):
+        '''
+        Return the Polynomial represented by the tree at n.
+        Raises NotPolynomialError if n is not a polynomial
+            (see is_polynomial_tree).
+        '''
+        if not Polynomial.is_polynomial_tree(n):
+            raise NotPolynomialError("%s is not a polynomial" % n)
+        return Polynomial.convert(n)
+
+    @staticmethod
+    def convert(n):
+        if isinstance(n.value, numbers.Number):
+            return Polynomial.constant(n.value)
+        elif isinstance(n.value, Var):
+            return Polynomial.variable(n.value)
+
+        children = [Polynomial.convert(c) for c in n.children]
+        if isinstance(n.value, PlusOp):
+            result = children[0]
+            for child in children[1:]:
+                result = result + child
+        elif isinstance(n.value, SubOp):
+            result = children[0]
+            for child in children[1:]:
+                result = result - child
+        elif isinstance(n.value, TimesOp):
+            result = children[0]
+            for child in children[1:]:
+                result = result * child
+        elif isinstance(n.value, NegationOp):
+            result = -children[0]
+        elif isinstance(n.value, DivideOp):
+            result = children[0].divide_by_constant(children[1].constant_value())
+        elif isinstance(n.value, ExponentOp):
+            result = children[0] ** n.children[1].value
+        return result
+
+    def to_tree(self, template):
+        '''
+        Return a tree representing this polynomial, as a sum of terms
+        ordered by total degree, constant term first:
+            1 + (3 * x) + (3 * (x ^ 2)) + (x ^ 3)
+        Terms with negative coefficients are subtracted (or negated, if first).
+
+        template is any node. It's used to make the new nodes, which
+        avoids importing the node module here.
+        '''
+        if len(self.terms) == 0:
+            return template.copy(value = 0)
+
+        result = None
+        for monomial in sorted(self.terms, key = Polynomial.monomial_sort_key):
+            coefficient = Polynomial.normalize(self.terms[monomial])
+            if result == None and len(monomial) > 0 and Polynomial.is_negative(coefficient):
+                # -x rather than -1 * x
+                term = Polynomial.term_to_tree(template, -coefficient, monomial)
+                result = template.construct(term, NegationOp())
+            elif result == None:
+                result = Polynomial.term_to_tree(template, coefficient, monomial)
+            elif Polynomial.is_negative(coefficient):
+                term = Polynomial.term_to_tree(template, -coefficient, monomial)
+                result = template.construct(result, SubOp(), term)
+            else:
+                term = Polynomial.term_to_tree(template, coefficient, monomial)
+                result = template.construct(result, PlusOp(), term)
+        return result
+
+    @staticmethod
+    def term_to_tree(template, coefficient, monomial):
+        ''' Return a tree for coefficient * monomial, like ((2 * x) * (y ^ 3)). '''
+        factors = []
+        if coefficient != 1 or len(monomial) == 0:
+            factors.append(template.copy(value = coefficient))
+        for symbol, exponent in monomial:
+            factor = template.copy(value = symbol)
+            if exponent != 1:
+                factor = template.construct(factor, ExponentOp(), template.copy(value = exponent))
+            factors.append(factor)
+
+        result = factors[0]
+        for factor in factors[1:]:
+            result = template.construct(result, TimesOp(), factor)
+        return result
+
+    @staticmethod
+    def monomial_sort_key(monomial):
+        # lower total degree first; then higher powers of earlier symbols first,
+        # so x^2 comes before x*y, which comes before y^2
+        total_degree = sum(exponent for _, exponent in monomial)
+        return (total_degree, [(str(symbol), -exponent) for symbol, exponent in monomial])
+
+    @staticmethod
+    def is_negative(coefficient):
+        return isinstance(coefficient, numbers.Real) and coefficient < 0
+
+    @staticmethod
+    def normalize(coefficient):
+        ''' Turn whole Fractions into ints. '''
+        if isinstance(coefficient, Fraction) and coefficient.denominator == 1:
+            return coefficient.numerator
+        return coefficient
+
+    @staticmethod
+    def multiply_monomials(a, b):
+        if len(a) == 0:
+            return b
+        if len(b) == 0:
+            return a
+
+        exponents = dict(a)
+        for symbol, exponent in b:
+            exponents[symbol] = exponents.get(symbol, 0) + exponent
+        return tuple(sorted(exponents.items(), key = lambda pair: str(pair[0])))
+
+    def is_constant(self):
+        return all(len(monomial) == 0 for monomial in self.terms)
+
+    def constant_value(self):
+        ''' Return the value of a constant polynomial. '''
+        if not self.is_constant():
+            raise NotPolynomialError("%s is not a constant" % self)
+        return self.terms.get((), 0)
+
+    def symbols(self):
+        ''' Return the symbols in this polynomial, ordered by name. '''
+        result = {}
+        for monomial in self.terms:
+            for symbol, _ in monomial:
+                result[str(symbol)] = symbol
+        return [result[name] for name in sorted(result)]
+
+    def degree(self, symbol = None):
+        '''
+        Return the degree in symbol, or the total degree if symbol is None.
+        The zero polynomial has degree -1.
+        '''
+        if len(self.terms) == 0:
+            return -1
+        if symbol == None:
+            return max(sum(e for _, e in monomial) for monomial in self.terms)
+        return max(dict(monomial).get(symbol, 0) for monomial in self.terms)
+
+    def dense_symbol(self):
+        '''
+        If this is a polynomial in one symbol with enough terms, and few
+        enough missing terms, to multiply faster as a coefficient list
+        (see univariate.multiply), return the symbol. Otherwise None.
+        '''
+        if len(self.terms) < univariate.SCHOOLBOOK_THRESHOLD:
+            return None
+        symbol = None
+        for monomial in self.terms:
+            if len(monomial) > 1:
+                return None
+            elif len(monomial) == 1:
+                if symbol != None and monomial[0][0] != symbol:
+                    return None
+                symbol = monomial[0][0]
+        if symbol == None or 2 * len(self.terms) <= self.degree():
+            return None
+        return symbol
+
+    def __len__(self):
+        ''' Return the number of terms. '''
+        return len(self.terms)
+
+    def __eq__(self, other):
+        if isinstance(other, numbers.Number):
+            other = Polynomial.constant(other)
+        if isinstance(other, Polynomial):
+            return self.terms == other.terms
+        return False
+
+    def __neg__(self):
+        return Polynomial(dict((m, -c) for m, c in self.terms.items()))
+
+    def __add__(self, other):
+        if isinstance(other, numbers.Number):
+            other = Polynomial.constant(other)
+        terms = dict(self.terms)
+        for monomial, coefficient in other.terms.items():
+            terms[monomial] = terms.get(monomial, 0) + coefficient
+        return Polynomial(terms)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, numbers.Number):
+            other = Polynomial.constant(other)
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        if isinstance(other, numbers.Number):
+            other = Polynomial.constant(other)
+
+        symbol = self.dense_symbol()
+        if symbol != None and other.dense_symbol() == symbol:
+            product = univariate.multiply(univariate.from_polynomial(self, symbol),
+                                          univariate.from_polynomial(other, symbol))
+            return Polynomial(univariate.to_terms(product, symbol))
+
+        budget = current_budget()
+        until_check = Polynomial.CHECK_INTERVAL
+
+        terms = {}
+        for a, a_coefficient in self.terms.items():
+            for b, b_coefficient in other.terms.items():
+                monomial = Polynomial.multiply_monomials(a, b)
+                terms[monomial] = terms.get(monomial, 0) + a_coefficient * b_coefficient
+
+            until_check -= len(other.terms)
+            if budget != None and until_check <= 0:
+                until_check = Polynomial.CHECK_INTERVAL
+                budget.check()
+        return Polynomial(terms)
+
+    __rmul__ = __mul__
+
+    def __pow__(self, k):
+        ''' Raise this to a non-negative integer power, by repeated squaring. '''
+        if not isinstance(k, int) or k < 0:
+            raise NotPolynomialError("cannot raise a polynomial to the power %s" % k)
+
+        result = Polynomial.constant(1)
+        base = self
+        while k > 0:
+            if k & 1:
+                result = result * base
+            k >>= 1
+            if k > 0:
+                base = base * base
+        return result
+
+    def divide_by_constant(self, value):
+        '''
+        Return this polynomial divided by the number value.
+        Integer coefficients become Fractions, so this is exact.
+        '''
+        if value == 0:
+            raise ZeroDivisionError("division by zero")
+        if isinstance(value, numbers.Rational):
+            value = Fraction(value)
+
+        terms = {}
+        for monomial, coefficient in self.terms.items():
+            if isinstance(coefficient, numbers.Rational):
+                coefficient = Fraction(coefficient)
+            terms[monomial] = coefficient / value
+        return Polynomial(terms)
+
+    def divide(self, other):
+        '''
+        Return (quotient, remainder), Polynomials with
+            self = quotient * other + remainder
+        where the remainder has a lower degree than other. self and other
+        must be polynomials in the same symbol (or constants); this raises
+        NotPolynomialError otherwise, and ZeroDivisionError if other is 0.
+        The division is done on coefficient lists (see univariate.divide).
+            Ex: (x^2 + 1).divide(x + 1) --> (-1 + x, 2)
+        '''
+        symbols = dict((str(s), s) for s in self.symbols() + other.symbols())
+        if len(symbols) > 1:
+            raise NotPolynomialError("%s and %s are not polynomials in one symbol" % (self, other))
+        if len(symbols) == 0:
+            return self.divide_by_constant(other.constant_value()), Polynomial()
+
+        symbol, = symbols.values()
+        quotient, remainder = univariate.divide(univariate.from_polynomial(self, symbol),
+                                                univariate.from_polynomial(other, symbol))
+        return (Polynomial(univariate.to_terms(quotient, symbol)),
+                Polynomial(univariate.to_terms(remainder, symbol)))
+
+    def __str__(self):
+        if len(self.terms) == 0:
+            return "0"
+        terms = []
+        for monomial in sorted(self.terms, key = Polynomial.monomial_sort_key):
+            factors = ["%s^%s" % (s, e) if e != 1 else str(s) for s, e in monomial]
+            terms.append("*".join([str(Polynomial.normalize(self.terms[monomial]))] + factors))
+        return " + ".join(terms)
+
+    def __repr__(self):
+        return "Polynomial(%s)" % self
+
+class PolynomialVisitor(object):
+    '''
+    visit(n) returns a new tree for the expanded form of the polynomial
+    at n, with like terms collected (see Polynomial.to_tree), or None if
+    n is not a polynomial.
+
+    Trees without symbols are not polynomials here. Those are left to
+    the Reducer, which knows which numbers are too expensive to compute.
+    '''
+
+    def visit(self, n):
+        if not Polynomial.is_polynomial_tree(n) or Polynomial.is_constant_tree(n):
+            return None
+        return Polynomial.convert(n).to_tree(n)
@@ -0,0 +1,232 @@
+'''
+rational.py
+
+This defines RationalFunction, a quotient of two polynomial.Polynomials,
+used to simplify trees typed as RationalExprs.
+
+Every result is kept in lowest terms: when the top and bottom are
+polynomials in one symbol with real coefficients, and the bottom doesn't
+divide the top (see univariate.divide), their greatest common
+divisor (see univariate.gcd) is cancelled and the bottom's leading
+coefficient is made positive. Exact (int and Fraction) coefficients are
+then scaled to the smallest integers; float coefficients are scaled so
+the bottom is monic. So repeated arithmetic doesn't grow the result the
+way composing trees does:
+    (x+1)/(x+2) + 1/(x+2)  -->  1
+
+Top and bottom polynomials in more than one symbol, or with complex
+coefficients, are not cancelled.
+
+Ex:
+    f = RationalFunction.from_tree(tree)    # tree represents (x^2 - 1)/(x - 1)
+    f.to_tree(tree)                         # represents 1 + x
+'''
+
+from .parsing.parser_definitions import *
+from .polynomial import Polynomial, NotPolynomialError
+from . import univariate
+from fractions import Fraction
+import math, numbers
+
+class RationalFunction(object):
+
+    def __init__(self, top, bottom = None):
+        '''
+        top and bottom are Polynomials. bottom defaults to 1. The result
+        is reduced to lowest terms (see cancel).
+        Raises ZeroDivisionError if bottom is zero.
+        '''
+        if bottom == None:
+            bottom = Polynomial.constant(1)
+        if len(bottom) == 0:
+            raise ZeroDivisionError("division by zero")
+        self.top, self.bottom = RationalFunction.cancel(top, bottom)
+
+    @staticmethod
+    def is_rational_tree(n):
+        '''
+        Return True if the tree at n can be converted with from_tree: it
+        is built from numbers and symbols with +, -, *, /, negation and
+        integer powers.
+        '''
+        if isinstance(n.value, bool):
+            return False
+        if isinstance(n.value, numbers.Number) or isinstance(n.value, Var):
+            return True
+
+        if (isinstance(n.value, PlusOp) or isinstance(n.value, SubOp) or
+            isinstance(n.value, TimesOp) or isinstance(n.value, NegationOp) or
+            isinstance(n.value, DivideOp)
+            ):
+            return all(RationalFunction.is_rational_tree(c) for c in n.children)
+        elif isinstance(n.value, ExponentOp):
+            return (len(n.children) == 2 and
+                    RationalFunction.is_rational_tree(n.children[0]) and
+                    isinstance(n.children[1].value, int) and
+                    not isinstance(n.children[1].value, bool))
+        return False
+
+    @staticmethod
+    def from_tree(n):
+        '''
+        Return the RationalFunction represented by the tree at n.
+        Raises NotPolynomialError if n is not a rational function
+            (see is_rational_tree), and ZeroDivisionError if it
+            divides by zero.
+        '''
+        if not RationalFunction.is_rational_tree(n):
+            raise NotPolynomialError("%s is not a rational function" % n)
+        return RationalFunction.convert(n)
+
+    @staticmethod
+    def convert(n):
+        if isinstance(n.value, numbers.Number):
+            return RationalFunction(Polynomial.constant(n.value))
+        elif isinstance(n.value, Var):
+            return RationalFunction(Polynomial.variable(n.value))
+
+        children = [RationalFunction.convert(c) for c in n.children]
+        if isinstance(n.value, PlusOp):
+            result = children[0]
+            for child in children[1:]:
+                result = result + child
+        elif isinstance(n.value, SubOp):
+            result = children[0]
+            for child in children[1:]:
+                result = result - child
+        elif isinstance(n.value, TimesOp):
+            result = children[0]
+            for child in children[1:]:
+                result = result * child
+        elif isinstance(n.value, DivideOp):
+            result = children[0]
+            for child in children[1:]:
+                result = result / child
+        elif isinstance(n.value, NegationOp):
+            result = -children[0]
+        elif isinstance(n.value, ExponentOp):
+            result = children[0] ** n.children[1].value
+        return result
+
+    @staticmethod
+    def cancel(top, bottom):
+        '''
+        Return (top, bottom) reduced to lowest terms, or unchanged if
+        they can't be (see the module docstring).
+            Ex: (2 + 2x, 4x) --> (1 + x, 2x)
+        '''
+        if bottom.is_constant():
+            return top.divide_by_constant(bottom.constant_value()), Polynomial.constant(1)
+
+        symbols = set(map(str, top.symbols() + bottom.symbols()))
+        if (len(symbols) != 1 or
+            not all(isinstance(c, numbers.Real) for c in top.terms.values()) or
+            not all(isinstance(c, numbers.Real) for c in bottom.terms.values())
+            ):
+            return top, bottom
+
+        symbol = bottom.symbols()[0]
+        a = univariate.from_polynomial(top, symbol)
+        b = univariate.from_polynomial(bottom, symbol)
+
+        # if the bottom divides the top, the quotient is the result
+        quotient, remainder = univariate.divide(a, b)
+        if len(remainder) == 0:
+            return Polynomial(univariate.to_terms(quotient, symbol)), Polynomial.constant(1)
+
+        divisor = univariate.gcd(a, b)
+        if len(divisor) > 1:
+            a, _ = univariate.divide(a, divisor)
+            b, _ = univariate.divide(b, divisor)
+
+        if univariate.is_rational(a) and univariate.is_rational(b):
+            scale = RationalFunction.integer_scale(a + b)
+        else:
+            # floats are only made monic
+            scale = 1 / b[-1]
+        if b[-1] * scale < 0:
+            scale = -scale
+
+        a = [RationalFunction.scaled(c, scale) for c in a]
+        b = [RationalFunction.scaled(c, scale) for c in b]
+        return (Polynomial(univariate.to_terms(a, symbol)),
+                Polynomial(univariate.to_terms(b, symbol)))
+
+    @staticmethod
+    def integer_scale(coefficients):
+        '''
+        Return the Fraction that scales the int or Fraction coefficients
+        to integers with no common factor.
+        '''
+        coefficients = [Fraction(c) for c in coefficients]
+        scale = 1
+        for c in coefficients:
+            scale = scale * c.denominator // math.gcd(scale, c.denominator)
+        content = 0
+        for c in coefficients:
+            content = math.gcd(content, int(c * scale))
+        return Fraction(scale, content)
+
+    @staticmethod
+    def scaled(c, scale):
+        c = c * scale
+        if isinstance(c, Fraction):
+            return univariate.normalize(c)
+        return c
+
+    def is_polynomial(self):
+        return self.bottom == 1
+
+    def to_tree(self, template):
+        '''
+        Return a tree representing this rational function: top / bottom,
+        with each written as in Polynomial.to_tree, or just the top if
+        the bottom is 1. template is any node, used to make the new nodes.
+        '''
+        top = self.top.to_tree(template)
+        if self.is_polynomial():
+            return top
+        return template.construct(top, DivideOp(), self.bottom.to_tree(template))
+
+    def __eq__(self, other):
+        if isinstance(other, numbers.Number):
+            other = RationalFunction(Polynomial.constant(other))
+        if isinstance(other, RationalFunction):
+            return self.top == other.top and self.bottom == other.bottom
+        return False
+
+    def __neg__(self):
+        return RationalFunction(-self.top, self.bottom)
+
+    def __add__(self, other):
+        if self.bottom == other.bottom:
+            return RationalFunction(self.top + other.top, self.bottom)
+        return RationalFunction(self.top * other.bottom + other.top * self.bottom,
+                                self.bottom * other.bottom)
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __mul__(self, other):
+        return RationalFunction(self.top * other.top, self.bottom * other.bottom)
+
+    def __truediv__(self, other):
+        if len(other.top) == 0:
+            raise ZeroDivisionError("division by zero")
+        return RationalFunction(self.top * other.bottom, self.bottom * other.top)
+
+    def __pow__(self, k):
+        ''' Raise this to an integer power. Negative powers swap the top and bottom. '''
+        if k < 0:
+            if len(self.top) == 0:
+                raise ZeroDivisionError("division by zero")
+            return RationalFunction(self.bottom ** -k, self.top ** -k)
+        return RationalFunction(self.top ** k, self.bottom ** k)
+
+    def __str__(self):
+        if self.is_polynomial():
+            return str(self.top)
+        return "(%s) / (%s)" % (self.top, self.bottom)
+
+    def __repr__(self):
+        return "RationalFunction(%s)" % self
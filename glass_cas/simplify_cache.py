@@ -0,0 +1,180 @@
+'''
+simplify_cache.py
+
+This defines SimplifyCache, a bounded memo cache for simplification
+results, and structural_key, the key it uses for trees.
+
+The key of a tree is a hash of its structure: the type and value of each
+node and its number of children. It doesn't depend on node identities
+or on Python's per-process string hashing, so the same tree has the same
+key in every process, and results can be kept on disk.
+
+SimplifyOp.apply uses SimplifyOp.cache, if one is set, for whole inputs.
+visitors.Simplifier takes a cache too, and also uses it for each
+subtree of the normalized tree, so repeated subterms are simplified once.
+
+Ex:
+    SimplifyOp.cache = SimplifyCache(max_size = 4096, path = "simplify.db")
+    ...
+    print(SimplifyOp.cache.stats())
+'''
+
+from .parsing.parser_definitions import UserFunction
+from collections import OrderedDict
+import hashlib, numbers, pickle, shelve
+
+def node_label(n):
+    '''
+    Return a string identifying n's value, but not its children, or None
+    if n can't be cached. A user function is identified by its name, but
+    its body can change, so trees calling one aren't cached.
+    '''
+    value = n.value
+    if isinstance(value, UserFunction):
+        return None
+    elif isinstance(value, numbers.Number):
+        # 1 and 1.0 are different
+        return "%s:%r" % (type(value).__name__, value)
+    return "%s:%s" % (type(value).__name__, value)
+
+def structural_keys(root):
+    '''
+    Return a dict mapping id(n) to structural_key(n), for every node n
+    in the tree at root (None for nodes that can't be cached). This takes time proportional to the size of
+    the tree, since each key is computed from its children's keys.
+    '''
+    result = {}
+    stack = [(root, False)]
+    while stack:
+        n, children_done = stack.pop()
+        if id(n) in result:
+            continue
+        if not children_done:
+            stack.append((n, True))
+            stack.extend((c, False) for c in n.children)
+            continue
+
+        label = node_label(n)
+        child_keys = [result[id(c)] for c in n.children]
+        if label == None or None in child_keys:
+            result[id(n)] = None
+            continue
+
+        digest = hashlib.blake2b(digest_size = 16)
+        digest.update(label.encode())
+        digest.update(b"/%d" % len(n.children))
+        for child_key in child_keys:
+            digest.update(bytes.fromhex(child_key))
+        result[id(n)] = digest.hexdigest()
+    return result
+
+def structural_key(n):
+    '''
+    Return a stable hash (a hex string) of the structure of the tree at n,
+    or None if the tree can't be cached (see node_label).
+    '''
+    return structural_keys(n)[id(n)]
+
+def encode(n):
+    ''' Return a picklable (value, children) tuple for the tree at n. '''
+    return (n.value, tuple(encode(c) for c in n.children))
+
+def decode(encoded, template):
+    '''
+    Return a new tree for an encoded tree. template is any node, used to
+    make the new nodes (see node.copy).
+    '''
+    value, children = encoded
+    result = template.copy(value = value)
+    for child in children:
+        result.children.append(decode(child, template))
+    return result
+
+class SimplifyCache(object):
+
+    DEFAULT_MAX_SIZE = 4096
+
+    def __init__(self, max_size = DEFAULT_MAX_SIZE, path = None):
+        '''
+        max_size is the number of results kept in memory. When it is
+            exceeded, the least recently used entry is evicted.
+        path is an optional file name. If given, every result is also
+            written to a shelve database there, and results not in memory
+            are looked up there. A later process using the same path
+            starts with those results.
+        '''
+        self.max_size = max_size
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # key -> result node
+        self.entries = OrderedDict()
+        self.shelf = None
+        if path != None:
+            self.shelf = shelve.open(path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        return {
+            'size'      : len(self.entries),
+            'max_size'  : self.max_size,
+            'hits'      : self.hits,
+            'disk_hits' : self.disk_hits,
+            'misses'    : self.misses,
+            'evictions' : self.evictions,
+        }
+
+    def lookup(self, key, template):
+        '''
+        Return a copy of the result cached under key, or None if there is
+        no such entry. template is any node, used to make nodes for results
+        read from disk. Those results have no expr_type set.
+        '''
+        result = self.entries.get(key)
+        if result != None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return result.copy(recursive = True)
+
+        if self.shelf != None and key in self.shelf:
+            self.disk_hits += 1
+            result = decode(self.shelf[key], template)
+            self.remember(key, result)
+            return result.copy(recursive = True)
+
+        self.misses += 1
+        return None
+
+    def store(self, key, result):
+        ''' Cache a copy of result (a node) under key. '''
+        result = result.copy(recursive = True)
+        self.remember(key, result)
+        if self.shelf != None:
+            try:
+                self.shelf[key] = encode(result)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                # e.g. a user function whose body can't be pickled; keep it in memory only
+                pass
+
+    def remember(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last = False)
+            self.evictions += 1
+
+    def clear(self):
+        ''' Forget every result, including those on disk. '''
+        self.entries.clear()
+        if self.shelf != None:
+            self.shelf.clear()
+
+    def close(self):
+        ''' Write out and close the disk database, if there is one. '''
+        if self.shelf != None:
+            self.shelf.close()
+            self.shelf = None
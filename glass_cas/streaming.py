@@ -0,0 +1,172 @@
+'''
+streaming.py
+
+This expands a tree one term at a time, without building the whole
+expansion in memory. The terms are the same as the terms of the flattened
+sum that visitors.Expander produces, in the same order, except that a
+subtracted term is yielded as a negation.
+
+    iter_expanded_terms(tree)   yields the terms, as trees
+    count_expanded_terms(tree)  returns the number of terms, without expanding
+    write_expanded_terms(tree, file)  writes the terms to file, one per line
+
+Memory use is bounded by the depth of the tree: a product's factors are
+re-expanded for each term of the next factor, rather than stored. The one
+exception is a sum raised to a power, whose terms are kept in a list while
+the power's terms are produced.
+
+Ex:
+    for term in iter_expanded_terms(parser.parse("(a+b)*(c-d)")):
+        print(term)         # (a * c), (b * c), `((a * d)), `((b * d))
+'''
+
+from .parsing.parser_definitions import *
+from .visitors import Expander, Printer
+from math import comb
+
+def iter_expanded_terms(tree):
+    '''
+    Yield the terms of the expansion of tree, one at a time. A term that
+    is subtracted in the expansion is yielded as its negation.
+    '''
+    for negative, term in signed_terms(tree):
+        if negative:
+            term = tree.construct(term, NegationOp())
+        yield term
+
+def count_expanded_terms(tree):
+    '''
+    Return the number of terms iter_expanded_terms(tree) yields, computed
+    from the structure of tree. This is exact, and takes time proportional
+    to the size of tree, not the size of its expansion.
+        Ex: (a+b+c) * (x+y) --> 6, (a+b+c)^4 --> 15
+    '''
+    n = tree
+    if is_plus_or_minus(n.value):
+        return sum(count_expanded_terms(child) for child in n.children)
+    elif isinstance(n.value, TimesOp):
+        result = 1
+        for child in n.children:
+            result *= count_expanded_terms(child)
+        return result
+    elif isinstance(n.value, NegationOp):
+        return count_expanded_terms(n.children[0])
+    elif isinstance(n.value, DivideOp):
+        return count_expanded_terms(n.children[0])
+    elif is_integer_power(n):
+        m = count_expanded_terms(n.children[0])
+        if m == 1:
+            return 1
+        # the number of ways to write k as a sum of m exponents
+        k = n.children[1].value
+        return comb(m + k - 1, k)
+    return 1
+
+def write_expanded_terms(tree, file, mode = Printer.INFIX_MODE):
+    '''
+    Write each term of the expansion of tree to file, one per line,
+    as printed by a visitors.Printer in the given mode.
+    Returns the number of terms written.
+    '''
+    printer = Printer(mode = mode)
+    count = 0
+    for term in iter_expanded_terms(tree):
+        file.write(term.accept(printer))
+        file.write("\n")
+        count += 1
+    return count
+
+def is_plus_or_minus(value):
+    return isinstance(value, PlusOp) or isinstance(value, SubOp)
+
+def is_integer_power(n):
+    return (isinstance(n.value, ExponentOp) and
+            isinstance(n.children[1].value, int) and
+            not isinstance(n.children[1].value, bool) and
+            n.children[1].value >= 0)
+
+def signed_terms(n):
+    '''
+    Yield (negative, term) pairs for the terms of the expansion of n,
+    where negative is True if the term is subtracted.
+    '''
+    if is_plus_or_minus(n.value):
+        for i, child in enumerate(n.children):
+            # everything after the first operand of - is subtracted
+            subtracted = isinstance(n.value, SubOp) and i > 0
+            for negative, term in signed_terms(child):
+                yield (negative != subtracted, term)
+
+    elif isinstance(n.value, TimesOp):
+        yield from product_terms(n, len(n.children))
+
+    elif isinstance(n.value, NegationOp):
+        for negative, term in signed_terms(n.children[0]):
+            yield (not negative, term)
+
+    elif isinstance(n.value, DivideOp):
+        # (a + b) / D --> a/D + b/D
+        denominator = n.children[1].accept(Expander())
+        for negative, term in signed_terms(n.children[0]):
+            yield (negative, n.construct(term, n.value, denominator))
+
+    elif is_integer_power(n) and count_expanded_terms(n.children[0]) > 1:
+        yield from power_terms(n)
+
+    else:
+        yield (False, n.accept(Expander()))
+
+def product_terms(n, j):
+    '''
+    Yield the signed terms of the product of n's first j children.
+    Like Expander.distribute, the last factor's terms are the outer loop:
+        (a+b) * (c+d) --> a*c, b*c, a*d, b*d
+    '''
+    if j == 1:
+        yield from signed_terms(n.children[0])
+        return
+
+    for b_negative, b in signed_terms(n.children[j-1]):
+        # the first j-1 factors are expanded again for each b
+        for a_negative, a in product_terms(n, j-1):
+            yield (a_negative != b_negative, multiply(n, a, b))
+
+def multiply(n, a, b):
+    ''' Return the flattened product a * b, with n's operator. '''
+    result = n.copy(recursive = False)
+    for factor in [a, b]:
+        if type(factor.value) == type(n.value):
+            result.children.extend(factor.children)
+        else:
+            result.children.append(factor)
+    return result
+
+def power_terms(n):
+    '''
+    Yield the signed terms of (T1 + ... + Tm) ^ k, in the order of
+    Expander.expand_sum_to_integer_power. The terms Ti are kept in a list.
+    '''
+    terms = list(signed_terms(n.children[0]))
+    k = n.children[1].value
+    if k == 0:
+        yield (False, n.copy(value = 1))
+        return
+
+    for exponents, c in Expander.multinomial_coefficients(len(terms), k):
+        negative = sum(e for (subtracted, _), e in zip(terms, exponents) if subtracted) % 2 == 1
+
+        term = n.copy(value = TimesOp())
+        if c != 1:
+            term.children.append(n.copy(value = c))
+        for (_, T), e in zip(terms, exponents):
+            if e == 1 and type(T.value) == TimesOp:
+                term.children.extend(T.children)
+            elif e == 1:
+                term.children.append(T)
+            elif e != 0:
+                term.children.append(n.construct(T, ExponentOp(), n.copy(value = e)))
+
+        if len(term.children) == 1:
+            yield (negative, term.children[0])
+        else:
+            yield (negative, term)
@@ -0,0 +1,80 @@
+'''
+Don't run this. Use GlassCAS/run_tests.py.
+'''
+
+import unittest, threading, time
+from ..parsing import parsing
+from ..parsing.parser_definitions import *
+from .. import visitors
+from ..budget import Budget, BudgetExceededError, current_budget
+
+class BudgetTestCases(unittest.TestCase):
+    '''
+    This tests budget.Budget with reduce, expand, and simplify.
+    '''
+
+    def setUp(self):
+        self.parser = parsing.Parser()
+        self.big_expansion = self.parser.parse("expand((a+b+c+d)^40)")
+
+    def assertExceeds(self, reason, func, *args, **kwargs):
+        try:
+            func(*args, **kwargs)
+        except BudgetExceededError as error:
+            self.assertEqual(error.reason, reason)
+            return error
+        self.fail("BudgetExceededError not raised")
+
+    def test_within_budget(self):
+        budget = Budget(time_limit = 10, max_nodes = 1000, max_output_size = 100)
+        result = self.parser.parse("expand((a+b)*(c+d))").reduce(budget = budget)
+        self.assertEqual(repr(result), "a c * a d * + b c * + b d * +")
+        self.assertGreater(budget.stats()['nodes_allocated'], 0)
+        self.assertEqual(budget.stats()['output_size'], 15)
+        self.assertIsNone(current_budget())
+
+    def test_time_limit(self):
+        budget = Budget(time_limit = 0.05)
+        start = time.monotonic()
+        error = self.assertExceeds(Budget.TIME_LIMIT, self.big_expansion.reduce, budget = budget)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertGreater(error.stats['nodes_allocated'], 0)
+        self.assertIsNone(current_budget())
+
+    def test_node_limit(self):
+        budget = Budget(max_nodes = 500)
+        error = self.assertExceeds(Budget.NODE_LIMIT, self.big_expansion.reduce, budget = budget)
+        self.assertEqual(error.stats['nodes_allocated'], 501)
+
+    def test_output_size_limit(self):
+        tree = self.parser.parse("(a+b)*(c+d)")
+        budget = Budget(max_output_size = 10)
+        self.assertExceeds(Budget.OUTPUT_SIZE_LIMIT, ExpandOp().apply, tree, budget = budget)
+        self.assertEqual(budget.stats()['output_size'], 15)
+
+    def test_simplify(self):
+        tree = self.parser.parse("(x + 1) ^ 4")
+        self.assertExceeds(Budget.NODE_LIMIT, SimplifyOp().apply, tree, budget = Budget(max_nodes = 5))
+
+    def test_visitors(self):
+        tree = self.parser.parse("(a+b)*(c+d)")
+        self.assertExceeds(Budget.NODE_LIMIT, tree.accept, visitors.Expander(), budget = Budget(max_nodes = 5))
+
+    def test_cancel_from_another_thread(self):
+        budget = Budget()
+        errors = []
+
+        def work():
+            try:
+                self.big_expansion.reduce(budget = budget)
+            except BudgetExceededError as error:
+                errors.append(error)
+
+        thread = threading.Thread(target = work)
+        thread.start()
+        time.sleep(0.05)
+        budget.cancel()
+        thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([e.reason for e in errors], [Budget.CANCELLED])
@@ -0,0 +1,91 @@
+'''
+Don't run this. Use GlassCAS/run_tests.py.
+'''
+
+import unittest
+from ..parsing import parsing
+
+class DependencyGraphTestCases(unittest.TestCase):
+    '''
+    This tests dependency_graph.DependencyGraph through Parser.watch.
+    '''
+
+    def setUp(self):
+        self.parser = parsing.Parser()
+        for definition in ["a := 5", "b := a + 1", "c := 7", "f[x] := 3*x"]:
+            self.define(definition)
+
+        self.parser.watch('double_b', "b * 2")
+        self.parser.watch('c_plus_one', "c + 1")
+        self.parser.watch('f_of_b', "f(b)")
+
+    def define(self, definition):
+        self.parser.update_symbol_table(self.parser.parse(definition).reduce())
+        return self.parser.dependency_graph.recomputed
+
+    def value(self, key):
+        return repr(self.parser.watched_value(key))
+
+    def test_initial_values(self):
+        self.assertEqual(self.value('double_b'), "12")
+        self.assertEqual(self.value('c_plus_one'), "8")
+        self.assertEqual(self.value('f_of_b'), "18")
+
+    def test_only_dependents_are_recomputed(self):
+        recomputed = self.define("a := 10")
+        keys = [key for kind, key in recomputed]
+        self.assertEqual(sorted(keys), ['a', 'b', 'double_b', 'f_of_b'])
+        self.assertEqual(self.value('double_b'), "22")
+        self.assertEqual(self.value('f_of_b'), "33")
+        self.assertEqual(self.value('c_plus_one'), "8")
+
+        self.assertEqual(self.define("c := 1"), [('symbol', 'c'), ('watch', 'c_plus_one')])
+        self.assertEqual(self.value('c_plus_one'), "2")
+
+    def test_dependencies_are_recomputed_first(self):
+        recomputed = self.define("a := 0")
+        self.assertLess(recomputed.index(('symbol', 'a')), recomputed.index(('symbol', 'b')))
+        self.assertLess(recomputed.index(('symbol', 'b')), recomputed.index(('watch', 'double_b')))
+
+    def test_function_redefinition(self):
+        self.assertEqual(self.define("f[x] := x*x"), [('watch', 'f_of_b')])
+        self.assertEqual(self.value('f_of_b'), "36")
+
+    def test_callers_of_redefined_functions(self):
+        # so that f is only reached through g
+        self.parser.dependency_graph.unwatch('f_of_b')
+        # unreduced, so that g's body still calls f
+        self.parser.parse("g[x] := f(x) + 1", update_symbol_table = True)
+        self.parser.watch('g_of_2', "g(2)")
+        self.assertEqual(self.value('g_of_2'), "7")
+
+        recomputed = self.define("f[x] := x*x")
+        self.assertIn(('watch', 'g_of_2'), recomputed)
+        self.assertEqual(self.value('g_of_2'), "5")
+        recomputed = self.define("f[x] := x - 1")
+        self.assertIn(('watch', 'g_of_2'), recomputed)
+        self.assertEqual(self.value('g_of_2'), "2")
+
+    def test_undefined_symbols(self):
+        self.parser.watch('with_d', "d + b")
+        self.assertEqual(self.value('with_d'), "d 6 +")
+        self.define("d := 1")
+        self.assertEqual(self.value('with_d'), "7")
+
+    def test_unwatch(self):
+        self.parser.dependency_graph.unwatch('double_b')
+        recomputed = self.define("a := 10")
+        self.assertNotIn(('watch', 'double_b'), recomputed)
+
+    def test_circular_definition(self):
+        self.assertRaises(ValueError, self.define, "a := b")
+
+    def test_circular_definition_is_not_kept(self):
+        self.assertRaises(ValueError, self.define, "a := b")
+        self.assertEqual(repr(self.parser.symbol_table['a'].value), "5")
+        self.assertEqual(self.parser.dependency_graph.dirty, set())
+
+        self.define("d := 1")
+        self.assertEqual(self.value('double_b'), "12")
+        self.define("a := 10")
+        self.assertEqual(self.value('double_b'), "22")
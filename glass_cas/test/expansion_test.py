@@ -1,13 +1,15 @@
 import unittest
 
 from ..parsing import parsing
+from ..parsing.parser_definitions import ExpandOp
 from .. import visitors
+from ..polynomial import Polynomial
 from . import expansion_test_cases as exp_cases
 from . import test_util
 
 class ExpansionTestCases(unittest.TestCase):
     '''
-    This tests the visitors.Expander.visit method.
+    This tests expanding through ExpandOp.apply.
     '''
 
     def setUp(self):
@@ -20,16 +22,33 @@ class ExpansionTestCases(unittest.TestCase):
         self.expand_integer_power_cases = exp_cases.expand_integer_power_cases
         
     @staticmethod
-    def get_test_result(case):
+    def canonical(tree):
+        '''
+        ExpandOp.apply expands polynomials with polynomial.Polynomial,
+        which orders and collects terms its own way, so polynomials are
+        compared in that form. Anything else is compared as it is.
+        '''
+        if Polynomial.is_polynomial_tree(tree) and not Polynomial.is_constant_tree(tree):
+            tree = Polynomial.from_tree(tree).to_tree(tree)
+        return repr(tree)
+
+    @classmethod
+    def get_test_result(cls, case):
         # each case parses to have an ExpandOp as the root
         tree = parsing.Parser().parse(case)
         result = tree.value.apply(*tree.children)
-        return repr(result)
+        return cls.canonical(result)
 
-    @staticmethod
-    def get_expected_result(val):
+    @classmethod
+    def get_expected_result(cls, val):
         expected_result = parsing.Parser().parse(val)
-        return repr(expected_result)
+        return cls.canonical(expected_result)
+
+    @classmethod
+    def get_flattened_expected_result(cls, val):
+        # sums raised to powers are expanded to flattened sums
+        expected_result = parsing.Parser().parse(val).accept(visitors.Flattener())
+        return cls.canonical(expected_result)
 
     def test_distribution_over_addition(self):
         test_util.run_through_cases(self, self.distribution_plus_cases, self.get_test_result, self.get_expected_result)
@@ -50,7 +69,70 @@ class ExpansionTestCases(unittest.TestCase):
         test_util.run_through_cases(self, self.distribution_negation_cases, self.get_test_result, self.get_expected_result)
 
     def test_expand_integer_powers(self):
-        test_util.run_through_cases(self, self.expand_integer_power_cases, self.get_test_result, self.get_expected_result)
+        test_util.run_through_cases(self, self.expand_integer_power_cases, self.get_test_result, self.get_flattened_expected_result)
+
+    def test_polynomial_output(self):
+        # terms are collected, constant term first, and products use *
+        expand = lambda case: repr(ExpandOp().apply(parsing.Parser().parse(case)))
+        self.assertEqual(expand("(x+1)(x-1)"), "-1 x 2 ^ +")
+        self.assertEqual(expand("2x(x+y)"), "2 x 2 ^ * 2 x * y * +")
+        self.assertEqual(expand("(a+b)/2"), "1/2 a * 1/2 b * +")
+        # not a polynomial, so expanded by the Expander
+        self.assertEqual(expand("(x+1)/y"), "x y / 1 y / +")
+
+class ExpanderTestCases(ExpansionTestCases):
+    '''
+    This runs the expansion cases through the visitors.Expander.visit
+    method, which ExpandOp.apply falls back on for anything that isn't
+    a polynomial, and checks its exact output.
+    '''
+
+    @staticmethod
+    def canonical(tree):
+        return repr(tree)
+
+    @classmethod
+    def get_test_result(cls, case):
+        tree = parsing.Parser().parse(case)
+        result = tree.children[0].accept(visitors.Expander())
+        return cls.canonical(result)
+
+    def test_multinomial_coefficients(self):
+        coefficients = list(visitors.Expander.multinomial_coefficients(3, 2))
+        self.assertEqual(coefficients, [
+            ((2, 0, 0), 1), ((1, 1, 0), 2), ((1, 0, 1), 2),
+            ((0, 2, 0), 1), ((0, 1, 1), 2), ((0, 0, 2), 1),
+        ])
+        # exact, even past the precision of floats
+        coefficients = dict(visitors.Expander.multinomial_coefficients(2, 100))
+        self.assertEqual(coefficients[(50, 50)], 100891344545564193334812497256)
+        coefficients = dict(visitors.Expander.multinomial_coefficients(4, 12))
+        self.assertEqual(len(coefficients), 455)
+        self.assertEqual(sum(coefficients.values()), 4**12)
+        self.assertEqual(coefficients[(3, 3, 3, 3)], 369600)
+
+    def test_each_node_is_expanded_once(self):
+        # (a0 + a1 + a2) * (b0 + b1 + b2) * (c0 + c1 + c2)
+        sums = ["(%s0 + %s1 + %s2)" % (name, name, name) for name in "abc"]
+        tree = parsing.Parser().parse(" * ".join(sums))
+
+        calls = {"visit": 0, "distribute": 0}
+        expander = visitors.Expander()
+        visit, distribute = expander.visit, expander.distribute
+
+        def counting_visit(n):
+            calls["visit"] += 1
+            return visit(n)
+        def counting_distribute(*args, **kwargs):
+            calls["distribute"] += 1
+            return distribute(*args, **kwargs)
+        expander.visit, expander.distribute = counting_visit, counting_distribute
+
+        result = tree.accept(expander)
+        self.assertEqual(len(result.accept(visitors.Flattener()).children), 27)
+        # one distribution per product, and one visit per input node
+        self.assertEqual(calls["distribute"], 2)
+        self.assertEqual(calls["visit"], len(repr(tree).split()))
 
 class FlatteningTestCases(unittest.TestCase):
 
@@ -117,3 +199,47 @@ class UnflatteningTestCases(unittest.TestCase):
         test_util.run_through_cases(self, self.balanced_unflatten_add_and_mult_cases, self.get_balanced_mode_test_result)
 
 
+
+class SortingTestCases(unittest.TestCase):
+    '''
+    This tests the visitors.Sorter.visit method.
+    '''
+
+    def setUp(self):
+        self.sort_by_subtree_repr_cases = exp_cases.sort_by_subtree_repr_cases
+        self.sort_by_expr_type_cases = exp_cases.sort_by_expr_type_cases
+
+    @staticmethod
+    def get_flattened_tree(case):
+        return parsing.Parser().parse(case).accept(visitors.Flattener())
+
+    @staticmethod
+    def get_subtree_repr_test_result(case):
+        tree = SortingTestCases.get_flattened_tree(case)
+        return repr(tree.accept(visitors.Sorter(mode = visitors.Sorter.BY_SUBTREE_REPR)))
+
+    @staticmethod
+    def get_expr_type_test_result(case):
+        tree = SortingTestCases.get_flattened_tree(case)
+        tree.assign_types()
+        return repr(tree.accept(visitors.Sorter(mode = visitors.Sorter.BY_EXPR_TYPE)))
+
+    @staticmethod
+    def get_expected_result(val):
+        return repr(SortingTestCases.get_flattened_tree(val))
+
+    def test_sort_by_subtree_repr(self):
+        test_util.run_through_cases(self, self.sort_by_subtree_repr_cases, self.get_subtree_repr_test_result, self.get_expected_result)
+
+    def test_sort_by_expr_type(self):
+        test_util.run_through_cases(self, self.sort_by_expr_type_cases, self.get_expr_type_test_result, self.get_expected_result)
+
+    def test_keys_are_not_kept_between_passes(self):
+        sorter = visitors.Sorter(mode = visitors.Sorter.BY_SUBTREE_REPR)
+        tree = self.get_flattened_tree("b + a")
+        self.assertEqual(repr(tree.accept(sorter)), repr(self.get_flattened_tree("a + b")))
+        self.assertEqual(sorter.subtree_keys, {})
+
+        # the input is unchanged, and a changed tree is sorted by its new values
+        tree.children[0].value = "z"
+        self.assertEqual(repr(tree.accept(sorter)), repr(self.get_flattened_tree("a + z")))
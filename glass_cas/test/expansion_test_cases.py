@@ -102,9 +102,16 @@ expand_integer_power_cases = [
     (   "expand((a+b+c)^1)"     , "a+b+c"),
     (   
         "expand((a+b+c)^2)",
-        ("(a^2 + 2*a*b + b^2) + (2*a*c + 2*b * c) + c^2")
-    )
-
+        ("a^2 + 2*a*b + 2*a*c + b^2 + 2*b*c + c^2")
+    ),
+    (
+        "expand((a-(b-c))^2)",
+        ("a^2 + (-2)*a*b + 2*a*c + b^2 + (-2)*b*c + c^2")
+    ),
+    (
+        "expand((2*x + y)^2)",
+        ("(2*x)^2 + 2*2*x*y + y^2")
+    ),
 
 ]
 
@@ -216,3 +223,18 @@ balanced_unflatten_add_and_mult_cases = [
         "1 2 + 3 + 4 5 + 6 + * 7 8 + 9 + *"
     ),
 ]
+
+# sorting is done on flattened trees
+sort_by_subtree_repr_cases = [
+    ("c + a + b"            , "a + b + c"           ),
+    ("10 + 9 + x + 100 + 2.5", "2.5 + 9 + 10 + 100 + x"),
+    ("x^10 + x^9 + x^2"     , "x^2 + x^9 + x^10"    ),
+    ("(b*a) + (a*c)"        , "(a*b) + (a*c)"       ),
+    ("x - 10 - 9"           , "x - 10 - 9"          ),
+]
+
+sort_by_expr_type_cases = [
+    ("x^2 + x + 1"          , "1 + x + x^2"         ),
+    ("x^10 + x^9 + 12 + 3"  , "3 + 12 + x^9 + x^10" ),
+    ("y + 2^x + 1/x + x + z/w", "z/w + x + y + 1/x + 2^x"),
+]
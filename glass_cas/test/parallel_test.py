@@ -0,0 +1,53 @@
+'''
+Don't run this. Use GlassCAS/run_tests.py.
+'''
+
+import unittest
+from unittest import mock
+from ..parsing import parsing
+from ..parsing.parser_definitions import *
+from ..polynomial import Polynomial
+from .. import parallel
+
+class ParallelExpansionTestCases(unittest.TestCase):
+    '''
+    This tests parallel.expand_in_parallel.
+    '''
+
+    def setUp(self):
+        self.parser = parsing.Parser()
+        sums = ["(%s)" % " + ".join("%s%s^%s" % (i + 1, name, i) for i in range(6)) for name in "xyz"]
+        self.product = self.parser.parse(" * ".join(sums) + " * (x - y/2)")
+
+    def test_same_as_expand(self):
+        expected = repr(ExpandOp().apply(self.product))
+        result = parallel.expand_in_parallel(self.product, processes = 2, threshold = 0)
+        self.assertEqual(repr(result), expected)
+
+    def test_small_products_are_serial(self):
+        with mock.patch.object(parallel, 'ProcessPoolExecutor') as executor:
+            result = parallel.expand_in_parallel(self.product, processes = 2)
+            self.assertFalse(executor.called)
+        self.assertEqual(repr(result), repr(ExpandOp().apply(self.product)))
+
+    def test_not_polynomial(self):
+        tree = self.parser.parse("(a + sin(b)) * (c + d)")
+        result = parallel.expand_in_parallel(tree, processes = 2, threshold = 0)
+        self.assertEqual(repr(result), repr(ExpandOp().apply(tree)))
+
+    def test_product_factors(self):
+        factors = parallel.product_factors(self.parser.parse("(a+b) * c * (d * (e+f))"))
+        self.assertEqual([str(f) for f in factors], ["(a + b)", "c", "d", "(e + f)"])
+
+    def test_encoding(self):
+        p = Polynomial.convert(self.parser.parse("3*x^2*z - y/2 + 1"))
+        symbols = parallel.symbol_table([p])
+        self.assertEqual([str(s) for s in symbols], ["x", "y", "z"])
+        encoded = parallel.encode(p, symbols)
+        self.assertIn(((2, 0, 1), 3), encoded)
+        self.assertEqual(parallel.decode(dict(encoded), symbols), p)
+
+    def test_chunks(self):
+        chunks = parallel.split_terms(list(range(10)), 4)
+        self.assertEqual(chunks, [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]])
+        self.assertEqual(parallel.split_terms([1], 4), [[1]])
@@ -164,6 +164,14 @@ class TreeTestCases(unittest.TestCase):
 
         test_util.run_through_cases(self, self.sub_constants_cases, get_test_result)
 
+    def test_compound_arguments(self):
+        # each argument is complete at the argument delimiter
+        parser = parsing.Parser()
+        self.assertEqual(repr(parser.parse("powmod(1+2, 2, 2+3)")), "1 2 + 2 2 3 + powmod")
+        self.assertEqual(parser.parse("powmod(1+2, 2, 2+3)").reduce().value, 4)
+        parser.parse("f[x, y] := x - y", update_symbol_table = True)
+        self.assertEqual(parser.parse("f(1+2, 2*3)").reduce().value, -3)
+
     def test_bad_inputs(self):
         for key in self.bad_input_cases:
             with self.assertRaises(SyntaxError):
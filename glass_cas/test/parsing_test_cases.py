@@ -444,6 +444,11 @@ rpn_arg_delimiter_cases = [
         [UserFunction('f', [Var('x'), Var('y'), Var('z')], 5), '(', 4, ARG_DELIM, 5, ARG_DELIM, 6, ')'],
         [4, 5, 6, UserFunction('f', [Var('x'), Var('y'), Var('z')], 5)]
     ),
+    # each argument is complete at the delimiter
+    (
+        [PowModOp(), '(', Var('x'), PlusOp(), 1, ARG_DELIM, 2, ARG_DELIM, 3, TimesOp(), 4, ')'],
+        [Var('x'), 1, PlusOp(), 2, 3, 4, TimesOp(), PowModOp()]
+    ),
 ]
 
 rpn_bad_input_cases = [
@@ -0,0 +1,195 @@
+'''
+Don't run this. Use GlassCAS/run_tests.py.
+'''
+
+import unittest, random
+from fractions import Fraction
+from ..parsing import parsing
+from ..parsing.parser_definitions import *
+from ..polynomial import Polynomial, NotPolynomialError
+from ..rational import RationalFunction
+from .. import univariate
+from . import polynomial_test_cases as poly_cases
+from . import test_util
+
+class PolynomialTestCases(unittest.TestCase):
+    '''
+    This tests polynomial.Polynomial, and its use by expand and simplify.
+    '''
+
+    def setUp(self):
+        self.parser = parsing.Parser()
+
+    def get_test_result(self, case):
+        return str(Polynomial.from_tree(self.parser.parse(case)))
+
+    def get_reduced_result(self, case):
+        return repr(self.parser.parse(case).reduce())
+
+    def get_expected_result(self, val):
+        return repr(self.parser.parse(val))
+
+    def test_conversion(self):
+        test_util.run_through_cases(self, poly_cases.conversion_cases, self.get_test_result)
+
+    def test_not_polynomial(self):
+        for case in poly_cases.not_polynomial_cases:
+            tree = self.parser.parse(case)
+            self.assertFalse(Polynomial.is_polynomial_tree(tree))
+            self.assertRaises(NotPolynomialError, Polynomial.from_tree, tree)
+
+    def test_round_trip(self):
+        for case, _ in poly_cases.conversion_cases:
+            tree = self.parser.parse(case)
+            p = Polynomial.from_tree(tree)
+            self.assertEqual(Polynomial.from_tree(p.to_tree(tree)), p)
+
+    def test_arithmetic(self):
+        x = Polynomial.variable(Var('x'))
+        y = Polynomial.variable(Var('y'))
+        self.assertEqual((x + y)**2, x*x + 2*x*y + y*y)
+        self.assertEqual((x + 1)**5 - (x + 1)**5, 0)
+        self.assertEqual(((x + y)**3).degree(), 3)
+        self.assertEqual(((x + y)**3).degree(Var('y')), 3)
+        self.assertEqual(len((x + y)**3), 4)
+        self.assertEqual(Polynomial().degree(), -1)
+        self.assertEqual([str(s) for s in (y*x + 1).symbols()], ['x', 'y'])
+
+    def test_exact_coefficients(self):
+        x = Polynomial.variable(Var('x'))
+        p = ((x + 1) * 3).divide_by_constant(9) ** 3
+        self.assertEqual(p.terms[()], Fraction(1, 27))
+        self.assertEqual((p * 27).terms[()], 1)
+        self.assertRaises(ZeroDivisionError, x.divide_by_constant, 0)
+
+    def test_routing(self):
+        test_util.run_through_cases(self, poly_cases.routing_cases, self.get_reduced_result, self.get_expected_result)
+
+    def test_divide(self):
+        x = Polynomial.variable(Var('x'))
+        self.assertEqual((x*x + 1).divide(x + 1), (x - 1, Polynomial.constant(2)))
+        self.assertEqual(((x + 1)**10).divide((x + 1)**4), ((x + 1)**6, Polynomial()))
+        self.assertEqual(Polynomial.constant(3).divide(Polynomial.constant(2)),
+                         (Polynomial.constant(Fraction(3, 2)), Polynomial()))
+        self.assertRaises(ZeroDivisionError, x.divide, Polynomial())
+        self.assertRaises(NotPolynomialError, x.divide, Polynomial.variable(Var('y')))
+
+    def test_division_operators(self):
+        test_util.run_through_cases(self, poly_cases.division_cases, self.get_reduced_result)
+        self.assertRaises(ZeroDivisionError, self.parser.parse("quo(x, 0)").reduce)
+
+class UnivariateTestCases(unittest.TestCase):
+    '''
+    This tests the dense multiplication kernels in univariate.
+    '''
+
+    def setUp(self):
+        self.random = random.Random(42)
+
+    def random_coefficients(self, length, kind):
+        if kind == 'int':
+            return [self.random.randint(-10**20, 10**20) for _ in range(length)]
+        elif kind == 'fraction':
+            return [Fraction(self.random.randint(-9, 9), self.random.randint(1, 6)) for _ in range(length)]
+        return [self.random.uniform(-1, 1) for _ in range(length)]
+
+    def test_kernels_agree(self):
+        for kind in ['int', 'fraction', 'float']:
+            for length in [0, 1, 5, 16, 40, 100]:
+                a = self.random_coefficients(length, kind)
+                b = self.random_coefficients(length // 2 + 1, kind)
+                expected = univariate.trim(univariate.schoolbook_multiply(a, b)) if a else []
+                actual = univariate.multiply(a, b)
+                self.assertEqual(len(actual), len(expected))
+                for x, y in zip(actual, expected):
+                    self.assertAlmostEqual(x, y)
+
+    def test_karatsuba(self):
+        a = self.random_coefficients(100, 'int')
+        b = self.random_coefficients(37, 'int')
+        self.assertEqual(univariate.karatsuba_multiply(a, b), univariate.schoolbook_multiply(a, b))
+
+    def test_kronecker_signs(self):
+        self.assertEqual(univariate.kronecker_multiply([-1, 1], [1, 1]), [-1, 0, 1])
+        self.assertEqual(univariate.kronecker_multiply([-255, -256], [257, -1]), [-65535, -65537, 256])
+
+    def test_power(self):
+        self.assertEqual(univariate.power([1, 1], 4), [1, 4, 6, 4, 1])
+        self.assertEqual(univariate.power([2, 3], 0), [1])
+
+    def test_large_dense_product(self):
+        x = Polynomial.variable(Var('x'))
+        p = Polynomial(dict(((((Var('x'), i),) if i else ()), i + 1) for i in range(2000)))
+        self.assertEqual(p.dense_symbol(), Var('x'))
+        product = p * p
+        self.assertEqual(product.degree(), 3998)
+        self.assertEqual(product.terms[((Var('x'), 1999),)], sum((i + 1) * (2000 - i) for i in range(2000)))
+        self.assertEqual((x + 1) ** 20, (x*x + 2*x + 1) ** 10)
+
+    def test_divide(self):
+        # x^3 - 1 = (x^2 + x + 1)(x - 1)
+        self.assertEqual(univariate.divide([-1, 0, 0, 1], [-1, 1]), ([1, 1, 1], []))
+        self.assertEqual(univariate.divide([1, 2, 3], [1, 1]), ([-1, 3], [2]))
+        self.assertEqual(univariate.divide([1, 1], [0, 0, 1]), ([], [1, 1]))
+        self.assertEqual(univariate.divide([1, 0, 1], [2]), ([Fraction(1, 2), 0, Fraction(1, 2)], []))
+        self.assertRaises(ZeroDivisionError, univariate.divide, [1, 1], [0])
+
+    def test_large_division(self):
+        q = self.random_coefficients(2000, 'int') + [1]
+        b = self.random_coefficients(500, 'int') + [3]
+        a = univariate.multiply(q, b)
+        a[7] += 5
+        quotient, remainder = univariate.divide(a, b)
+        self.assertEqual(quotient, q)
+        self.assertEqual(remainder, [0] * 7 + [5])
+
+    def test_from_polynomial(self):
+        x = Polynomial.variable(Var('x'))
+        p = x ** 3 + 2
+        self.assertEqual(univariate.from_polynomial(p, Var('x')), [2, 0, 0, 1])
+        # degree is only a size hint
+        self.assertEqual(univariate.from_polynomial(p, Var('x'), degree = 5), [2, 0, 0, 1])
+        self.assertEqual(univariate.from_polynomial(p, Var('x'), degree = 1), [2, 0, 0, 1])
+
+    def test_gcd(self):
+        self.assertEqual(univariate.gcd([-1, 0, 1], [1, 2, 1]), [1, 1])
+        self.assertEqual(univariate.gcd([0, 0, 6], [0, 4]), [0, 1])
+        self.assertEqual(univariate.gcd([1, 1], [2]), [1])
+        self.assertEqual(univariate.gcd([], [2, 4]), [Fraction(1, 2), 1])
+        a = univariate.multiply([1, 2, 3], [5, -1, 4, 1])
+        b = univariate.multiply([1, 2, 3], [-7, 0, 2])
+        self.assertEqual(univariate.gcd(a, b), [Fraction(1, 3), Fraction(2, 3), 1])
+
+class RationalFunctionTestCases(unittest.TestCase):
+    '''
+    This tests rational.RationalFunction, and its use by simplify.
+    '''
+
+    def setUp(self):
+        self.parser = parsing.Parser()
+
+    def get_test_result(self, case):
+        return str(RationalFunction.from_tree(self.parser.parse(case)))
+
+    def test_conversion(self):
+        test_util.run_through_cases(self, poly_cases.rational_function_cases, self.get_test_result)
+
+    def test_not_rational(self):
+        for case in ["x ^ y", "x ^ 0.5", "sin(x)"]:
+            self.assertRaises(NotPolynomialError, RationalFunction.from_tree, self.parser.parse(case))
+        self.assertRaises(ZeroDivisionError, RationalFunction.from_tree, self.parser.parse("1 / (x - x)"))
+
+    def test_repeated_arithmetic(self):
+        # 1/(x+1) - 1/(x+2) + ... telescopes, and the bottom stays small
+        x = RationalFunction(Polynomial.variable(Var('x')))
+        one = RationalFunction(Polynomial.constant(1))
+        total = RationalFunction(Polynomial.constant(0))
+        for k in range(1, 30):
+            total = total + one / (x + RationalFunction(Polynomial.constant(k))) \
+                          - one / (x + RationalFunction(Polynomial.constant(k + 1)))
+            self.assertEqual(total.bottom.degree(), 2)
+        self.assertEqual(str(total), "(29) / (30 + 31*x + 1*x^2)")
+
+    def test_simplify(self):
+        self.assertEqual(repr(self.parser.parse("simplify(x^2 / x)").reduce()), repr(self.parser.parse("x")))
+        self.assertEqual(repr(self.parser.parse("simplify((x^2 - 1)/(x + 1))").reduce()), "-1 x +")
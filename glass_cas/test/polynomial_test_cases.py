@@ -0,0 +1,86 @@
+'''
+Test cases for polynomial.Polynomial.
+
+Inputs are parsed and converted with Polynomial.from_tree. Expected
+values are the str() of the result, with terms in graded order.
+'''
+
+conversion_cases = [
+    ("x"                    , "1*x"                         ),
+    ("3"                    , "3"                           ),
+    ("x - x"                , "0"                           ),
+    ("x + y + x"            , "2*x + 1*y"                   ),
+    ("2*x*y*3"              , "6*x*y"                       ),
+    ("-(x - 1)"             , "1 + -1*x"                    ),
+    ("x / 2"                , "1/2*x"                       ),
+    ("(x + 2) / (1 + 3)"    , "1/2 + 1/4*x"                 ),
+    ("(x + 1)^0"            , "1"                           ),
+    ("(x + 1)^3"            , "1 + 3*x + 3*x^2 + 1*x^3"     ),
+    ("(x - y)^2"            , "1*x^2 + -2*x*y + 1*y^2"      ),
+    ("(x + y)*(x - y)"      , "1*x^2 + -1*y^2"              ),
+    ("(x + 0.5)^2"          , "0.25 + 1.0*x + 1*x^2"        ),
+    ("x*y*x*z"              , "1*x^2*y*z"                   ),
+]
+
+not_polynomial_cases = [
+    "x / y",
+    "x ^ y",
+    "x ^ -1",
+    "x ^ 0.5",
+    "sin(x)",
+    "1 / (x + 1)",
+]
+
+# ExpandOp and SimplifyOp route polynomials through Polynomial
+routing_cases = [
+    ("expand((x + 1)^3)"    , "1 + 3*x + 3*x^2 + x^3"       ),
+    ("expand((a+b)*(c+d))"  , "a*c + a*d + b*c + b*d"       ),
+    ("expand(-a - b)"       , "-a - b"                      ),
+    ("expand(x*(x - 1))"    , "-x + x^2"                    ),
+    ("simplify(x + x + x)"  , "3*x"                         ),
+    ("simplify((x-y)^2 - x^2)" , "-(2*x*y) + y^2"           ),
+    ("simplify(x*y - y*x)"  , "0"                           ),
+
+    # not polynomials, so these are left to Expander and Simplifier
+    ("expand(2^x)"          , "2^x"                         ),
+    ("expand(9^9^9)"        , "9^387420489"                 ),
+]
+
+# quo, rem and divmod divide polynomials in one variable. Expected values
+# are the repr() of the reduced tree, since parsing 1/2 gives a float.
+division_cases = [
+    ("quo(x^2 + 1, x + 1)"      , "-1 x +"                      ),
+    ("rem(x^2 + 1, x + 1)"      , "2"                           ),
+    ("quo(x^3 - 1, x - 1)"      , "1 x + x 2 ^ +"               ),
+    ("rem(x^3 - 1, x - 1)"      , "0"                           ),
+    ("quo(x^3, 2*x^2 + 1)"      , "1/2 x *"                     ),
+    ("rem(x^3, 2*x^2 + 1)"      , "1/2 x * `"                   ),
+    ("quo(x + 1, x^2)"          , "0"                           ),
+    ("rem(x + 1, x^2)"          , "1 x +"                       ),
+    ("quo(7, 2)"                , "7/2"                         ),
+    ("2*quo(x^2 - 1, x - 1)"    , "2 1 x + *"                   ),
+    ("divmod(x^2 + 1, x + 1)"   , "x 2 ^ 1 + x 1 + -1 x + * 2 + ="),
+
+    # not polynomials in one variable, so these are left alone
+    ("quo(x*y, x)"              , "x y * x quo"                 ),
+    ("rem(x, y)"                , "x y rem"                     ),
+    ("quo(2^x, x)"              , "2 x ^ x quo"                 ),
+]
+
+# RationalFunction results are in lowest terms; expected values are str() of the result
+rational_function_cases = [
+    ("x / x"                    , "1"                           ),
+    ("x^2 / x"                  , "1*x"                         ),
+    ("(x^2 - 1) / (x - 1)"      , "1 + 1*x"                     ),
+    ("(x^2 - 1) / (2*x - 2)"    , "1/2 + 1/2*x"                 ),
+    ("(x + 1) / (2*x + 2)"      , "1/2"                         ),
+    ("(x^3 - 1) / (x^2 - 1)"    , "(1 + 1*x + 1*x^2) / (1 + 1*x)"),
+    ("(2*x + 2) / (4*x)"        , "(1 + 1*x) / (2*x)"           ),
+    ("(x + 1) / (-2*x)"         , "(-1 + -1*x) / (2*x)"         ),
+    ("(x/2) / (x + 1)"          , "(1*x) / (2 + 2*x)"           ),
+    ("1 / (1/x)"                , "1*x"                         ),
+    ("(x + 1)^3 / (x + 1)^2"    , "1 + 1*x"                     ),
+    ("(1.5*x) / x"              , "1.5"                         ),
+    ("(x*y) / x"                , "(1*x*y) / (1*x)"             ),
+    ("0 / x"                    , "0"                           ),
+]
@@ -1,7 +1,11 @@
 import unittest
+from unittest import mock
 
 from ..parsing import parsing
 from .. import visitors
+from ..node import node
+from .. import expression_types
+from ..expression_types import *
 from . import recognition_test_cases as rt_cases
 from . import test_util
 
@@ -15,6 +19,7 @@ class RecognitionTestCases(unittest.TestCase):
         self.rational_expr_on_left_cases    = rt_cases.rational_expr_on_left_cases
         self.exponential_expr_on_left_cases = rt_cases.exponential_expr_on_left_cases
         self.equation_expr_cases            = rt_cases.equation_expr_cases
+        self.multivariate_expr_cases        = rt_cases.multivariate_expr_cases
 
     @staticmethod
     def get_test_result(case):
@@ -36,3 +41,271 @@ class RecognitionTestCases(unittest.TestCase):
 
     def test_equation_expr(self):
         test_util.run_through_cases(self, self.equation_expr_cases, self.get_test_result)
+
+    def test_multivariate_expr(self):
+        test_util.run_through_cases(self, self.multivariate_expr_cases, self.get_test_result)
+
+class FlattenedRecognitionTestCases(unittest.TestCase):
+    '''
+    This tests visitors.Recognizer.visit on flattened (n-ary) trees.
+    '''
+    def setUp(self):
+        self.constant_expr_on_left_cases   = rt_cases.constant_expr_on_left_cases
+        self.polynomial_expr_on_left_cases = rt_cases.polynomial_expr_on_left_cases
+        self.rational_expr_on_left_cases   = rt_cases.rational_expr_on_left_cases
+
+    @staticmethod
+    def get_test_result(case):
+        tree = parsing.Parser().parse(case)
+        flat_tree = tree.accept(visitors.Flattener())
+        return visitors.Recognizer().visit(flat_tree)
+
+    def test_constant_expr_on_left(self):
+        test_util.run_through_cases(self, self.constant_expr_on_left_cases, self.get_test_result)
+
+    def test_polynomial_expr_on_left(self):
+        test_util.run_through_cases(self, self.polynomial_expr_on_left_cases, self.get_test_result)
+
+    def test_rational_expr_on_left(self):
+        test_util.run_through_cases(self, self.rational_expr_on_left_cases, self.get_test_result)
+
+    def test_every_subtree_is_typed(self):
+        tree = parsing.Parser().parse("x^2 + 3*x*x + 4 + (x + 1)*(x + 2)*(x + 3)")
+        flat_tree = tree.accept(visitors.Flattener())
+        self.assertEqual(len(flat_tree.children), 4)
+
+        flat_tree.assign_types()
+        self.assertEqual(flat_tree.expr_type, PolynomialExpr(Var("x"), 3))
+        for child, degree in zip(flat_tree.children, [2, 2, 0, 3]):
+            self.assertEqual(child.expr_type.degree, degree)
+
+class TypedReductionTestCases(unittest.TestCase):
+    '''
+    This tests visitors.TypedReducer, through node.reduce(assign_types = True).
+    '''
+    def setUp(self):
+        self.typed_reduction_cases = rt_cases.typed_reduction_cases
+
+    @staticmethod
+    def get_test_result(case):
+        tree = parsing.Parser().parse(case)
+        return tree.reduce(assign_types = True).expr_type
+
+    def test_typed_reduction(self):
+        test_util.run_through_cases(self, self.typed_reduction_cases, self.get_test_result)
+
+    def test_every_subtree_is_typed(self):
+        def check(n):
+            self.assertIsNotNone(n.expr_type)
+            for child in n.children:
+                check(child)
+
+        for case, _ in self.typed_reduction_cases:
+            check(parsing.Parser().parse(case).reduce(assign_types = True))
+
+    def test_matches_recognizer(self):
+        # the fused pass should agree with recognizing the reduced tree
+        for case, _ in self.typed_reduction_cases[:-1]:
+            tree = parsing.Parser().parse(case)
+            expected = visitors.Recognizer().visit(tree.reduce())
+            self.assertEqual(tree.reduce(assign_types = True).expr_type, expected)
+
+class ResolutionTableTestCases(unittest.TestCase):
+    '''
+    This tests the rule table behind expression_types.Expr.resolve.
+    '''
+    def test_subclass_operators_use_base_rules(self):
+        times_rule = expression_types.find_rule(ConstantExpr, TimesOp, PolynomialExpr)
+        self.assertIsNotNone(times_rule)
+        self.assertIs(expression_types.find_rule(ConstantExpr, ImplicitMultOp, PolynomialExpr), times_rule)
+
+    def test_commutative_rules(self):
+        x = Var("x")
+        for op in [PlusOp(), SubOp(), TimesOp()]:
+            self.assertEqual(ConstantExpr(3).resolve(op, PolynomialExpr(x, 2)), PolynomialExpr(x, 2))
+            self.assertEqual(PolynomialExpr(x, 2).resolve(op, ConstantExpr(3)), PolynomialExpr(x, 2))
+
+    def test_missing_rules_are_unknown(self):
+        x = Var("x")
+        unknown_rational = RationalExpr(UnknownExpr(), PolynomialExpr(x, 1))
+        cases = [
+            (ExponentialExpr(x, 2), PlusOp(), PolynomialExpr(x, 1)),
+            (PolynomialExpr(x, 1), ModulusOp(), PolynomialExpr(x, 1)),
+            (PolynomialExpr(x, 1), DivideOp(), PolynomialExpr(Var("y"), 1)),
+            (PolynomialExpr(x, 1), DivideOp(), unknown_rational),
+            (unknown_rational, TimesOp(), ConstantExpr(2)),
+            (UnknownExpr(), PlusOp(), ConstantExpr(2)),
+        ]
+        for left, op, right in cases:
+            self.assertIsInstance(left.resolve(op, right), UnknownExpr)
+
+class InternedTypesTestCases(unittest.TestCase):
+    '''
+    This tests that expression types are interned, immutable and hashable.
+    '''
+    def test_equal_types_are_shared(self):
+        x = Var("x")
+        self.assertIs(PolynomialExpr(x, 2), PolynomialExpr(Var("x"), 2))
+        self.assertIs(ConstantExpr(3), ConstantExpr(3))
+        self.assertIs(
+            RationalExpr(ConstantExpr(1), PolynomialExpr(x, 1)),
+            RationalExpr(ConstantExpr(1), PolynomialExpr(x, 1))
+        )
+
+    def test_number_types_are_kept_apart(self):
+        self.assertIsNot(ConstantExpr(2), ConstantExpr(2.0))
+        self.assertEqual(str(ConstantExpr(1).resolve(PlusOp(), ConstantExpr(1))), "ConstantExpr[2]")
+        self.assertEqual(str(ConstantExpr(1.0).resolve(PlusOp(), ConstantExpr(1))), "ConstantExpr[2.0]")
+
+    def test_types_are_immutable(self):
+        poly = PolynomialExpr(Var("x"), 2)
+        with self.assertRaises(AttributeError):
+            poly.degree = 3
+        with self.assertRaises(AttributeError):
+            ConstantExpr(3).var = Var("y")
+
+    def test_types_are_hashable(self):
+        x = Var("x")
+        types = {PolynomialExpr(x, 1), PolynomialExpr(x, 1), ExponentialExpr(x, 2), UnknownExpr()}
+        self.assertEqual(len(types), 3)
+
+    def test_equal_types_hash_alike(self):
+        x = Var("x")
+        types = [
+            ConstantExpr(3), ConstantExpr(3.0), ConstantExpr(4), ConstantExpr(3, var = x),
+            PolynomialExpr(x, 0), PolynomialExpr(Var("y"), 0), PolynomialExpr(x, 1),
+            RationalExpr(ConstantExpr(3), PolynomialExpr(x, 1)),
+            RationalExpr(PolynomialExpr(x, 0), PolynomialExpr(x, 1)),
+        ]
+        for a in types:
+            for b in types:
+                if a == b:
+                    self.assertEqual(hash(a), hash(b), "%s == %s" % (a, b))
+
+        self.assertEqual(ConstantExpr(3), PolynomialExpr(x, 0))
+        self.assertEqual(len({ConstantExpr(3), PolynomialExpr(x, 0)}), 1)
+
+    def test_tree_types_are_shared(self):
+        tree = parsing.Parser().parse(" + ".join(["2*x^3"] * 50))
+        tree.assign_types()
+
+        seen = set()
+        def collect(n):
+            seen.add(id(n.expr_type))
+            for child in n.children:
+                collect(child)
+        collect(tree)
+        self.assertLess(len(seen), 10)
+
+    def test_unknown_reasons_are_lazy(self):
+        x = Var("x")
+        result = PolynomialExpr(x, 1).resolve(ModulusOp(), PolynomialExpr(x, 1))
+        self.assertEqual(result.info_args, ("%", PolynomialExpr(x, 1), PolynomialExpr(x, 1)))
+        self.assertIn("%(PolynomialExpr[Var[x], degree=1]", str(result))
+
+class IncrementalTypesTestCases(unittest.TestCase):
+    '''
+    This tests node.set_child and node.update_types.
+    '''
+    def setUp(self):
+        self.resolve_node = visitors.Recognizer.resolve_node
+        self.resolved = []
+
+        def counting_resolve_node(value, child_types):
+            self.resolved.append(value)
+            return self.resolve_node(value, child_types)
+        visitors.Recognizer.resolve_node = staticmethod(counting_resolve_node)
+
+    def tearDown(self):
+        visitors.Recognizer.resolve_node = staticmethod(self.resolve_node)
+
+    def test_update_types_matches_recognizer(self):
+        for case, expected in rt_cases.polynomial_expr_on_left_cases:
+            tree = parsing.Parser().parse(case)
+            self.assertEqual(tree.update_types(), expected)
+
+    def test_only_the_changed_path_is_resolved(self):
+        tree = parsing.Parser().parse("((x + 1) * (x + 2)) * ((x + 3) * (x + 4))")
+        tree.update_types()
+        self.assertEqual(tree.expr_type, PolynomialExpr(Var("x"), 4))
+
+        # replace the 2 in (x + 2) with x^3
+        self.resolved = []
+        x_plus_2 = tree.children[0].children[1]
+        x_plus_2.set_child(1, parsing.Parser().parse("x^3"))
+
+        # the change is found from the root, two levels up
+        self.assertEqual(tree.update_types(), PolynomialExpr(Var("x"), 6))
+        # the new x^3 subtree (3 nodes) and its 3 ancestors
+        self.assertEqual(len(self.resolved), 6)
+
+    def test_grandchild_change_reaches_the_root(self):
+        tree = parsing.Parser().parse("(x + 1) * 2")
+        self.assertEqual(tree.update_types(), PolynomialExpr(Var("x"), 1))
+
+        tree.children[0].set_child(1, parsing.Parser().parse("x^3"))
+        self.assertEqual(tree.update_types(), PolynomialExpr(Var("x"), 3))
+        self.assertEqual(tree.children[0].expr_type, PolynomialExpr(Var("x"), 3))
+
+    def test_unchanged_types_stop_at_the_parent(self):
+        tree = parsing.Parser().parse("((x + 1) * 2) * 3")
+        tree.update_types()
+
+        # x + 1 --> x + 5 re-resolves the sum, whose type is the same
+        self.resolved = []
+        tree.children[0].children[0].set_child(1, parsing.Parser().parse("5"))
+        self.assertEqual(tree.update_types(), PolynomialExpr(Var("x"), 1))
+        self.assertEqual(len(self.resolved), 2)
+
+    def test_only_the_changed_path_is_visited(self):
+        tree = parsing.Parser().parse(" + ".join("%s*x^%s" % (i, i) for i in range(1, 50)))
+        tree.update_types()
+
+        visited = []
+        refresh_types = node.refresh_types
+        def counting_refresh_types(n):
+            visited.append(n)
+            return refresh_types(n)
+
+        # the sum is left-associated, so its first term is the deepest
+        deepest = tree
+        while len(deepest.children[0].children) > 0 and isinstance(deepest.value, PlusOp):
+            deepest = deepest.children[0]
+        deepest.set_child(1, parsing.Parser().parse("x^60"))
+
+        with mock.patch.object(node, 'refresh_types', counting_refresh_types):
+            self.assertEqual(tree.update_types(), PolynomialExpr(Var("x"), 60))
+            # the path to the change, the new subtree, and the clean
+            # sibling of each node on the path
+            self.assertLess(len(visited), 2 * 50 + 3)
+
+            visited.clear()
+            product = tree.construct(tree, TimesOp(), parsing.Parser().parse("x"), assign_types = True)
+            self.assertEqual(product.expr_type, PolynomialExpr(Var("x"), 61))
+            self.assertEqual(len(visited), 3)
+
+    def test_number_type_changes_are_propagated(self):
+        tree = parsing.Parser().parse("(2 * 3) * 4")
+        self.assertEqual(str(tree.update_types()), "ConstantExpr[24]")
+
+        tree.children[0].set_child(0, parsing.Parser().parse("2.0"))
+        self.assertEqual(str(tree.update_types()), "ConstantExpr[24.0]")
+
+    def test_clean_trees_are_not_resolved(self):
+        tree = parsing.Parser().parse("x^2 + 3*x + 4")
+        tree.update_types()
+
+        self.resolved = []
+        tree.update_types()
+        self.assertEqual(self.resolved, [])
+
+    def test_construct_resolves_one_node(self):
+        left = parsing.Parser().parse("x^2 + 3*x + 4")
+        right = parsing.Parser().parse("x + 1")
+        left.update_types()
+        right.update_types()
+
+        self.resolved = []
+        product = left.construct(left, TimesOp(), right, assign_types = True)
+        self.assertEqual(product.expr_type, PolynomialExpr(Var("x"), 3))
+        self.assertEqual(len(self.resolved), 1)
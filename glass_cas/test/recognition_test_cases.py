@@ -300,3 +300,35 @@ equation_expr_cases = [
   ),
 
 ]
+
+# test cases for MultivariatePolynomialExpr
+multivariate_expr_cases = [
+  ("x * y"          , MultivariatePolynomialExpr({Var("x"): 1, Var("y"): 1}, 2) ),
+  ("x + y"          , MultivariatePolynomialExpr({Var("x"): 1, Var("y"): 1}, 1) ),
+  ("x - y + 3"      , MultivariatePolynomialExpr({Var("x"): 1, Var("y"): 1}, 1) ),
+  ("3 * x * y"      , MultivariatePolynomialExpr({Var("x"): 1, Var("y"): 1}, 2) ),
+  ("x^2*y + y^3 + 1", MultivariatePolynomialExpr({Var("x"): 2, Var("y"): 3}, 3) ),
+  ("(x + y)^3"      , MultivariatePolynomialExpr({Var("x"): 3, Var("y"): 3}, 3) ),
+  ("(x*y) / 2"      , MultivariatePolynomialExpr({Var("x"): 1, Var("y"): 1}, 2) ),
+  ("x * y * z^2"    , MultivariatePolynomialExpr({Var("x"): 1, Var("y"): 1, Var("z"): 2}, 4) ),
+  ("(x*y) * x"      , MultivariatePolynomialExpr({Var("x"): 2, Var("y"): 1}, 3) ),
+  ("(x + y)^0"      , ConstantExpr(1)                                            ),
+  ("(x + y)^0.5"    , UnknownExpr()                                              ),
+  ("x / y"          , UnknownExpr()                                              ),
+  ("(x + y) / x"    , UnknownExpr()                                              ),
+  ("(x*y) + 2^x"    , UnknownExpr()                                              ),
+]
+
+# (input, type of the reduced tree)
+typed_reduction_cases = [
+  ("3 + 4 ^ 2 - 5", ConstantExpr(14)),
+  ("x + 2 * 3", PolynomialExpr(Var("x"), degree=1)),
+  ("(x^2 + 3x + 4) * (x^5 + 4x^3 + 1)", PolynomialExpr(Var("x"), degree=7)),
+  ("1/x", RationalExpr(ConstantExpr(1), PolynomialExpr(Var("x"), degree=1))),
+  ("(1 + 1)^x", ExponentialExpr(Var("x"), base=2)),
+  ("x = 2 + 2", EquationExpr(PolynomialExpr(Var("x"), degree=1), ConstantExpr(4))),
+  ("3 = 4", EquationExpr(ConstantExpr(3), ConstantExpr(4))),
+  ("expand((x+1)^2)", PolynomialExpr(Var("x"), degree=2)),
+  ("-(2 * 3)", ConstantExpr(-6)),
+  ("9^9^9", UnknownExpr()),
+]
@@ -0,0 +1,100 @@
+'''
+Don't run this. Use GlassCAS/run_tests.py.
+'''
+
+import unittest
+from ..parsing import parsing
+from .. import visitors
+from ..parsing.parser_definitions import *
+from . import reduction_test_cases as red_cases
+from . import test_util
+
+class FusionTestCases(unittest.TestCase):
+    '''
+    This tests visitors.Fuser through node.reduce.
+    '''
+
+    def tearDown(self):
+        Fuser = visitors.Fuser
+        Fuser.FUSIONS[SinOp] = [f for f in Fuser.FUSIONS.get(SinOp, []) if f is not self.fuse_sin_zero]
+
+    @staticmethod
+    def get_test_result(case):
+        return repr(parsing.Parser().parse(case).reduce())
+
+    @staticmethod
+    def get_expected_result(val):
+        return repr(parsing.Parser().parse(val).reduce(fuse = False))
+
+    @staticmethod
+    def fuse_sin_zero(n):
+        if n.children[0].value == 0:
+            return n.copy(value = 0)
+        return None
+
+    def test_fusions(self):
+        test_util.run_through_cases(self, red_cases.fusion_cases, self.get_test_result, self.get_expected_result)
+
+    def test_log_exp_keeps_the_principal_branch(self):
+        tree = parsing.Parser().parse("ln(e^(10j))")
+        fused = tree.reduce(replace_constants = True)
+        unfused = tree.reduce(replace_constants = True, fuse = False)
+        self.assertAlmostEqual(fused.value, unfused.value)
+        self.assertAlmostEqual(fused.value, 10j - 4j * 3.141592653589793)
+
+    def test_register(self):
+        self.assertEqual(self.get_test_result("sin(0)"), "0j")
+        visitors.Fuser.register(SinOp, self.fuse_sin_zero)
+        self.assertEqual(self.get_test_result("sin(0)"), "0")
+
+    def test_numeric_squares_are_fused(self):
+        fused = parsing.Parser().parse("(2+5)*(2+5)").accept(visitors.Fuser())
+        self.assertEqual(repr(fused), "2 5 + 2 ^")
+        fused = parsing.Parser().parse("x*x").accept(visitors.Fuser())
+        self.assertEqual(repr(fused), "x x *")
+
+    def test_input_is_unchanged(self):
+        tree = parsing.Parser().parse("(x*x) % 5")
+        tree.accept(visitors.Fuser())
+        self.assertEqual(repr(tree), "x x * 5 %")
+
+class CostDeferralTestCases(unittest.TestCase):
+    '''
+    This tests that Reducer leaves huge integer results unevaluated.
+    '''
+
+    @staticmethod
+    def get_test_result(case):
+        return repr(parsing.Parser().parse(case).reduce())
+
+    @staticmethod
+    def get_expected_result(val):
+        return repr(parsing.Parser().parse(val))
+
+    def test_deferred(self):
+        test_util.run_through_cases(self, red_cases.deferred_cases, self.get_test_result, self.get_expected_result)
+
+    def test_computed(self):
+        test_util.run_through_cases(self, red_cases.computed_cases, self.get_test_result, self.get_expected_result)
+
+    def test_forced_evaluation(self):
+        tree = parsing.Parser().parse("2^(2^21)")
+        self.assertEqual(repr(tree.reduce()), "2 2097152 ^")
+        self.assertEqual(tree.reduce(max_bits = None).value, 2**(2**21))
+
+    def test_threshold(self):
+        tree = parsing.Parser().parse("2^100")
+        self.assertEqual(repr(tree.reduce(max_bits = 50)), "2 100 ^")
+        self.assertEqual(tree.reduce(max_bits = 200).value, 2**100)
+
+    def test_fused_powmod_matches_unfused(self):
+        # both are left unevaluated, rather than computing 3^30000000
+        tree = parsing.Parser().parse("(3^30000000) % 7.0")
+        self.assertEqual(repr(tree.reduce(fuse = False)), "3 30000000 ^ 7.0 %")
+        self.assertEqual(repr(tree.reduce()), "3 30000000 7.0 powmod")
+
+    def test_compiled_functions(self):
+        parser = parsing.Parser()
+        parser.parse("f[x] := 9^x + 1", update_symbol_table = True)
+        self.assertEqual(repr(parser.parse("f(2)").reduce()), "82")
+        self.assertEqual(repr(parser.parse("f(10^9)").reduce()), "9 1000000000 ^ 1 +")
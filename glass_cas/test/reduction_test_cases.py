@@ -0,0 +1,57 @@
+'''
+Test cases for node.reduce.
+
+Expected values are parsed and then reduced without fusion, so they
+are compared structurally.
+'''
+
+fusion_cases = [
+    ("7^123456 % 1000"      , "601"             ),
+    ("2^10 % 7"             , "2"               ),
+    ("(2+5)^(3*4) % 10"     , "1"               ),
+    ("powmod(3, 4, 5)"      , "1"               ),
+    ("(2^-1) % 5"           , "0.5"             ),
+    ("(2.0^3) % 5"          , "3.0"             ),
+    ("x^2 % 5"              , "x^2 % 5"         ),
+
+    ("e^(ln x)"             , "x"               ),
+    ("e^(ln 5)"             , "5"               ),
+    ("ln(e^2)"              , "2"               ),
+    ("ln(e^2.5)"            , "2.5"             ),
+    # not real numbers, so ln(e^x) is left to the principal branch
+    ("ln(e^x)"              , "ln(e^x)"         ),
+    ("ln(e^(x+1))"          , "ln(e^(x+1))"     ),
+    ("ln(e^(10j))"          , "ln(e^(10j))"     ),
+
+    ("(2+5)*(2+5)"          , "49"              ),
+    ("(3^40)*(3^40)"        , "3^80"            ),
+    ("3*3"                  , "9"               ),
+    # symbolic products are left as they are
+    ("x*x"                  , "x*x"             ),
+    ("x x"                  , "x x"             ),
+    ("(a+b)*(a+b)"          , "(a+b)*(a+b)"     ),
+    ("x*y"                  , "x*y"             ),
+    ("x*x*x"                , "x*x*x"           ),
+]
+
+# these are compared to the unreduced parse of the expected value
+deferred_cases = [
+    ("9^9^9"                , "9^387420489"     ),
+    ("100000!"              , "100000!"         ),
+    ("(10^6)!"              , "1000000!"        ),
+    ("(2^2000000)*(2^2000000)" , "(2^2000000)^2"),
+    ("3 * 9^9^9"            , "3 * 9^387420489" ),
+    ("x + 9^9^9"            , "x + 9^387420489" ),
+    # powmod computes the power in full for non-integer operands
+    ("(3^30000000) % 7.0"   , "powmod(3, 30000000, 7.0)"),
+]
+
+# these are not too large, so they are computed as usual
+computed_cases = [
+    ("2^10"                 , "1024"            ),
+    ("10!"                  , "3628800"         ),
+    ("1^(10^100)"           , "1"               ),
+    ("2.0^100"              , "1267650600228229401496703205376.0"),
+    ("(7^123456) % 1000"    , "601"             ),
+    ("powmod(3, 30000000, 7)" , "1"             ),
+]
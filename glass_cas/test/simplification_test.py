@@ -1,6 +1,8 @@
-import unittest
+import unittest, os, tempfile
 from ..parsing import parsing
+from ..parsing.parser_definitions import SimplifyOp
 from .. import visitors
+from ..simplify_cache import SimplifyCache, structural_key
 from . import simplification_test_cases as simp_cases
 from . import test_util
 
@@ -28,3 +30,124 @@ class SimplificationTestCases(unittest.TestCase):
 
     def test_polynomial_division_simplification(self):
         test_util.run_through_cases(self, simp_cases.polynomial_division_cases, self.get_test_result)
+
+    def test_multivariate_polynomial_simplification(self):
+        test_util.run_through_cases(self, simp_cases.multivariate_polynomial_cases, self.get_test_result)
+
+    def test_univariate_multiplication_simplification(self):
+        test_util.run_through_cases(self, simp_cases.univariate_multiplication_cases, self.get_test_result)
+
+    def test_like_term_collection(self):
+        test_util.run_through_cases(self, simp_cases.like_term_cases, self.get_test_result)
+
+    def test_nested_sums_are_collected_in_order(self):
+        parse = parsing.Parser().parse
+        n = parse("y + x")
+        n.children = [parse("y"), parse("x + 2"), parse("y"), parse("x")]
+        result = visitors.Simplifier().collect_like_terms(n)
+        self.assertEqual(repr(result), "2 y * 2 x * 2 +")
+
+        n.children = [parse("x"), parse("1")] * 20000
+        result = visitors.Simplifier().collect_like_terms(n)
+        self.assertEqual(repr(result), "20000 x * 20000 +")
+
+    def test_rational_simplification(self):
+        test_util.run_through_cases(self, simp_cases.rational_cases, self.get_test_result)
+
+    def test_rational_stays_small(self):
+        # (x+1)/(x+2) + 1/(x+2) + ... the tree grows, but the result doesn't
+        case = " + ".join(["1/(x+2)"] * 20 + ["(x+1)/(x+2)"])
+        self.assertEqual(self.get_test_result(case), "21 x + 2 x + /")
+
+    def test_normalizer_only_assigns_types(self):
+        # constants, user functions and expand are left for the Reducer
+        parser = parsing.Parser()
+        parser.parse("f[x] := x + 1", update_symbol_table = True)
+        normalize = lambda case: parser.parse(case).accept(visitors.Normalizer())
+
+        result = normalize("2*3 + x")
+        self.assertEqual(repr(result), "2 3 * x +")
+        self.assertEqual(str(result.expr_type), "PolynomialExpr[Var[x], degree=1]")
+        self.assertEqual(str(result.children[0].expr_type), "ConstantExpr[6]")
+        self.assertEqual(repr(normalize("f(2) - x")), "2 f[x] -1 x * +")
+        self.assertEqual(repr(normalize("expand((x+1)^2) / 2")), "1 x + 2 ^ expand 1 2 / *")
+
+    def test_monomial_key(self):
+        # terms are flattened when they are simplified
+        flattened = lambda case: parsing.Parser().parse(case).accept(visitors.Flattener())
+        key = lambda case: visitors.Simplifier.monomial_key(flattened(case))[:2]
+        self.assertEqual(key("3*x*y^2"), (3, ((('x', 1), ('y', 2)), ())))
+        self.assertEqual(key("y^2*x"), key("y*x*y"))
+        self.assertEqual(key("5"), (5, ((), ())))
+
+class SimplifyCacheTestCases(unittest.TestCase):
+    '''
+    This tests simplify_cache.SimplifyCache with Simplifier and SimplifyOp.
+    '''
+
+    def setUp(self):
+        self.parser = parsing.Parser()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        SimplifyOp.cache = None
+        self.directory.cleanup()
+
+    def key(self, case):
+        return structural_key(self.parser.parse(case))
+
+    def test_structural_key(self):
+        self.assertEqual(self.key("x + 2*y"), self.key("x+2*y"))
+        self.assertNotEqual(self.key("x + 2*y"), self.key("x + 2*z"))
+        self.assertNotEqual(self.key("x + 1"), self.key("x + 1.0"))
+        self.assertNotEqual(self.key("x + (y + z)"), self.key("(x + y) + z"))
+        flattened = self.parser.parse("x + y + z").accept(visitors.Flattener())
+        self.assertNotEqual(structural_key(flattened), self.key("(x + y) + z"))
+
+    def test_user_functions_are_not_cached(self):
+        self.parser.parse("f[x] := x + 1", update_symbol_table = True)
+        self.assertIsNone(self.key("f(2) + x"))
+
+    def test_repeated_calls(self):
+        cache = SimplifyCache()
+        tree = self.parser.parse("sin(x) + (x*y + y*x) * sin(x)")
+        first = tree.accept(visitors.Simplifier(cache = cache))
+        second = tree.accept(visitors.Simplifier(cache = cache))
+        self.assertEqual(repr(first), repr(second))
+        self.assertIsNot(first, second)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_repeated_subterms(self):
+        cache = SimplifyCache()
+        tree = self.parser.parse("(x + x + 3*x) * (x + x + 3*x)")
+        result = tree.accept(visitors.Simplifier(cache = cache))
+        self.assertEqual(repr(result), repr(tree.accept(visitors.Simplifier())))
+        self.assertGreater(cache.stats()['hits'], 0)
+
+    def test_eviction(self):
+        cache = SimplifyCache(max_size = 2)
+        for case in ["x + x", "y + y", "z + z"]:
+            self.parser.parse(case).accept(visitors.Simplifier(cache = cache))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats()['evictions'], cache.stats()['misses'] - 2)
+
+    def test_simplify_op(self):
+        SimplifyOp.cache = SimplifyCache()
+        for i in range(3):
+            result = self.parser.parse("simplify(x + x + sin(y))").reduce()
+            self.assertEqual(str(result), "((sin(y) + x) + x)")
+        self.assertEqual(SimplifyOp.cache.stats()['hits'], 2)
+
+    def test_disk(self):
+        path = os.path.join(self.directory.name, "simplify")
+        SimplifyOp.cache = SimplifyCache(path = path)
+        expected = str(self.parser.parse("simplify((x + 1)^2 + sin(y))").reduce())
+        SimplifyOp.cache.close()
+
+        # a new cache, as in a new process, finds the result on disk
+        SimplifyOp.cache = SimplifyCache(path = path)
+        result = self.parser.parse("simplify((x + 1)^2 + sin(y))").reduce()
+        self.assertEqual(str(result), expected)
+        self.assertEqual(SimplifyOp.cache.stats()['disk_hits'], 1)
+        self.assertEqual(SimplifyOp.cache.stats()['misses'], 0)
+        SimplifyOp.cache.close()
@@ -91,3 +91,44 @@ polynomial_division_cases = [
 # I want to remove all float occurrences before handling this.
 #    ("x / 3"        , "1 3 / x *"     )
 ]
+
+multivariate_polynomial_cases = [
+    ("x + y + x"        , "2 x * y +"),
+    ("x + y + y + x"    , "2 x * 2 y * +"),
+    ("y*x + 2"          , "2 x y * +"),
+    ("(x*y) * (x*y)"    , "x 2 ^ y 2 ^ *"),
+    ("x - y - 2*z"      , "x y - -2 z * +"),
+]
+
+# products of sums in one variable multiply coefficient lists
+univariate_multiplication_cases = [
+    ("(1+x)*(2+x^2)"        , "2 2 x * + x 2 ^ + x 3 ^ +"),
+    ("(x+1)*(x-1)"          , "-1 x 2 ^ +"),
+    ("(x+1)*(x+1)*(x+1)"    , "1 3 x * + 3 x 2 ^ * + x 3 ^ +"),
+    ("(x + 1/2)*(x - 1/2)"  , "-0.25 x 2 ^ +"),
+]
+
+# like terms are collected wherever they are in the sum
+like_term_cases = [
+    ("(3*x) + x + (2*x)"            , "6 x *"),
+    ("x + 2 + x*y + 3 + y*x + x"    , "5 2 x * + 2 x * y * +"),
+    ("x^2 + x + 3*x^2 - x^2*1"      , "x 3 x 2 ^ * +"),
+    ("x*y*x + 2*x^2*y"              , "3 x 2 ^ * y *"),
+    ("x + y - x - y"                , "0"),
+    ("(1+x)^2 + 2*(1+x)^2"          , "3 1 x + 2 ^ *"),
+]
+
+# rational functions in one variable are cancelled to lowest terms
+rational_cases = [
+    ("x / x"                    , "1"),
+    ("x^2 / x"                  , "x"),
+    ("(x^2 - 1) / (x - 1)"      , "1 x +"),
+    ("(2*x + 2) / (4*x)"        , "1 x + 2 x * /"),
+    ("(x+1)/(x+2) + 1/(x+2)"    , "1"),
+    ("1/x + 1/x^2"              , "1 x + x 2 ^ /"),
+    ("x/(x+1) - 1"              , "-1 1 x + /"),
+
+    # the bottom divides the top, so the result is the quotient
+    ("(x^4 - 1) / (x^2 + 1)"    , "-1 x 2 ^ +"),
+    ("(x^2 - 1) / (2*x - 2)"    , "1/2 1/2 x * +"),
+]
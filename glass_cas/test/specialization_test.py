@@ -0,0 +1,48 @@
+'''
+Don't run this. Use GlassCAS/run_tests.py.
+'''
+
+import unittest
+from ..parsing import parsing
+from . import specialization_test_cases as spec_cases
+from . import test_util
+
+class SpecializationTestCases(unittest.TestCase):
+    '''
+    This tests node.specialize and visitors.Specializer.
+    '''
+
+    @staticmethod
+    def parse_bindings(bindings):
+        # strings are parsed, anything else (numbers) is used as is
+        parser = parsing.Parser()
+        return dict((k, parser.parse(v) if isinstance(v, str) else v) for k, v in bindings.items())
+
+    @staticmethod
+    def get_test_result(case):
+        expr, bindings = case
+        tree = parsing.Parser().parse(expr)
+        return repr(tree.specialize(SpecializationTestCases.parse_bindings(bindings)))
+
+    @staticmethod
+    def get_expected_result(val):
+        return repr(parsing.Parser().parse(val))
+
+    @staticmethod
+    def get_compiled_test_result(case):
+        expr, bindings, params, args = case
+        compiled = parsing.Parser().parse(expr).specialize(bindings, params)
+        if compiled == None:
+            return None
+        return compiled(*args)
+
+    def test_specialization(self):
+        test_util.run_through_cases(self, spec_cases.specialization_cases, self.get_test_result, self.get_expected_result)
+
+    def test_compiled_specialization(self):
+        test_util.run_through_cases(self, spec_cases.compiled_specialization_cases, self.get_compiled_test_result)
+
+    def test_input_is_unchanged(self):
+        tree = parsing.Parser().parse("a*x + b")
+        tree.specialize({'a': 0, 'b': 1})
+        self.assertEqual(repr(tree), "a x * b +")
@@ -0,0 +1,31 @@
+'''
+Test cases for node.specialize.
+
+Each input is (expression, bindings). Expected values are parsed, so
+they are compared structurally.
+'''
+
+specialization_cases = [
+    (("x + y"                , {})                          , "x + y"     ),
+    (("x + y"                , {'x': 2})                    , "2 + y"     ),
+    (("(a*x + b) ^ c"        , {'a': 2, 'b': 0, 'c': 1})    , "2 * x"     ),
+    (("(a+b)*x + y*(a-3)"    , {'a': 3, 'b': 4})            , "7 * x"     ),
+    (("a*b*x + c"            , {'a': 0})                    , "c"         ),
+    (("a*x*b"                , {'a': 1, 'b': 1})            , "x"         ),
+    (("(x - a) / b"          , {'a': 0, 'b': 1})            , "x"         ),
+    (("x ^ a"                , {'a': 0})                    , "1"         ),
+    (("x * (2/2)"            , {})                          , "x"         ),
+    (("cos(a) * x"           , {'a': 0})                    , "x"         ),
+
+    # bindings are substituted simultaneously
+    (("x - y"                , {'x': 'y', 'y': 'x'})        , "y - x"     ),
+    (("x * y"                , {'x': "a + 1", 'y': "a"})    , "(a + 1) * a"),
+]
+
+compiled_specialization_cases = [
+    (("(a*x + b) ^ c", {'a': 2, 'b': 0, 'c': 1}, ['x'], (5,))   , 10  ),
+    (("a*x + b*y"    , {'a': 3, 'b': 0}, ['x'], (5,))           , 15  ),
+
+    # b is left unbound, so this can't be compiled
+    (("a*x + b*y"    , {'a': 3}, ['x', 'y'], (5, 2))            , None),
+]
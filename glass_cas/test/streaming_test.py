@@ -0,0 +1,54 @@
+'''
+Don't run this. Use GlassCAS/run_tests.py.
+'''
+
+import unittest, io, itertools
+from ..parsing import parsing
+from .. import visitors
+from ..streaming import iter_expanded_terms, count_expanded_terms, write_expanded_terms
+from . import streaming_test_cases as stream_cases
+
+class StreamingTestCases(unittest.TestCase):
+    '''
+    This tests expanding one term at a time with the streaming module.
+    '''
+
+    def setUp(self):
+        self.parser = parsing.Parser()
+
+    def flattened_repr(self, tree):
+        return repr(tree.accept(visitors.Flattener()))
+
+    def test_expanded_terms(self):
+        for case, expected in stream_cases.expanded_terms_cases:
+            terms = iter_expanded_terms(self.parser.parse(case))
+            self.assertEqual([self.flattened_repr(t) for t in terms],
+                             [self.flattened_repr(self.parser.parse(e)) for e in expected])
+
+    def test_same_terms_as_expander(self):
+        tree = self.parser.parse("(a+b)*(c+d+e)^2*(f+g)")
+        expanded = tree.accept(visitors.Expander()).accept(visitors.Flattener())
+        terms = [self.flattened_repr(t) for t in iter_expanded_terms(tree)]
+        self.assertEqual(terms, [repr(c) for c in expanded.children])
+
+    def test_term_count(self):
+        for case, expected in stream_cases.term_count_cases:
+            self.assertEqual(count_expanded_terms(self.parser.parse(case)), expected)
+
+    def test_term_count_matches_terms(self):
+        for case, expected in stream_cases.expanded_terms_cases:
+            tree = self.parser.parse(case)
+            self.assertEqual(count_expanded_terms(tree), len(list(iter_expanded_terms(tree))))
+
+    def test_huge_expansion_is_lazy(self):
+        # 264385836 terms; only the first few are made
+        tree = self.parser.parse("(a+b+c+d+e+f+g+h)^50")
+        first = list(itertools.islice(iter_expanded_terms(tree), 3))
+        self.assertEqual([str(t) for t in first],
+                         ["(a ^ 50)", "(50 * (a ^ 49) * b)", "(50 * (a ^ 49) * c)"])
+
+    def test_write(self):
+        out = io.StringIO()
+        count = write_expanded_terms(self.parser.parse("(a+b)*(c+d)"), out)
+        self.assertEqual(count, 4)
+        self.assertEqual(out.getvalue(), "(a * c)\n(b * c)\n(a * d)\n(b * d)\n")
@@ -0,0 +1,26 @@
+'''
+Test cases for streaming.iter_expanded_terms and count_expanded_terms.
+
+Expected terms are parsed, so they are compared structurally.
+'''
+
+expanded_terms_cases = [
+    ("x"                    , ["x"]                             ),
+    ("sin(x + y)"           , ["sin(x + y)"]                    ),
+    ("(a+b)*(c-d)"          , ["a*c", "b*c", "-(a*d)", "-(b*d)"]),
+    ("-(a - b)"             , ["-a", "b"]                       ),
+    ("(a+b)/(x+1)"          , ["a/(x+1)", "b/(x+1)"]            ),
+    ("(x-y)^2"              , ["x^2", "-(2*x*y)", "y^2"]        ),
+    ("(a+b)^0"              , ["1"]                             ),
+    ("x*(a+b)^2"            , ["x*a^2", "x*2*a*b", "x*b^2"]     ),
+]
+
+term_count_cases = [
+    ("x"                        , 1         ),
+    ("(a+b+c)*(x+y)"            , 6         ),
+    ("(a+b+c)^4"                , 15        ),
+    ("(a+b)*(c+d)*(e+f) - g"    , 9         ),
+    ("((a+b)*(c+d))^3"          , 20        ),
+    ("(a+b)^100 * (c+d+e)^100"  , 101 * 5151),
+    ("(a+b+c+d+e+f+g+h)^50"     , 264385836 ),
+]
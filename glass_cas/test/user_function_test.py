@@ -0,0 +1,176 @@
+'''
+Don't run this. Use GlassCAS/run_tests.py.
+'''
+
+import unittest
+from ..parsing import parsing
+from . import user_function_test_cases as uf_cases
+from . import test_util
+from ..parsing.parser_definitions import NotNumericError
+
+class ReplacementTestCases(unittest.TestCase):
+    '''
+    This tests node.replace_all and visitors.Replacer.
+    '''
+
+    @staticmethod
+    def get_test_result(case):
+        expr, replacements = case
+        tree = parsing.Parser().parse(expr)
+        return repr(tree.replace_all(replacements))
+
+    def test_replace_all(self):
+        test_util.run_through_cases(self, uf_cases.replace_all_cases, self.get_test_result)
+
+    def test_unchanged_subtrees_are_shared(self):
+        tree = parsing.Parser().parse("(a + b) * x")
+        result = tree.replace_all({'x': 2})
+        self.assertIsNot(result, tree)
+        self.assertIs(result.children[0], tree.children[0])
+
+        # nothing to replace, so nothing is copied
+        self.assertIs(tree.replace_all({'y': 2}), tree)
+
+class FunctionCallTestCases(unittest.TestCase):
+    '''
+    This tests UserFunction.apply through Reducer.
+    '''
+
+    @staticmethod
+    def get_test_result(statements):
+        parser = parsing.Parser()
+        for statement in statements:
+            result = parser.parse(statement).reduce()
+            parser.update_symbol_table(result)
+        return repr(result)
+
+    @staticmethod
+    def get_expected_result(val):
+        return repr(parsing.Parser().parse(val).reduce())
+
+    def test_function_calls(self):
+        test_util.run_through_cases(self, uf_cases.function_call_cases, self.get_test_result, self.get_expected_result)
+
+class CompilationTestCases(unittest.TestCase):
+    '''
+    This tests node.compile and the compiled path of UserFunction.apply.
+    '''
+
+    @staticmethod
+    def get_test_result(case):
+        expr, params, args = case
+        compiled = parsing.Parser().parse(expr).compile(params)
+        if compiled == None:
+            return None
+        return compiled(*args)
+
+    def test_compile(self):
+        test_util.run_through_cases(self, uf_cases.compile_cases, self.get_test_result)
+
+    def test_compiled_at_definition(self):
+        parser = parsing.Parser()
+        parser.parse("f[x] := 3*x + 4", update_symbol_table = True)
+        f = parser.symbol_table['f']
+        self.assertIsNotNone(f._compiled)
+        self.assertEqual(f.call(3), 13)
+
+    def test_redefinition_invalidates(self):
+        parser = parsing.Parser()
+        parser.parse("f[x] := 3*x", update_symbol_table = True)
+        parser.parse("g[x] := f(x) + 1", update_symbol_table = True)
+        f, g = parser.symbol_table['f'], parser.symbol_table['g']
+        self.assertEqual(g.call(2), 7)
+
+        # redefine the function g references, without touching g
+        parser.parse("f[x] := x*x", update_symbol_table = True)
+        self.assertIs(parser.symbol_table['f'], f)
+        self.assertEqual(f.call(3), 9)
+        self.assertEqual(g.call(3), 10)
+        self.assertEqual(repr(parser.parse("f(2)").reduce()), "4")
+        self.assertEqual(repr(parser.parse("g(2)").reduce()), "5")
+        self.assertEqual(repr(parser.parse("g(y)").reduce()), "y y * 1 +")
+
+    def test_redefinition_changes_parameters(self):
+        parser = parsing.Parser()
+        parser.parse("f[x] := 3*x", update_symbol_table = True)
+        parser.parse("g[x] := f(x) + 1", update_symbol_table = True)
+        parser.parse("f[y] := y - 1", update_symbol_table = True)
+        self.assertEqual(repr(parser.parse("g(2)").reduce()), "2")
+
+    def test_circular_functions(self):
+        parser = parsing.Parser()
+        parser.parse("f[x] := 3*x", update_symbol_table = True)
+        parser.parse("g[x] := f(x) + 1", update_symbol_table = True)
+        self.assertRaises(ValueError, parser.parse, "f[x] := g(x)", update_symbol_table = True)
+        self.assertEqual(repr(parser.parse("g(2)").reduce()), "7")
+
+    def test_symbolic_fallback(self):
+        parser = parsing.Parser()
+        parser.parse("f[x] := x + a", update_symbol_table = True)
+        parser.parse("g[x] := f(x) + 1", update_symbol_table = True)
+        g = parser.symbol_table['g']
+        self.assertIsNotNone(g.compile())
+        self.assertRaises(NotNumericError, g.call, 2)
+        self.assertEqual(repr(parser.parse("g(2)").reduce()), "2 a + 1 +")
+
+class MemoizationTestCases(unittest.TestCase):
+    '''
+    This tests call_cache.CallCache through Parser(memoize = True).
+    '''
+
+    def setUp(self):
+        self.parser = parsing.Parser(memoize = True)
+        for definition in ["f[x] := 3*x", "g[x] := f(x) + 1", "h[x] := x*x"]:
+            self.parser.parse(definition, update_symbol_table = True)
+        self.cache = self.parser.call_cache
+
+    def evaluate(self, expr):
+        return repr(self.parser.parse(expr).reduce())
+
+    def test_repeated_calls_hit(self):
+        self.assertEqual(self.evaluate("h(3) + h(3)"), "18")
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(self.evaluate("h(y) + h(y)"), "y y * y y * +")
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+
+    def test_ints_and_floats_are_different_calls(self):
+        self.assertEqual(self.evaluate("h(2)"), "4")
+        self.assertEqual(self.evaluate("h(2.0)"), "4.0")
+
+    def test_lru_bound(self):
+        cache = parsing.Parser(memoize = True, memo_size = 2).call_cache
+        self.parser.symbol_table['h'].call_cache = cache
+        self.evaluate("h(1) + h(2) + h(1) + h(3)")
+        self.assertEqual(len(cache), 2)
+        # h(2) was least recently used
+        self.evaluate("h(1) + h(3)")
+        self.assertEqual(cache.hits, 3)
+        self.evaluate("h(2)")
+        self.assertEqual(cache.misses, 4)
+
+    def test_redefinition_evicts_dependents(self):
+        self.assertEqual(self.evaluate("f(1) + g(1) + h(1)"), "8")
+        self.assertEqual(len(self.cache), 3)
+
+        # g calls f, so both lose their entries, but h keeps its own
+        self.parser.parse("f[x] := 5*x", update_symbol_table = True)
+        self.assertEqual(len(self.cache), 1)
+        self.evaluate("h(1)")
+        self.assertEqual(self.cache.hits, 1)
+
+        # and are recomputed with the new definition
+        self.assertEqual(self.evaluate("f(1)"), "5")
+        self.assertEqual(self.evaluate("g(1)"), "6")
+        self.assertEqual(self.evaluate("g(y)"), "5 y * 1 +")
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_free_symbols_are_dependencies(self):
+        self.parser.parse("k[x] := x + a", update_symbol_table = True)
+        self.evaluate("k(1) + h(1)")
+        self.parser.parse("a := 2", update_symbol_table = True)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_parameters_are_not_dependencies(self):
+        self.evaluate("h(1)")
+        self.parser.parse("x := 2", update_symbol_table = True)
+        self.assertEqual(len(self.cache), 1)
@@ -0,0 +1,50 @@
+'''
+Test cases for substitution and user-defined functions.
+
+Inputs for function call cases are sequences of statements. Each statement
+is parsed, reduced, and used to update the same parser's symbol table.
+The expected value is the reduced result of the final statement.
+'''
+
+from ..node import node
+from ..parsing.parser_definitions import *
+
+replace_all_cases = [
+    (("x + y",   {'x': 2})                     , "2 y +"      ),
+    (("x + y",   {'x': 2, 'y': 3})             , "2 3 +"      ),
+    (("x + y",   {'x': Var('y'), 'y': Var('x')}), "y x +"     ),
+    (("x * x",   {Var('x'): 5})                , "5 5 *"      ),
+    (("a + b",   {'x': 5})                     , "a b +"      ),
+    (("cos(x)",  {'x': 0})                     , "0 cos"      ),
+]
+
+function_call_cases = [
+    (("f[x] := 3*x + 4", "f(3)")                                  , "13"),
+    (("f[x] := 3*x + 4", "f 3")                                   , "13"),
+    (("g[x,y,z] := x + y + z", "g(1,2,3)")                        , "6" ),
+    (("f[x] := 3*x + 4", "g[x,y,z] := x + y + z",
+      "g(f(1), f(2), f(3))")                                      , "30"),
+
+    # parameters are substituted simultaneously, not one at a time
+    (("h[x,y] := x - y", "h(y,x)")                                , "y - x"),
+    (("h[x,y] := x - y", "h(2,5)")                                , "-3"   ),
+
+    # symbolic arguments are substituted as whole trees
+    (("f[x] := 3*x + 4", "f(y+1)")                                , "3*(y+1) + 4"),
+    (("f[x] := x*x", "f(a+b)")                                    , "(a+b)*(a+b)"),
+]
+
+compile_cases = [
+    (("3*x + 4", ['x'], (3,))                    , 13         ),
+    (("x - y", ['x', 'y'], (2, 5))               , -3         ),
+    (("x - y", ['y', 'x'], (2, 5))               , 3          ),
+    (("x^y % 7", ['x', 'y'], (3, 5))             , 5          ),
+    (("-x / 4", ['x'], (2,))                     , -0.5       ),
+    (("sqrt(x)", ['x'], (-4,))                   , 2j         ),
+    (("x!", ['x'], (5,))                         , 120        ),
+
+    # these are left symbolic by Reducer, so they don't compile
+    (("x + y", ['x'], (1,))                      , None       ),
+    (("x * e", ['x'], (1,))                      , None       ),
+    (("expand(x)", ['x'], (1,))                  , None       ),
+]
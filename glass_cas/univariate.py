@@ -0,0 +1,307 @@
+'''
+univariate.py
+
+Dense kernels for polynomials in one variable. A polynomial is a list of
+coefficients, lowest degree first, so [1, 3, 3, 1] is 1 + 3x + 3x^2 + x^3.
+The zero polynomial is [].
+
+multiply picks an algorithm by size and coefficient type:
+  - schoolbook multiplication for short inputs,
+  - Kronecker substitution for long inputs with int or Fraction
+    coefficients: each polynomial is packed into one big integer, the
+    integers are multiplied (exactly, by Python's own fast multiplication),
+    and the product is unpacked again,
+  - Karatsuba multiplication for long inputs with other coefficients
+    (floats and complex numbers).
+
+divide does long division, and gcd finds greatest common divisors with
+Euclid's algorithm. Both are exact for int and Fraction coefficients.
+
+Ex:
+    multiply([1, 1], [1, 1])                    # [1, 2, 1]
+    divide([-1, 0, 1], [-1, 1])                 # ([1, 1], []): x^2 - 1 = (x + 1)(x - 1)
+    gcd([-1, 0, 1], [1, 2, 1])                  # [1, 1]: x + 1
+    from_polynomial(p, Var('x'), degree = 3)    # p's coefficients, presized
+'''
+
+from .budget import current_budget
+from fractions import Fraction
+import math, numbers
+
+# inputs shorter than this (in either factor) use schoolbook multiplication
+SCHOOLBOOK_THRESHOLD = 16
+
+# int and Fraction inputs at least this long use Kronecker substitution
+KRONECKER_THRESHOLD = 16
+
+def multiply(a, b):
+    ''' Return the product of coefficient lists a and b. '''
+    if len(a) == 0 or len(b) == 0:
+        return []
+
+    budget = current_budget()
+    if budget != None:
+        budget.check()
+
+    if min(len(a), len(b)) < SCHOOLBOOK_THRESHOLD:
+        return trim(schoolbook_multiply(a, b))
+    if min(len(a), len(b)) >= KRONECKER_THRESHOLD and is_rational(a) and is_rational(b):
+        return trim(rational_multiply(a, b))
+    return trim(karatsuba_multiply(a, b))
+
+def power(a, k):
+    ''' Return a raised to the non-negative integer k, by repeated squaring. '''
+    result = [1]
+    while k > 0:
+        if k & 1:
+            result = multiply(result, a)
+        k >>= 1
+        if k > 0:
+            a = multiply(a, a)
+    return result
+
+def divide(a, b):
+    '''
+    Return (quotient, remainder) for the coefficient lists a and b, so
+    that a = quotient * b + remainder, and remainder is shorter than b.
+    Raises ZeroDivisionError if b is zero.
+
+    This is long division, which takes O(n*m) operations for a quotient
+    of length n and a divisor of length m. Zero quotient terms are
+    skipped, and int quotient terms stay ints, so exact divisions with
+    small coefficients are cheap.
+    '''
+    b = trim(list(b))
+    if len(b) == 0:
+        raise ZeroDivisionError("polynomial division by zero")
+
+    budget = current_budget()
+    if budget != None:
+        budget.check()
+
+    remainder = trim(list(a))
+    if len(remainder) < len(b):
+        return [], remainder
+
+    m = len(b) - 1
+    lead = b[-1]
+    if isinstance(lead, numbers.Rational):
+        lead = Fraction(lead)
+    # the terms of b below its leading term
+    rest = b[:m]
+
+    quotient = [0] * (len(remainder) - m)
+    for i in range(len(quotient) - 1, -1, -1):
+        c = remainder[i + m]
+        if c == 0:
+            continue
+        c = c / lead
+        if isinstance(c, Fraction):
+            c = normalize(c)
+        quotient[i] = c
+        remainder[i:i + m] = [r - c * d for r, d in zip(remainder[i:i + m], rest)]
+    # the top coefficients were cancelled by the quotient terms
+    del remainder[m:]
+    return quotient, trim(remainder)
+
+def gcd(a, b):
+    '''
+    Return the greatest common divisor of the coefficient lists a and b,
+    as a monic polynomial (its leading coefficient is 1). This uses
+    Euclid's algorithm, making each remainder monic so that the
+    coefficients stay small. gcd([], []) is [].
+    '''
+    a = monic(trim(list(a)))
+    b = monic(trim(list(b)))
+    while len(b) > 0:
+        _, r = divide(a, b)
+        a, b = b, monic(r)
+    return a
+
+def monic(a):
+    ''' Return a divided by its leading coefficient. '''
+    if len(a) == 0 or a[-1] == 1:
+        return a
+    lead = a[-1]
+    if isinstance(lead, numbers.Rational):
+        lead = Fraction(lead)
+    result = []
+    for c in a:
+        c = c / lead
+        result.append(normalize(c) if isinstance(c, Fraction) else c)
+    return result
+
+def trim(a):
+    ''' Remove zero coefficients from the high end of a, in place, and return a. '''
+    while len(a) > 0 and a[-1] == 0:
+        a.pop()
+    return a
+
+def is_rational(a):
+    return all(isinstance(c, numbers.Rational) for c in a)
+
+def schoolbook_multiply(a, b):
+    result = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x == 0:
+            continue
+        for j, y in enumerate(b):
+            result[i + j] += x * y
+    return result
+
+def karatsuba_multiply(a, b):
+    '''
+    Split each input into low and high halves at m, so that
+        a*b = a0*b0 + ((a0 + a1)*(b0 + b1) - a0*b0 - a1*b1) x^m + a1*b1 x^2m
+    which takes three half-size products instead of four.
+    '''
+    if min(len(a), len(b)) < SCHOOLBOOK_THRESHOLD:
+        return schoolbook_multiply(a, b)
+
+    m = max(len(a), len(b)) // 2
+    a0, a1 = a[:m], a[m:]
+    b0, b1 = b[:m], b[m:]
+    if len(a1) == 0 or len(b1) == 0:
+        # one input is much shorter than the other, so split only the longer
+        if len(a1) == 0:
+            a, b, a0, a1 = b, a, b0, b1
+        return add_shifted(karatsuba_multiply(a0, b), karatsuba_multiply(a1, b), m)
+
+    low = karatsuba_multiply(a0, b0)
+    high = karatsuba_multiply(a1, b1)
+    middle = karatsuba_multiply(add(a0, a1), add(b0, b1))
+    for i, c in enumerate(low):
+        middle[i] -= c
+    for i, c in enumerate(high):
+        middle[i] -= c
+
+    result = [0] * (len(a) + len(b) - 1)
+    for i, c in enumerate(low):
+        result[i] += c
+    for i, c in enumerate(middle):
+        if i + m < len(result):
+            result[i + m] += c
+    for i, c in enumerate(high):
+        result[i + 2*m] += c
+    return result
+
+def add(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    result = list(a)
+    for i, c in enumerate(b):
+        result[i] += c
+    return result
+
+def add_shifted(a, b, m):
+    ''' Return a + b x^m. '''
+    result = list(a) + [0] * max(0, len(b) + m - len(a))
+    for i, c in enumerate(b):
+        result[i + m] += c
+    return result
+
+def rational_multiply(a, b):
+    ''' Multiply int or Fraction coefficient lists exactly, with integer arithmetic. '''
+    a, a_scale = integer_coefficients(a)
+    b, b_scale = integer_coefficients(b)
+    result = kronecker_multiply(a, b)
+    scale = a_scale * b_scale
+    if scale == 1:
+        return result
+    return [normalize(Fraction(c, scale)) for c in result]
+
+def integer_coefficients(a):
+    '''
+    Return (c, scale), where c is a list of ints with c[i] == a[i] * scale.
+    scale is the least common multiple of the denominators in a.
+    '''
+    scale = 1
+    for c in a:
+        if isinstance(c, Fraction) and c.denominator != 1:
+            scale = scale * c.denominator // math.gcd(scale, c.denominator)
+    if scale == 1:
+        return [int(c) for c in a], 1
+    return [int(c * scale) for c in a], scale
+
+def normalize(c):
+    ''' Turn whole Fractions into ints. '''
+    if c.denominator == 1:
+        return c.numerator
+    return c
+
+def kronecker_multiply(a, b):
+    '''
+    Multiply int coefficient lists by evaluating both at x = 2^(8*num_bytes),
+    multiplying the two integers, and reading the product's coefficients
+    back off as num_bytes-wide signed digits. num_bytes is chosen so that
+    every coefficient of the product fits in a digit, so this is exact.
+    '''
+    bound = min(len(a), len(b)) * max(abs(c) for c in a) * max(abs(c) for c in b)
+    if bound == 0:
+        return [0] * (len(a) + len(b) - 1)
+    # room for the sign, rounded up to whole bytes
+    num_bytes = bound.bit_length() // 8 + 1
+
+    product = pack(a, num_bytes) * pack(b, num_bytes)
+    length = len(a) + len(b) - 1
+    return unpack(product, num_bytes, length)
+
+def pack(a, num_bytes):
+    ''' Return the value of a at x = 2^(8 * num_bytes). '''
+    positive = b''.join((c if c > 0 else 0).to_bytes(num_bytes, 'little') for c in a)
+    negative = b''.join((-c if c < 0 else 0).to_bytes(num_bytes, 'little') for c in a)
+    return int.from_bytes(positive, 'little') - int.from_bytes(negative, 'little')
+
+def unpack(value, num_bytes, length):
+    '''
+    Return the length signed digits of value in base 2^bits, where
+    bits = 8 * num_bytes, each in [-2^(bits-1), 2^(bits-1)).
+    '''
+    bits = 8 * num_bytes
+    half = 1 << (bits - 1)
+    full = 1 << bits
+
+    # negative values are read in two's complement; the carries fix it up
+    data = (value & ((1 << (bits * length)) - 1)).to_bytes(num_bytes * length, 'little')
+    result = [0] * length
+    carry = 0
+    for i in range(length):
+        digit = int.from_bytes(data[i*num_bytes:(i+1)*num_bytes], 'little') + carry
+        carry = 0
+        if digit >= half:
+            digit -= full
+            carry = 1
+        result[i] = digit
+    return result
+
+def from_polynomial(p, symbol, degree = None):
+    '''
+    Return the coefficient list of p, a polynomial.Polynomial in symbol
+    alone. degree presizes the list (e.g. from the degree of a
+    PolynomialExpr); by default it is p's own degree. It is only a hint:
+    the list grows if p turns out to have a higher degree.
+    '''
+    if degree == None:
+        degree = p.degree()
+    result = [0] * (degree + 1)
+    for monomial, coefficient in p.terms.items():
+        if len(monomial) == 0:
+            result[0] = coefficient
+        else:
+            (_, exponent), = monomial
+            if exponent >= len(result):
+                result.extend([0] * (exponent + 1 - len(result)))
+            result[exponent] = coefficient
+    return trim(result)
+
+def to_terms(a, symbol):
+    ''' Return the dict of terms for a polynomial.Polynomial. '''
+    result = {}
+    for exponent, coefficient in enumerate(a):
+        if coefficient == 0:
+            continue
+        if exponent == 0:
+            result[()] = coefficient
+        else:
+            result[((symbol, exponent),)] = coefficient
+    return result
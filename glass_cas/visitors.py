@@ -1,7 +1,10 @@
 from .parsing.parser_definitions import *
 from .expression_types import *
-import numbers
-from math import factorial
+from .polynomial import Polynomial
+from .rational import RationalFunction
+from . import univariate
+from .simplify_cache import structural_key, structural_keys
+import numbers, math
 
 class Visitor(object):
     ''' Defines the Visitor interface '''
@@ -135,16 +138,85 @@ class Printer(Visitor):
 
 class Reducer(Visitor):
 
-    def __init__(self, replace_constants = False):
-        self.replace_constants = replace_constants
+    # results estimated to be larger than this are not computed by default
+    DEFAULT_MAX_BITS = 1 << 20
 
-    def visit(self, n):
+    def __init__(self, replace_constants = False, max_bits = DEFAULT_MAX_BITS):
         '''
-        Computes the value of the tree at node n.
-
         replace_constants = True will replace constant identifiers
             with their numeric values, e.g., 'e' becomes 2.7182818...
         replace_constants = False will leave 'e' in the tree.
+
+        max_bits limits the size of the integers this computes. An
+            operation whose result is estimated to need more than max_bits
+            bits is left unevaluated, e.g., '9^9^9' reduces to '9^387420489'.
+            If max_bits is None, everything is computed exactly.
+        '''
+        self.replace_constants = replace_constants
+        self.max_bits = max_bits
+        # the last node left unevaluated because it was too_expensive
+        self.deferred = None
+
+    @staticmethod
+    def exponent_bits(base, exponent):
+        if (isinstance(base, int) and isinstance(exponent, int) and
+            exponent > 0 and abs(base) > 1
+            ):
+            return exponent * math.log2(abs(base))
+        return 0
+
+    @staticmethod
+    def factorial_bits(n):
+        if isinstance(n, int) and n > 1:
+            return math.lgamma(n + 1) / math.log(2)
+        return 0
+
+    @staticmethod
+    def powmod_bits(base, exponent, modulus):
+        # three-argument pow never builds the power, but PowModOp.apply
+        # computes base ^ exponent in full for other operands
+        if (all(isinstance(x, int) for x in (base, exponent, modulus)) and
+            exponent >= 0 and modulus != 0
+            ):
+            return modulus.bit_length()
+        return Reducer.exponent_bits(base, exponent)
+
+    @staticmethod
+    def product_bits(*operands):
+        if all(isinstance(x, int) for x in operands):
+            return sum(abs(x).bit_length() for x in operands)
+        return 0
+
+    @staticmethod
+    def estimate_bits(operator, operands):
+        '''
+        Estimate the number of bits in operator.apply(*operands), using
+        Reducer.COST_ESTIMATORS. This is only meant for operations that
+        can produce huge integers; for anything else this returns 0.
+        '''
+        estimator = Reducer.COST_ESTIMATORS.get(type(operator))
+        if estimator == None:
+            for op_class, f in Reducer.COST_ESTIMATORS.items():
+                if isinstance(operator, op_class):
+                    estimator = f
+                    break
+        if estimator == None:
+            return 0
+
+        try:
+            return estimator(*operands)
+        except TypeError:
+            # e.g. more operands than the estimator handles
+            return 0
+
+    def too_expensive(self, operator, operands):
+        if self.max_bits == None:
+            return False
+        return Reducer.estimate_bits(operator, operands) > self.max_bits
+
+    def visit(self, n):
+        '''
+        Computes the value of the tree at node n.
         '''
         
         result_node = n.copy(recursive = False)
@@ -164,49 +236,424 @@ class Reducer(Visitor):
 
         elif isinstance(result_node.value, UserFunction):
             # UserFunction.apply returns a *node*
-            reduced_node = result_node.value.apply(*[x.value for x in result_node.children])
+            reduced_node = result_node.value.apply(*result_node.children)
             if reduced_node != None:
                 result_node = reduced_node
 
         elif isinstance(result_node.value, ExpandOp) or isinstance(result_node.value, SimplifyOp):
             return result_node.value.apply(*result_node.children)
 
+        elif isinstance(result_node.value, PolynomialDivisionOp):
+            # PolynomialDivisionOp.apply returns a *node*, or None to leave this as it is
+            reduced_node = result_node.value.apply(*result_node.children)
+            if reduced_node != None:
+                return reduced_node
+
         elif isinstance(result_node.value, GeneralOperator):
             # We can reduce the given node to a number if all children were reduced to a number.
             if all(isinstance(x.value, numbers.Number) for x in result_node.children):
-                reduced_value = result_node.value.apply(*[x.value for x in result_node.children])
+                operands = [x.value for x in result_node.children]
+                if self.too_expensive(result_node.value, operands):
+                    # leave it symbolic rather than tie up the process
+                    self.deferred = result_node
+                    return result_node
+
+                reduced_value = result_node.value.apply(*operands)
                 if reduced_value != None:
                     result_node.value = reduced_value
                     result_node.children.clear()
 
         return result_node
 
+Reducer.COST_ESTIMATORS = {
+    ExponentOp : Reducer.exponent_bits,
+    FactorialOp: Reducer.factorial_bits,
+    TimesOp    : Reducer.product_bits,
+    PowModOp   : Reducer.powmod_bits,
+}
+
+class Fuser(Visitor):
+    '''
+    Fuser rewrites patterns of operators that are expensive to evaluate
+    one at a time into a single cheaper operation. node.reduce runs it
+    ahead of Reducer.
+
+    Fusions are looked up in Fuser.FUSIONS by the class of the operator at
+    the root of the pattern. Each fusion is a function that takes a node
+    (whose children have already been fused) and returns a replacement
+    node, or None if the node doesn't match. Add new ones with register().
+    '''
+
+    @staticmethod
+    def is_numeric(n):
+        ''' Return True if every leaf of the tree at n is a number. '''
+        if len(n.children) == 0:
+            return isinstance(n.value, numbers.Number)
+        return all(Fuser.is_numeric(child) for child in n.children)
+
+    @staticmethod
+    def fuse_pow_mod(n):
+        '''
+        (a ^ b) % m --> powmod(a, b, m)
+        This is only done for numeric subtrees, so that powmod doesn't
+        show up in a symbolic result. (It can be left unevaluated if a
+        or m isn't an integer and a ^ b is too large to compute; see
+        Reducer.powmod_bits.)
+        '''
+        a_to_b, m = n.children
+        if (isinstance(a_to_b.value, ExponentOp) and len(a_to_b.children) == 2 and
+            Fuser.is_numeric(a_to_b) and Fuser.is_numeric(m)
+            ):
+            result = n.copy(value = PowModOp())
+            result.children = a_to_b.children + [m]
+            return result
+        return None
+
+    @staticmethod
+    def fuse_exp_log(n):
+        ''' e ^ (ln x) --> x '''
+        base, exponent = n.children
+        if isinstance(base.value, E) and isinstance(exponent.value, LogEOp):
+            return exponent.children[0]
+        return None
+
+    @staticmethod
+    def fuse_log_exp(n):
+        '''
+        ln(e ^ x) --> x
+        This only holds on the principal branch, so it is only done when
+        x is a real number: ln(e ^ 10j) is -2.566j, not 10j.
+        '''
+        child = n.children[0]
+        if (isinstance(child.value, ExponentOp) and len(child.children) == 2 and
+            isinstance(child.children[0].value, E) and
+            Fuser.is_real_number(child.children[1])
+            ):
+            return child.children[1]
+        return None
+
+    @staticmethod
+    def is_real_number(n):
+        return (len(n.children) == 0 and isinstance(n.value, numbers.Real) and
+                not isinstance(n.value, bool))
+
+    @staticmethod
+    def fuse_square(n):
+        '''
+        x * x --> x ^ 2, so that x is only evaluated once.
+        This is only done when x is a numeric subtree that isn't a single
+        number, since that is when it saves work. Symbolic products are
+        left as they are, so reduce doesn't rewrite them.
+        '''
+        if len(n.children) != 2:
+            return None
+        a, b = n.children
+        if (len(a.children) > 0 and Fuser.is_numeric(a) and
+            a.value == b.value and len(a.children) == len(b.children) and
+            (a is b or a.strict_match(b))
+            ):
+            return n.construct(a, ExponentOp(), n.copy(value = 2))
+        return None
+
+    @classmethod
+    def register(cls, op_class, fusion):
+        ''' Add fusion for patterns rooted at an operator of type op_class. '''
+        cls.FUSIONS.setdefault(op_class, []).append(fusion)
+
+    def visit(self, n):
+        '''
+        Return a tree with every matching pattern in the tree at node n
+        fused. Unchanged subtrees are shared with n.
+        '''
+        new_children = [self.visit(child) for child in n.children]
+        result = n
+        if not all(a is b for a, b in zip(new_children, n.children)):
+            result = n.copy(recursive = False)
+            result.children = new_children
+
+        # the fused node may match another pattern at its root
+        fused = self.fuse_root(result)
+        while fused != None:
+            result = fused
+            fused = self.fuse_root(result)
+
+        return result
+
+    def fuse_root(self, n):
+        ''' Apply the first fusion that matches at n, or return None. '''
+        # ImplicitMultOp uses the TimesOp fusions, and so on
+        for op_class in type(n.value).__mro__:
+            for fusion in Fuser.FUSIONS.get(op_class, ()):
+                fused = fusion(n)
+                if fused != None:
+                    return fused
+        return None
+
+Fuser.FUSIONS = {
+    ModulusOp : [Fuser.fuse_pow_mod],
+    ExponentOp: [Fuser.fuse_exp_log],
+    LogEOp    : [Fuser.fuse_log_exp],
+    TimesOp   : [Fuser.fuse_square],
+}
+
+class Specializer(Reducer):
+
+    def __init__(self, bindings, replace_constants = False, max_bits = Reducer.DEFAULT_MAX_BITS):
+        '''
+        bindings is a dict mapping symbols (Var objects or names) to
+            numbers or nodes. Symbols not in bindings stay symbolic.
+        replace_constants and max_bits are as for Reducer.
+        '''
+        super().__init__(replace_constants = replace_constants, max_bits = max_bits)
+        self.bindings = {}
+        for key, value in bindings.items():
+            self.bindings[str(key)] = value
+
+    @staticmethod
+    def is_number(n, value):
+        ''' Return True if n is a leaf node containing a number equal to value. '''
+        return (len(n.children) == 0 and
+                isinstance(n.value, numbers.Number) and
+                not isinstance(n.value, bool) and
+                n.value == value)
+
+    def visit(self, n):
+        '''
+        Partially evaluate the tree at node n: substitute the bound
+        symbols, then reduce as Reducer does, folding every subtree whose
+        children are all numbers. On top of that, this removes identities
+        that leave a residual tree over the unbound symbols smaller:
+            0 * _ --> 0         _ * 1, 1 * _ --> _
+            _ + 0, 0 + _ --> _  _ - 0 --> _
+            _ / 1 --> _         _ ^ 1 --> _         _ ^ 0 --> 1
+        The residual tree can then be evaluated repeatedly, or compiled
+        with node.compile, at much less cost than the original.
+        '''
+        if (len(n.children) == 0 and isinstance(n.value, Var) and
+            str(n.value) in self.bindings
+            ):
+            value = self.bindings[str(n.value)]
+            if hasattr(value, 'children'):
+                return value.reduce(self.replace_constants, max_bits = self.max_bits)
+            return n.copy(value = value)
+
+        result = super().visit(n)
+
+        if isinstance(result.value, TimesOp):
+            if any(Specializer.is_number(c, 0) for c in result.children):
+                return result.copy(value = 0)
+            result.children = [c for c in result.children if not Specializer.is_number(c, 1)]
+        elif isinstance(result.value, PlusOp):
+            result.children = [c for c in result.children if not Specializer.is_number(c, 0)]
+        elif isinstance(result.value, SubOp) and Specializer.is_number(result.children[-1], 0):
+            result.children.pop()
+        elif isinstance(result.value, DivideOp) and Specializer.is_number(result.children[-1], 1):
+            result.children.pop()
+        elif isinstance(result.value, ExponentOp):
+            if Specializer.is_number(result.children[-1], 0):
+                return result.copy(value = 1)
+            elif Specializer.is_number(result.children[-1], 1):
+                result.children.pop()
+
+        if isinstance(result.value, InfixOp) and len(result.children) < 2:
+            if len(result.children) == 0:
+                # every term was an identity element
+                return result.copy(value = 1 if isinstance(result.value, TimesOp) else 0)
+            return result.children[0]
+
+        return result
+
 class Replacer(Visitor):
 
-    def __init__(self, symbol, expr):
+    def __init__(self, symbol = None, expr = None, replacements = None):
         '''
         Instantiate this Replacer so that every occurrence of
-        symbol is replaced with expr
+        symbol is replaced with expr.
+
+        Alternatively, pass replacements, a dict mapping symbols to
+        expressions, to substitute many symbols simultaneously in a
+        single traversal. Symbols are matched by name, so the keys
+        can be Var objects or plain strings.
 
-        expr should be a node.
+        Each expression should be a node. Anything else (a number, say)
+        is wrapped in a new leaf node at each occurrence. The exception
+        is a UserFunction expression, which replaces calls of the
+        function with the same name, keeping their arguments.
         '''
-        self.symbol = symbol
-        self.expr = expr
+        self.replacements = {}
+        if replacements != None:
+            for key, value in replacements.items():
+                self.replacements[str(key)] = value
+        if symbol != None:
+            self.replacements[str(symbol)] = expr
 
     def visit(self, n):
-        # TODO: this needs to be tested
-        # this is also pretty inefficient
+        '''
+        Return a tree where each Var named in self.replacements is
+        substituted by its expression.
 
-        result_node = n.copy(recursive = False)
+        Only the nodes on a path to a replaced symbol are copied. Any
+        subtree that contains no replaced symbol is shared with n, and
+        replacement nodes are shared by all of their occurrences, so
+        copy the result before modifying it in place.
+        '''
+        if len(n.children) == 0 and not isinstance(n.value, UserFunction):
+            if isinstance(n.value, Var) and str(n.value) in self.replacements:
+                expr = self.replacements[str(n.value)]
+                if hasattr(expr, 'children'):
+                    return expr
+                elif isinstance(expr, UserFunction) and expr.num_operands > 0:
+                    # a variable can't become a call without arguments
+                    return n
+                return n.copy(value = expr)
+            return n
 
-        if str(n.value) == str(self.symbol):
-            result_node = n.copy(self.expr)
-        else:
-            for child in n.children:
-                result_node.children.append(self.visit(child))
+        value = n.value
+        if isinstance(value, UserFunction) and value.name in self.replacements:
+            if isinstance(self.replacements[value.name], UserFunction):
+                value = self.replacements[value.name]
+
+        new_children = [self.visit(child) for child in n.children]
+        if value is n.value and all(a is b for a, b in zip(new_children, n.children)):
+            return n
 
+        result_node = n.copy(value = value)
+        result_node.children = new_children
         return result_node
 
+class SymbolFinder(Visitor):
+
+    def visit(self, n):
+        '''
+        Return a list of the symbols referenced in the tree at node n:
+        each Var (but not Constant) and UserFunction object, listed once
+        in the order they are first found.
+        '''
+        self.found = []
+        self.found_ids = set()
+        self.find_visit(n)
+        return self.found
+
+    def find_visit(self, n):
+        if (isinstance(n.value, UserFunction) or
+            (isinstance(n.value, Var) and not isinstance(n.value, Constant))
+            ):
+            if id(n.value) not in self.found_ids:
+                self.found_ids.add(id(n.value))
+                self.found.append(n.value)
+
+        for child in n.children:
+            self.find_visit(child)
+
+class Compiler(Visitor):
+
+    # operators that map directly onto Python's infix operators
+    # (n-ary nodes work too, since these match each apply() method)
+    INFIX_OPERATORS = {
+        PlusOp         : '+',
+        SubOp          : '-',
+        TimesOp        : '*',
+        ImplicitMultOp : '*',
+        DivideOp       : '/',
+        ModulusOp      : '%',
+        ExponentOp     : '**',
+    }
+
+    # operators whose apply() cannot be used on numbers
+    UNCOMPILABLE_OPERATORS = (EqualsOp, DefinedAsOp, ExpandOp, SimplifyOp, PolynomialDivisionOp)
+
+    def __init__(self, params, max_bits = Reducer.DEFAULT_MAX_BITS):
+        '''
+        Instantiate this Compiler to compile trees into Python functions
+        whose arguments are the symbols in params, in order.
+
+        max_bits is as for Reducer. A compiled function raises a
+            NotNumericError where Reducer would leave an operation
+            unevaluated, except for multiplication, which is left as
+            Python's own * for speed.
+        '''
+        self.params = [str(p) for p in params]
+        self.max_bits = max_bits
+
+    def guard(self, operator):
+        ''' Return a function that applies operator unless it is too expensive. '''
+        max_bits = self.max_bits
+
+        def guarded_apply(*operands):
+            if Reducer.estimate_bits(operator, operands) > max_bits:
+                raise NotNumericError("%s is too expensive to evaluate" % operator)
+            return operator.apply(*operands)
+
+        return guarded_apply
+
+    def visit(self, n):
+        '''
+        Return a Python function computing the value of the tree at
+        node n for numeric arguments, or None if n cannot be compiled.
+
+        The tree is turned into the source of a single lambda, which
+        computes the same thing Reducer would compute after substituting
+        the arguments. Anything that would be left symbolic by Reducer
+        (a free variable, a Constant, an equation) makes n uncompilable.
+        '''
+        self.namespace = {}
+        source = self.source_visit(n)
+        if source == None:
+            return None
+
+        args = ", ".join("_a%s" % i for i in range(len(self.params)))
+        try:
+            return eval("lambda %s: %s" % (args, source), self.namespace)
+        except (SyntaxError, RecursionError, MemoryError):
+            # the tree is too deep for Python's compiler
+            return None
+
+    def bind(self, prefix, obj):
+        ''' Make obj available to the compiled source and return its name. '''
+        name = "_%s%s" % (prefix, len(self.namespace))
+        self.namespace[name] = obj
+        return name
+
+    def source_visit(self, n):
+        if len(n.children) == 0:
+            if isinstance(n.value, numbers.Number):
+                return self.bind('c', n.value)
+            elif isinstance(n.value, Var) and str(n.value) in self.params:
+                return "_a%s" % self.params.index(str(n.value))
+            elif isinstance(n.value, UserFunction) and n.value.value != None:
+                return "%s()" % self.bind('f', n.value.call)
+            return None
+
+        if isinstance(n.value, Compiler.UNCOMPILABLE_OPERATORS):
+            return None
+
+        args = [self.source_visit(child) for child in n.children]
+        if None in args:
+            return None
+
+        if (self.max_bits != None and not isinstance(n.value, TimesOp) and
+            isinstance(n.value, tuple(Reducer.COST_ESTIMATORS))
+            ):
+            func = self.bind('op', self.guard(n.value))
+        elif type(n.value) in Compiler.INFIX_OPERATORS:
+            source = (" %s " % Compiler.INFIX_OPERATORS[type(n.value)]).join(args)
+            if isinstance(n.value, PlusOp):
+                # PlusOp.apply uses sum(), which starts from 0
+                source = "0 + " + source
+            return "(%s)" % source
+        elif isinstance(n.value, NegationOp):
+            return "(-%s)" % args[0]
+        elif isinstance(n.value, UserFunction):
+            if n.value.value == None:
+                return None
+            func = self.bind('f', n.value.call)
+        elif isinstance(n.value, GeneralOperator):
+            func = self.bind('op', n.value.apply)
+        else:
+            return None
+
+        return "%s(%s)" % (func, ", ".join(args))
+
 class Recognizer(object):
     '''
     The purpose of this class is to be able to tell you what kind of 
@@ -247,21 +694,33 @@ class Recognizer(object):
         '''
         self.assign_types = assign_types
 
-    def visit(self, n):
+    @staticmethod
+    def uses_child_types(value):
+        ''' Return True if the type of a node with this value depends on its children's types. '''
+        return (isinstance(value, EqualsOp) or
+                isinstance(value, NegationOp) or
+                (isinstance(value, InfixOp) and not isinstance(value, DefinedAsOp)))
+
+    @staticmethod
+    def resolve_node(value, child_types):
+        '''
+        Return the type of a node with the given value, whose children
+        have the types in child_types (child_types is ignored unless
+        uses_child_types(value) is True).
+        '''
         result = UnknownExpr()
-        if isinstance(n.value, EqualsOp):
-            left = self.visit(n.children[0])
-            right = self.visit(n.children[1])
-            result = EquationExpr(left, right)
-        elif isinstance(n.value, DefinedAsOp):
+        if isinstance(value, EqualsOp):
+            result = EquationExpr(child_types[0], child_types[1])
+        elif isinstance(value, DefinedAsOp):
             result = DefinedAsExpr()
-        elif isinstance(n.value, InfixOp):
-            left = self.visit(n.children[0])
-            right = self.visit(n.children[1])
-            result = left.resolve(n.value, right)
-            
-        elif isinstance(n.value, NegationOp):
-            child_type = self.visit(n.children[0])
+        elif isinstance(value, InfixOp):
+            # fold over all the children, for flattened (n-ary) nodes
+            result = child_types[0]
+            for child_type in child_types[1:]:
+                result = result.resolve(value, child_type)
+
+        elif isinstance(value, NegationOp):
+            child_type = child_types[0]
             if isinstance(child_type, ConstantExpr):
                 result = ConstantExpr(-child_type.value)
             else:
@@ -270,18 +729,68 @@ class Recognizer(object):
 #            elif isinstance(child_type, PolynomialExpr):
 #                result = child_type
 
-        elif isinstance(n.value, numbers.Number):
-            result = ConstantExpr(n.value)
-        elif isinstance(n.value, Constant):
-            result = ConstantExpr(n.value.value)
-        elif isinstance(n.value, Var):
-            result = PolynomialExpr(Var(n.value), 1)
+        elif isinstance(value, numbers.Number):
+            result = ConstantExpr(value)
+        elif isinstance(value, Constant):
+            result = ConstantExpr(value.value)
+        elif isinstance(value, Var):
+            result = PolynomialExpr(Var(value), 1)
+
+        return result
+
+    def visit(self, n):
+        child_types = []
+        if Recognizer.uses_child_types(n.value):
+            child_types = [self.visit(child) for child in n.children]
+
+        result = Recognizer.resolve_node(n.value, child_types)
 
         if self.assign_types:
             n.expr_type = result
 
         return result
 
+class TypedReducer(Reducer):
+
+    def visit(self, n):
+        '''
+        Reduce the tree at node n, as Reducer does, and set expr_type on
+        every node of the result, as Recognizer does, in the same pass.
+
+        Each node's type is resolved from its (already reduced) children's
+        types, so nothing is recomputed. In particular a folded constant
+        gets its type straight from its value, instead of having
+        ConstantExpr.resolve apply the operator a second time.
+        '''
+        result = super().visit(n)
+
+        if (isinstance(n.value, UserFunction) or
+            isinstance(n.value, ExpandOp) or
+            isinstance(n.value, SimplifyOp) or
+            isinstance(n.value, PolynomialDivisionOp)
+            ):
+            # this subtree was built elsewhere, so type all of it
+            self.type_visit(result)
+        elif result is self.deferred:
+            # Reducer left this unevaluated on purpose, so don't let
+            # ConstantExpr.resolve evaluate it either
+            result.expr_type = UnknownExpr("too expensive to evaluate")
+        else:
+            result.expr_type = self.resolve_node(result)
+
+        return result
+
+    def resolve_node(self, n):
+        child_types = []
+        if Recognizer.uses_child_types(n.value):
+            child_types = [c.expr_type for c in n.children]
+        return Recognizer.resolve_node(n.value, child_types)
+
+    def type_visit(self, n):
+        for child in n.children:
+            self.type_visit(child)
+        n.expr_type = self.resolve_node(n)
+
 class Expander(Visitor):
     
     is_plus_or_minus = lambda c: isinstance(c, PlusOp) or isinstance(c, SubOp)
@@ -291,163 +800,228 @@ class Expander(Visitor):
         This works recursively as follows:
            1. Expand children first
            2. Distribute operators over addition/subtraction
-           3. Expand children again if we distributed them
-        It works decently, but it's slow. 
         For performance, this will reuse instances from the input
         node instead of make full copies, if possible.
-        
-        A better algorithm might be to first flatten the tree, 
-        then expand as above, then unflatten. This will result in 
-        fewer calls to distribute and map, however the entire tree
-        is traversed twice for the flattening and unflattening.
+
+        Each distribution treats a sum as its whole list of terms, as
+        if the sum were flattened, and distributes over all of them at
+        once. The terms are put back in the shape of the original sum,
+        so nothing needs to be unflattened, and nothing that has been
+        expanded is expanded again.
         For example:
-          Current method:
             Input: x * (((a+b) + c) + d)
+            Terms of the sum: a, b, c, d
+            Distribute: ((x*a + x*b) + x*c) + x*d
+        The old method distributed over one binary + at a time, and
+        expanded the result again after each step:
             Distribute: x * ((a+b) + c) + x * d
             Distribute: (x * (a+b) + x*c) + x * d
             Distribute: ((x*a + x*b) + x*c) + x * d
-          Flatting method:
-            Input: x * (((a+b) + c) + d))
-            Flatten: x * (a + b + c + d)
-            Distribute: x*a + x*b + x*c + x*d
-            Unflatten: (x*a + x*b) + (x*c + x*d)
-            
         '''
 
         result = n.copy(recursive = False)
         for child in n.children:
             result.children.append(self.visit(child))
 
+        return self.expand_node(result)
+
+    def expand_node(self, n):
+        '''
+        Expand n, whose children are already expanded, and return the result.
+        '''
+
         # we assume the tree is binary at all +-*/^ nodes
-        if isinstance(result.value, TimesOp):
-            if Expander.is_plus_or_minus(result.children[0].value):
-                if Expander.is_plus_or_minus(result.children[1].value):
-                    result = self.distribute(result.children[0], result.children[1], result.value, left_distr = True)
-                else:
-                    result = self.distribute(result.children[1], result.children[0], result.value, left_distr = False)
-                return self.visit(result)
-            elif Expander.is_plus_or_minus(result.children[1].value):
-                result = self.distribute(result.children[0], result.children[1], result.value, left_distr = True)
-                return self.visit(result)
-
-        elif isinstance(result.value, DivideOp):
-            if Expander.is_plus_or_minus(result.children[0].value):
-                result = self.distribute(result.children[1], result.children[0], result.value, left_distr = False)
-                return self.visit(result)
-
-        elif isinstance(result.value, NegationOp):
-            if Expander.is_plus_or_minus(result.children[0].value):
-                result = self.map(result.value, result.children[0])
-                return self.visit(result)
+        if isinstance(n.value, TimesOp):
+            if (Expander.is_plus_or_minus(n.children[0].value) or
+                Expander.is_plus_or_minus(n.children[1].value)
+                ):
+                return self.distribute(n.children[0], n.children[1], n.value)
+
+        elif isinstance(n.value, DivideOp):
+            if Expander.is_plus_or_minus(n.children[0].value):
+                # (a + b) / (c + d) --> a/(c + d) + b/(c + d)
+                return self.distribute(n.children[0], n.children[1], n.value, distribute_right = False)
+
+        elif isinstance(n.value, NegationOp):
+            if Expander.is_plus_or_minus(n.children[0].value):
+                return self.map(n.value, n.children[0])
                 
-        elif isinstance(result.value, ExponentOp):
-            if isinstance(result.children[1].value, int) and result.children[1].value >= 0:
-                if Expander.is_plus_or_minus(result.children[0].value):
-                    result = self.expand_sum_to_integer_power(result)
-                    return self.visit(result)
+        elif isinstance(n.value, ExponentOp):
+            if isinstance(n.children[1].value, int) and n.children[1].value >= 0:
+                if Expander.is_plus_or_minus(n.children[0].value):
+                    # the result's factors are not sums, so it needs no more expanding
+                    return self.expand_sum_to_integer_power(n)
 
-        return result
+        return n
 
     def expand_sum_to_integer_power(self, n):
         '''
-        n is a node that represents '(A + B) ^ k' where
-            A and B can be any nodes and k is an integer.
-        
-        Use the binomial theorem to produce a node that represents
-            Sum[(k choose i) * A^i * B^(k-i), i in range(0, k+1)]
-
-        This does not make new instances of (A+B) each time we need a copy.
+        n is a node that represents '(T1 + T2 + ... + Tm) ^ k' where
+            the Ti are the terms of a sum (see signed_terms) and k is
+            a non-negative integer.
+
+        Use the multinomial theorem to produce a flattened sum of
+            c * T1^e1 * T2^e2 * ... * Tm^em
+        over all exponents e1 + ... + em == k, where c is the multinomial
+        coefficient k! / (e1! * ... * em!), negated if the term has an
+        odd number of subtracted factors. Terms come in the order of
+        multinomial_coefficients, so for two terms this is the binomial
+        theorem, highest power of T1 first:
+            (x - y)^2 --> x^2 + (-2)*x*y + y^2
+
+        This does not make new instances of the Ti each time we need a copy.
         '''
-        
+
         k = n.children[1].value
         if k == 0:
             return n.copy(value = 1)
 
-        A, B = n.children[0].children
-
-        choose = lambda n, r: int(factorial(n)/(factorial(r) * factorial(n-r)))
-
-        coeffs = [choose(k, i) for i in range(0, k+1)]
+        terms = Expander.signed_terms(n.children[0])
 
         result = n.copy(value = PlusOp())
-
-        for i, c in enumerate(coeffs):
-            # term represents (c * A^i * B^(k-i))
+        for exponents, c in Expander.multinomial_coefficients(len(terms), k):
             term = n.copy(value = TimesOp())
-            
-            if isinstance(n.children[0].value, SubOp) and i % 2 == 1:
-                # account for sign
+
+            negative = sum(e for (_, subtracted), e in zip(terms, exponents) if subtracted) % 2 == 1
+            if negative:
                 term.children.append(n.construct(n.copy(value = c), NegationOp()))
             elif c != 1:
                 term.children.append(n.copy(value = c))
-                
-            if k-i == 1:
-                # use 'x' instead of 'x^1'
-                term.children.append(A)
-            elif k-i != 0:
-                # don't put anything for 'x^0'
-                term.children.append(n.construct(A, ExponentOp(), n.copy(value = k-i)))
-
-            if i == 1:
-                term.children.append(B)
-            elif i != 0:
-                term.children.append(n.construct(B, ExponentOp(), n.copy(value = i)))
-            
+
+            for (T, _), e in zip(terms, exponents):
+                if e == 1 and type(T.value) == TimesOp:
+                    # keep the product flat
+                    term.children.extend(T.children)
+                elif e == 1:
+                    # use 'x' instead of 'x^1'
+                    term.children.append(T)
+                elif e != 0:
+                    # don't put anything for 'x^0'
+                    term.children.append(n.construct(T, ExponentOp(), n.copy(value = e)))
+
             if len(term.children) == 1:
                 result.children.append(term.children[0])
             else:
                 result.children.append(term)
+        return result
+
+    @staticmethod
+    def signed_terms(B):
+        '''
+        Return a list of (term, subtracted) pairs for the terms of the sum B,
+        below its tree of + and - nodes, in order. subtracted is True for
+        terms with an odd number of - nodes over them.
+            Ex: a - (b - c) --> [(a, False), (b, True), (c, False)]
+        '''
+        result = []
+        frontier = [(B, False)]
+        while frontier:
+            T, subtracted = frontier.pop()
+            if not Expander.is_plus_or_minus(T.value):
+                result.append((T, subtracted))
+                continue
+
+            children = []
+            for i, child in enumerate(T.children):
+                # everything after the first operand of - is subtracted
+                flip = isinstance(T.value, SubOp) and i > 0
+                children.append((child, subtracted != flip))
+            frontier.extend(reversed(children))
+        return result
+
+    @staticmethod
+    def multinomial_coefficients(m, k):
+        '''
+        Yield (exponents, c) for each tuple of m non-negative exponents
+        with sum k, in decreasing lexicographic order, where c is the
+        multinomial coefficient k! / (e1! * ... * em!).
+            Ex: m = 2, k = 2 --> ((2, 0), 1), ((1, 1), 2), ((0, 2), 1)
+
+        c is exact. It is the product of the binomial coefficients
+        C(r, e) for each exponent e, where r is the part of k not yet used
+        by earlier exponents, and each of those is computed from the one
+        before it rather than from factorials.
+        '''
+        exponents = [0] * m
 
-        return result.accept(Unflattener())
+        def compositions(i, remaining, c):
+            if i == m - 1:
+                exponents[i] = remaining
+                yield tuple(exponents), c
+                return
+
+            binomial = 1  # C(remaining, remaining)
+            for e in range(remaining, -1, -1):
+                exponents[i] = e
+                yield from compositions(i + 1, remaining - e, c * binomial)
+                # C(remaining, e - 1) == C(remaining, e) * e / (remaining - e + 1)
+                binomial = binomial * e // (remaining - e + 1)
+
+        return compositions(0, k, 1)
+
+    @staticmethod
+    def left_associate(n):
+        '''
+        Return the binary tree applying n.value to n's children from the
+        left, e.g. (a + b + c + d) --> ((a + b) + c) + d. This matches
+        Unflattener's default mode, but only for the root of n.
+        '''
+        result = n.children[0]
+        for child in n.children[1:]:
+            result = n.construct(result, n.value, child)
+        return result
     
     def map(self, func, B):
         '''
-        Map func to each child in B.
+        Map func to each term of the sum B.
 
         func is a PrefixOp or PostfixOp.
         B is any node.
 
         Ex:
             -(a+b) --> -a + -b
-            -(a+(b+c)) --> -a + -(b+c)
+            -(a+(b+c)) --> -a + (-b + -c)
         '''
-        
-        result = B.copy(recursive = False)
-        
-        for child in B.children:
-            new_node = B.copy(value = func)
-            new_node.children.append(child)
-            result.children.append(new_node)
 
-        return result
+        return self.replace_terms(B, lambda b: B.construct(b, func))
 
-    def distribute(self, A, B, operator, left_distr = True):
+    def distribute(self, A, B, operator, distribute_right = True):
         '''
-        Distribute A to B over operator.
+        Return A operator B, with operator distributed over all the terms
+        of A and B in one step.
 
-        B must be a node with a PlusOp or SubOp as its value.
-        A can be any node.
+        A and B can be any nodes. A node that isn't a sum is a single term.
         operator is the operator we distribute over.
             This can be TimesOp or ImplicitMultOp. We pass it in to stay consistent.
             This is also valid, in some cases, for DivideOp.
 
-        If left_distr is True then perform a left distribution.
-            Otherwise perform a right distribution. This is important
-            for non-commutative types. 
+        If distribute_right is False, then B is treated as a single term
+            even if it is a sum. Ex: (a+b)/(x+y) --> a/(x+y) + b/(x+y)
+
+        The result has the shape of B, with each term b replaced by
+        the shape of A, with each term a replaced by (a operator b):
+            (a+b) * (x+y) --> ((a*x) + (b*x)) + ((a*y) + (b*y))
         '''
 
-        result = B.copy(recursive = False)
-        
-        for c in B.children:
-            new_term = B.copy(value = operator)
-            if left_distr:
-                new_term.children.append(A)
-                new_term.children.append(c)
-            else:
-                new_term.children.append(c)
-                new_term.children.append(A)
-            result.children.append(new_term)
+        def distribute_over_A(b):
+            return self.replace_terms(A, lambda a: B.construct(a, operator, b))
+
+        if distribute_right:
+            return self.replace_terms(B, distribute_over_A)
+        return distribute_over_A(B)
 
+    def replace_terms(self, B, func):
+        '''
+        Return a copy of the sum B in which each term b is replaced by func(b).
+        The terms of B are the subtrees below its tree of + and - nodes.
+        If B is not a sum, this returns func(B).
+        '''
+        if not Expander.is_plus_or_minus(B.value):
+            return func(B)
+
+        result = B.copy(recursive = False)
+        for child in B.children:
+            result.children.append(self.replace_terms(child, func))
         return result
 
 class Flattener(Visitor):
@@ -474,9 +1048,9 @@ class Flattener(Visitor):
         NOTES:
         When updating this method, you should also update Unflattener.visit.
 
-        This should maintain expr_type attributes correctly. Recognizer is
-        not made for use with a flattened tree, so you have to first call assign_types()
-        and then flatten the tree to have expression types in the output.
+        This should maintain expr_type attributes correctly. Recognizer also
+        works on a flattened tree (it folds resolve() across the children of
+        n-ary + and * nodes), so you can flatten first and type the result.
 
         This only works for + and * because they're the only commutative operators.
         We can also do some flattening for - and / but we'd first have to
@@ -576,63 +1150,97 @@ class Sorter(Visitor):
             applied is commutative.
 
         BY_NODE_VALUE will sort according to str(node.value).
-        BY_SUBTREE_REPR will sort children according to the string 
-            of the prefix representation of the subtree rooted 
-            by each child node.
+        BY_SUBTREE_REPR will sort children according to the structure
+            of the subtree rooted by each child node: first the child's
+            value, then its children's subtrees, in order (see subtree_key).
+            Numbers are compared as numbers, so 9 sorts before 10.
         BY_EXPR_TYPE will sort first by the type of expression:
-                  UnknownExpr
-                > ExponentialExpr
+                  ExponentialExpr
                 > RationalExpr
-                > PolynomialExpr
+                > PolynomialExpr, MultivariatePolynomialExpr
                 > ConstantExpr
+                > UnknownExpr
             Then it will also sort among members of the same type
                 using certain attributes. For PolynomialExprs, it will 
-                use the variable name and the degree. For ConstantExprs
-                it uses a string representation of the constant value.
-            Then it sorts by subtree representation. For example:
+                use the variable name(s) and the (total) degree. For ConstantExprs
+                it uses the constant value.
+            Then it sorts by subtree structure, as in BY_SUBTREE_REPR. For example:
                 x^2 + x + 1 --> 1 + x + x^2
 
+        The keys are tuples. Each node's subtree key is computed once,
+            bottom-up, from its children's keys, and kept for the rest of
+            the pass, so sorting the whole tree takes O(n log n) comparisons
+            rather than rebuilding strings for every subtree at every level.
+
         This is a useful hack for grouping similar-looking terms in 
             a flattened tree.
         '''
         self.mode = mode
+        # id(n) -> (n, subtree key) for the nodes sorted so far
+        self.subtree_keys = {}
 
     @staticmethod
     def by_node_value_key(n):
         return str(n.value)
 
     @staticmethod
-    def by_subtree_repr_key(n):
-        return n.accept(Printer(mode = Printer.BFS_MODE))
+    def value_key(value):
+        ''' Return a sort key for a node's value. Numbers sort first, by value. '''
+        if isinstance(value, numbers.Real) and not isinstance(value, bool):
+            return (0, value, 0)
+        elif isinstance(value, numbers.Complex):
+            return (0, value.real, value.imag)
+        return (1, str(value), 0)
+
+    def subtree_key(self, n):
+        '''
+        Return (value key, child subtree keys) for the subtree at n,
+        reusing the keys already computed for n's children.
+        '''
+        cached = self.subtree_keys.get(id(n))
+        if cached != None and cached[0] is n:
+            return cached[1]
+
+        result = (Sorter.value_key(n.value), tuple(self.subtree_key(c) for c in n.children))
+        self.subtree_keys[id(n)] = (n, result)
+        return result
 
     @staticmethod
-    def get_expr_sort_val(expr_type):
+    def expr_type_key(expr_type):
         if isinstance(expr_type, ExponentialExpr):
-            return "05"
+            return (5,)
         elif isinstance(expr_type, RationalExpr):
-            return "04"
-        elif isinstance(expr_type, PolynomialExpr):
-            return "03" + str(expr_type.var) + str(expr_type.degree)
+            return (4,)
         elif isinstance(expr_type, ConstantExpr):
-            return "02" + str(expr_type.value)
+            # ConstantExpr is a PolynomialExpr, so this comes first
+            return (2, Sorter.value_key(expr_type.value))
+        elif isinstance(expr_type, PolynomialExpr):
+            return (3, (str(expr_type.var),), expr_type.degree)
+        elif isinstance(expr_type, MultivariatePolynomialExpr):
+            return (3, tuple(map(str, expr_type.variables())), expr_type.total_degree)
         else:
-            return "01"
+            return (1,)
 
-    @staticmethod
-    def by_expr_type_key(n):
-        return Sorter.get_expr_sort_val(n.expr_type) + Sorter.by_subtree_repr_key(n)
+    def by_subtree_repr_key(self, n):
+        return self.subtree_key(n)
+
+    def by_expr_type_key(self, n):
+        return (Sorter.expr_type_key(n.expr_type), self.subtree_key(n))
 
     def visit(self, n):
         result = n.copy(recursive = True)
+        self.subtree_keys = {}
         if self.mode == Sorter.BY_NODE_VALUE:
             self.sort_visit(result, Sorter.by_node_value_key)
         elif self.mode == Sorter.BY_SUBTREE_REPR:
-            self.sort_visit(result, Sorter.by_subtree_repr_key)
+            self.sort_visit(result, self.by_subtree_repr_key)
         elif self.mode == Sorter.BY_EXPR_TYPE:
-            self.sort_visit(result, Sorter.by_expr_type_key)
+            self.sort_visit(result, self.by_expr_type_key)
+        self.subtree_keys = {}
         return result
 
     def sort_visit(self, n, sort_key):
+        # children are sorted, and their keys computed, before their parent's
         for child in n.children:
             self.sort_visit(child, sort_key)
 
@@ -664,7 +1272,7 @@ class Normalizer(Visitor):
 
     def norm_visit(self, n): 
         for i in range(len(n.children)):
-            n.children[i] = self.norm_visit(n.children[i])
+            n.set_child(i, self.norm_visit(n.children[i]))
 
         result = n
         if isinstance(n.value, SubOp):
@@ -692,11 +1300,12 @@ class Denormalizer(Visitor):
             1. a + (-1 * b) --> a - b
             2. (1/b) * a --> a / b
             3. -1 * x --> `x
-        It als unflattens the tree.
-
+        It also unflattens the tree, first, so that these patterns are
+        matched on binary nodes (in a flattened tree, -1 * x * y would
+        otherwise become `x).
         '''
-        result = self.denorm_visit(n)
-        result = result.accept(Unflattener())
+        result = n.accept(Unflattener())
+        result = self.denorm_visit(result)
         return result
 
     def denorm_visit(self, n):
@@ -712,96 +1321,115 @@ class Denormalizer(Visitor):
             result = n.construct(n.children[1], NegationOp())
 
         for i in range(len(result.children)):
-            result.children[i] = self.denorm_visit(result.children[i])
+            result.set_child(i, self.denorm_visit(result.children[i]))
 
         return result
 
 class Simplifier(Visitor):
+
+    def __init__(self, cache = None):
+        '''
+        cache is an optional simplify_cache.SimplifyCache. If given, the
+            results for whole inputs, and for each subtree of the normalized
+            tree, are looked up there before being computed.
+        '''
+        self.cache = cache
+        # id(n) -> (n, structural key) for the normalized tree being simplified
+        self.keys = {}
    
     def visit(self, n):
+        key = None
+        if self.cache != None:
+            key = structural_key(n)
+            if key != None:
+                result = self.cache.lookup("simplifier:" + key, n)
+                if result != None:
+                    return result
+
         result = n.accept(Normalizer())
+        if self.cache != None:
+            self.keys = dict((id(m), (m, k)) for m, k in Simplifier.nodes_with_keys(result))
         result = self.simplify_visit(result)
         # we don't need to denormalize here. It's more of a display nicety.
         result = result.accept(Denormalizer())
+
+        if key != None:
+            self.cache.store("simplifier:" + key, result)
         return result
 
+    @staticmethod
+    def nodes_with_keys(n):
+        ''' Return (node, structural key) pairs for every node in the tree at n. '''
+        keys = structural_keys(n)
+        result = []
+        frontier = [n]
+        while frontier:
+            m = frontier.pop()
+            result.append((m, keys[id(m)]))
+            frontier.extend(m.children)
+        return result
+
+    def subtree_key(self, n):
+        '''
+        Return the cache key for the subtree n of the normalized tree, or
+        None if it shouldn't be cached. Leaves are cheap, so they aren't.
+        '''
+        if len(n.children) == 0 or id(n) not in self.keys:
+            return None
+        original, key = self.keys[id(n)]
+        if original is not n or key == None:
+            return None
+        return "normalized:" + key
+
     def simplify_visit(self, n):
         result = n
 
-        # so this approach is limited. 
-        # What if, for example, a RationalExpr simplifies to a PolynomialExpr or ConstantExpr?
-        #   x / x --> 1
-        #   x^2 / x --> x
         if isinstance(result.expr_type, ConstantExpr):
             result = n.copy(value = result.expr_type.value)
             result.expr_type = n.expr_type
             return result
-        elif isinstance(result.expr_type, PolynomialExpr):
-            result.children = [self.simplify_visit(x) for x in result.children]
-            result = self.simplify_to_polynomial(result)
-            result.expr_type = n.expr_type
+        elif is_polynomial(result.expr_type) or isinstance(result.expr_type, RationalExpr):
+            key = None
+            if self.cache != None:
+                key = self.subtree_key(n)
+                if key != None:
+                    cached = self.cache.lookup(key, n)
+                    if cached != None:
+                        cached.update_types()
+                        return cached
+
+            if isinstance(result.expr_type, RationalExpr):
+                result = self.simplify_rational(result)
+            else:
+                for i in range(len(result.children)):
+                    result.set_child(i, self.simplify_visit(result.children[i]))
+                result = self.simplify_to_polynomial(result)
+            # collecting terms can lower the degree, e.g. x^2 - x^2 --> 0
+            result.update_types()
+
+            if key != None:
+                self.cache.store(key, result)
             return result
         else:
             return n
 
-
-    def resolve_poly_add(self, a, b):
+    def simplify_rational(self, n):
         '''
-        Called from simplify to polynomial.
-
-        Note:
-        a and b will not be a sum of terms. That is, if a.expr_type
-        is a PolynomialExpr with degree d, then a represents (A ^ d)
-        and not (A^d + <term> + <term> + ...). The only issue here is 
-        that A could still be (1+x), for example. That is, the input 
-        is not necessarily fully expanded.
+        n is typed as a RationalExpr. Return n as a single quotient in
+        lowest terms (see rational.RationalFunction), which may turn out
+        to be a polynomial:
+            x / x --> 1
+            x^2 / x --> x
+            (x+1)/(x+2) + 1/(x+2) --> 1
+        n is returned unchanged if it can't be converted, or if it divides
+        by zero.
         '''
-        
-        if type(a.expr_type) != type(b.expr_type):
-            return None
-
-        result = None
-        result_type = a.expr_type.resolve(PlusOp(), b.expr_type)
-
-        if isinstance(result_type, UnknownExpr):
-            return None
-
-        if isinstance(result_type, ConstantExpr):
-            result = a.copy(value = result_type.value)
-        elif isinstance(result_type, PolynomialExpr):
-            # if a, b are of same variable and degree
-            if a.expr_type == b.expr_type:
-                if isinstance(a.value, Var) and isinstance(b.value, Var):
-                    # x + x --> 2 * x
-                    result = a.construct(a.copy(value = 2), TimesOp(), a)
-                elif isinstance(a.value, ExponentOp) and isinstance(b.value, ExponentOp):
-                    # _^d + _^d --> 2 * (_^d)
-                    #
-                    # so there are other cases that hit this conditional, like:
-                    #   (1+x)^2 + x^2 --> 1 + 2x + x^2 + x^2 --> 1 + 2x + 2x^2
-                    # But this requires an expansion, and I'd rather not expand here.
-                    if a.strict_match(b):
-                        result = a.construct(a.copy(value = 2), TimesOp(), a)
-                elif isinstance(a.value, TimesOp):
-                    if (isinstance(b.value, TimesOp) 
-                        and isinstance(a.children[0].value, numbers.Number)
-                        and isinstance(b.children[0].value, numbers.Number)
-                        and a.children[1].strict_match(b.children[1])
-                        ):
-                        # (3 * _) + (2 * _) --> 5 * _
-                        new_coeff = a.children[0].value + b.children[0].value
-                        result = a.construct(a.copy(value = new_coeff), TimesOp(), a.children[1])
-                    elif isinstance(a.children[0].value, numbers.Number) and a.children[1].strict_match(b):
-                        # (3 * _) + _ --> 4 * _
-                        new_coeff = a.children[0].value + 1
-                        if new_coeff == 0:
-                            result = a.copy(value = 0)
-                            result_type = ConstantExpr(0)
-                        else:
-                            result = a.construct(a.copy(value = new_coeff), TimesOp(), b)
-        if result != None:
-            result.expr_type = result_type
-        return result 
+        if not RationalFunction.is_rational_tree(n):
+            return n
+        try:
+            return RationalFunction.convert(n).to_tree(n)
+        except ZeroDivisionError:
+            return n
 
     def resolve_poly_mult(self, a, b):
         result = None
@@ -824,7 +1452,7 @@ class Simplifier(Visitor):
                     result = a.copy(value = 0)
                     result_type = ConstantExpr(0)
                 else:
-                    result = a.construct(a.copy(value = new_coefficient), TimesOp(), b.children[1])
+                    result = a.construct(a.copy(value = new_coeff), TimesOp(), b.children[1])
         elif isinstance(result_type, PolynomialExpr):
             if isinstance(a.value, Var) and isinstance(b.value, Var):
                 # x * x --> x^2
@@ -838,17 +1466,133 @@ class Simplifier(Visitor):
                 if a.children[0].strict_match(b.children[0]):
                     new_exponent = a.children[1].value + b.children[1].value
                     result = a.construct(a.children[0], ExponentOp(), a.copy(value = new_exponent))
+            elif isinstance(a.value, PlusOp) or isinstance(b.value, PlusOp):
+                # (1 + x) * (2 + x^2) --> 2 + 2x + x^2 + x^3
+                result = self.multiply_univariate(a, b, result_type)
 
         if result != None:
             result.expr_type = result_type
         return result 
  
+    def multiply_univariate(self, a, b, result_type):
+        '''
+        Called from resolve_poly_mult, when a * b is a polynomial in one
+        variable. This multiplies the coefficient lists of a and b (see
+        univariate.multiply), so large products don't build big trees.
+        Returns a normalized tree, or None if a or b can't be converted.
+        '''
+        if not Polynomial.is_polynomial_tree(a) or not Polynomial.is_polynomial_tree(b):
+            return None
+
+        # the types give the degrees, to presize the coefficient lists
+        symbol = result_type.var
+        a_coefficients = univariate.from_polynomial(Polynomial.convert(a), symbol, a.expr_type.degree)
+        b_coefficients = univariate.from_polynomial(Polynomial.convert(b), symbol, b.expr_type.degree)
+        product = univariate.multiply(a_coefficients, b_coefficients)
+
+        result = Polynomial(univariate.to_terms(product, symbol)).to_tree(a)
+        return result.accept(Normalizer())
+
+    @staticmethod
+    def monomial_key(n):
+        '''
+        Split the term n into a numeric coefficient and the rest, and
+        return (coefficient, key, factors). factors is a list of the
+        non-numeric factors of n, and key identifies their product:
+        it is the same for x*y^2, y^2*x and y*x*y, for example.
+            Ex: 3 * x * (y^2) --> (3, ((('x', 1), ('y', 2)), ()), [x, y^2])
+                5 --> (5, ((), ()), [])
+
+        Factors other than symbols and symbols raised to integers (like
+        (1+x)^2) are part of the key by their structure.
+        '''
+        if isinstance(n.value, numbers.Number):
+            return (n.value, ((), ()), [])
+
+        factors = n.children if isinstance(n.value, TimesOp) else [n]
+
+        coefficient = 1
+        exponents = {}
+        others = []
+        result_factors = []
+        for factor in factors:
+            if isinstance(factor.value, numbers.Number):
+                coefficient = coefficient * factor.value
+                continue
+
+            result_factors.append(factor)
+            if isinstance(factor.value, Var):
+                symbol, exponent = str(factor.value), 1
+            elif (isinstance(factor.value, ExponentOp) and
+                  isinstance(factor.children[0].value, Var) and
+                  isinstance(factor.children[1].value, int)
+                  ):
+                symbol, exponent = str(factor.children[0].value), factor.children[1].value
+            else:
+                others.append(repr(factor))
+                continue
+            exponents[symbol] = exponents.get(symbol, 0) + exponent
+
+        key = (tuple(sorted(exponents.items())), tuple(sorted(others)))
+        return (coefficient, key, result_factors)
+
+    def collect_like_terms(self, n):
+        '''
+        n is a flattened sum of simplified terms. Return the sum with
+        like terms collected, in the order each monomial first appears.
+            (3*x) + 2 + x + (2*x) --> (6*x) + 2
+
+        Terms are collected in a dict keyed by monomial_key, so every
+        like term is found, wherever it is in the sum, in one pass.
+        '''
+        coefficients = {}
+        monomials = {}
+
+        # a stack, with the next term on top, so that taking a term or
+        # splicing in a nested sum doesn't shift the rest of the list
+        terms = list(reversed(n.children))
+        while terms:
+            term = terms.pop()
+            if isinstance(term.value, PlusOp):
+                # a simplified child may itself be a sum
+                terms.extend(reversed(term.children))
+                continue
+
+            coefficient, key, factors = Simplifier.monomial_key(term)
+            if key in coefficients:
+                coefficients[key] = coefficients[key] + coefficient
+            else:
+                coefficients[key] = coefficient
+                monomials[key] = factors
+
+        result = n.copy(recursive = False)
+        for key, coefficient in coefficients.items():
+            if coefficient == 0:
+                continue
+
+            factors = monomials[key]
+            if coefficient != 1 or len(factors) == 0:
+                factors = [n.copy(value = coefficient)] + factors
+            if len(factors) == 1:
+                result.children.append(factors[0])
+            else:
+                term = n.copy(value = TimesOp())
+                term.children = factors
+                result.children.append(term)
+
+        if len(result.children) == 0:
+            return n.copy(value = 0)
+        return result
+
     def simplify_to_polynomial(self, n):
 
         result = n.copy(recursive = False)
 
-        if isinstance(n.value, PlusOp) or isinstance(n.value, TimesOp):
-            # handle <poly> + ... + <poly> or <poly> * ... * <poly>
+        if isinstance(n.value, PlusOp):
+            # handle <poly> + ... + <poly>
+            result = self.collect_like_terms(n)
+        elif isinstance(n.value, TimesOp):
+            # handle <poly> * ... * <poly>
             # keep in mind n is already flattened and sorted            
 
             result.children.append(n.children.pop(0))
@@ -857,11 +1601,7 @@ class Simplifier(Visitor):
                 a = result.children[-1]
                 b = n.children.pop(0)
                 
-                new_node = None
-                if isinstance(n.value, PlusOp):
-                    new_node = self.resolve_poly_add(a, b)
-                elif isinstance(n.value, TimesOp):
-                    new_node = self.resolve_poly_mult(a, b)
+                new_node = self.resolve_poly_mult(a, b)
 
                 if new_node != None:
                     result.children[-1] = new_node
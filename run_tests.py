@@ -12,17 +12,63 @@ from glass_cas.test.parsing_test import (
 )
 
 from glass_cas.test.recognition_test import (
-    RecognitionTestCases
+    RecognitionTestCases,
+    FlattenedRecognitionTestCases,
+    TypedReductionTestCases,
+    ResolutionTableTestCases,
+    InternedTypesTestCases,
+    IncrementalTypesTestCases,
 )
 
 from glass_cas.test.expansion_test import (
     ExpansionTestCases,
+    ExpanderTestCases,
     FlatteningTestCases,
     UnflatteningTestCases,
+    SortingTestCases,
 )
 
 from glass_cas.test.simplification_test import (
-    SimplificationTestCases
+    SimplificationTestCases,
+    SimplifyCacheTestCases,
+)
+
+from glass_cas.test.user_function_test import (
+    ReplacementTestCases,
+    FunctionCallTestCases,
+    CompilationTestCases,
+    MemoizationTestCases,
+)
+
+from glass_cas.test.reduction_test import (
+    FusionTestCases,
+    CostDeferralTestCases,
+)
+
+from glass_cas.test.budget_test import (
+    BudgetTestCases
+)
+
+from glass_cas.test.specialization_test import (
+    SpecializationTestCases
+)
+
+from glass_cas.test.dependency_graph_test import (
+    DependencyGraphTestCases
+)
+
+from glass_cas.test.polynomial_test import (
+    PolynomialTestCases,
+    UnivariateTestCases,
+    RationalFunctionTestCases,
+)
+
+from glass_cas.test.streaming_test import (
+    StreamingTestCases
+)
+
+from glass_cas.test.parallel_test import (
+    ParallelExpansionTestCases
 )
 
 if __name__ == '__main__':